@@ -3,94 +3,327 @@ import os
 import json
 import uvicorn
 import time
-import base64
-from fastapi import FastAPI, Response
-from fastapi.staticfiles import StaticFiles
+import asyncio
+import threading
+import hmac
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from fastapi import FastAPI, Response, Header, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse
+from starlette.concurrency import run_in_threadpool
 from game import game_engine
+from game.traffic_log import TRAFFIC_LOG, format_entry
+from game import metrics
+from game import profiling
+from game.voice_manager import clean_for_tts, CLIP_STORE
+from game.client_state import StateTracker
+from game.load_governor import GOVERNOR
+from game.broadcast import Channel
+from game.scenario_pack import get_catalog, DIFFICULTIES
+from game.scenario_generator import get_scenario_pool, GENERATED_PREFIX
+from ui.assets import PrecompressedStaticFiles, DynamicGZipMiddleware, game_page_url, render_game_page
 from pydantic import BaseModel
+from typing import Optional
 
 # --- Setup FastAPI for Static Files ---
 app = FastAPI()
 # Ensure directories exist
 os.makedirs("ui/static", exist_ok=True)
-app.mount("/static", StaticFiles(directory="ui/static"), name="static")
+# Fingerprinted build output (python -m ui.assets) lives in ui/static/dist and is cached forever
+app.mount("/static", PrecompressedStaticFiles(directory="ui/static"), name="static")
+# Compress large dynamic responses (bridge replies, logs, profiles); small ones aren't worth it.
+# /static is left alone: it serves build-time .br/.gz files (and sets Vary itself)
+app.add_middleware(DynamicGZipMiddleware, minimum_size=1024)
 
 # --- Global Logging ---
-LOG_BUFFER = []
+# Entries live in a ring buffer (game/traffic_log.py); pollers use a cursor to fetch only new ones.
 
-def add_log(message):
-    timestamp = time.strftime("%H:%M:%S")
-    entry = f"[{timestamp}] {message}\n" + "-"*40 + "\n"
-    LOG_BUFFER.append(entry)
-    # Keep last 50 logs
-    if len(LOG_BUFFER) > 50:
-        LOG_BUFFER.pop(0)
+def add_log(direction, payload, session_id=None):
+    return TRAFFIC_LOG.add(direction, payload, session_id=session_id)
 
 # --- API Bridge ---
 
 class BridgeRequest(BaseModel):
     action: str
     data: dict = {}
+    session_id: Optional[str] = None # Games opened with the "start" action; omitted for the UI game
 
 class TTSRequest(BaseModel):
     text: str
     voice_id: str
 
-@app.post("/api/bridge")
-async def api_bridge(request: BridgeRequest):
-    """Direct API endpoint for game logic communication."""
-    input_data = json.dumps({"action": request.action, "data": request.data})
+def dispatch_bridge(action, data, profile_header=None, emit=None, session_id=None, admin_token=None):
+    """
+    Runs one bridge action against a session (shared by HTTP and WebSocket).
+    "start" opens a new game with its own session; other actions go to the game
+    named by session_id, or to the UI game when there is none. A profile is only
+    taken on request (`profile_header`) from an admin (`admin_token`).
+    Returns (response, profile_id).
+    """
+    if action == "watch":
+        # Featured AI game shared by all viewers (not a session of its own)
+        if emit is None:
+            return {"action": "tool_error", "data": {"message": "Watching needs the WebSocket; poll /api/broadcast instead."}}, None
+        follow_session(emit, None) # A viewer's board follows the broadcast only, not a game of its own
+        BROADCAST.join(emit, int(data.get("since") or 0))
+        return {"action": "watching", "data": {"viewers": BROADCAST.channel.viewers}}, None
+    if action == "start":
+        target = GameSession() # Registered once its game exists
+    else:
+        target = get_bridge_session(session_id)
+        if target is None:
+            return {"action": "tool_error", "data": {"message": f"Unknown session {session_id}."}}, None
+    if action == "ready" and emit is not None:
+        # The page shows this game: push it the game start and spectator steps
+        follow_session(emit, target)
+    input_data = json.dumps({"action": action, "data": data})
     
     # Log Request
-    add_log(f"IN: {input_data}")
-    print(f"API Bridge Received: {input_data}")
-    response = session.handle_input(input_data)
-    # Log Response
+    add_log("IN", {"action": action, "data": data}, target.session_id)
+    print(f"API Bridge Received: {action}")
+    
+    # Opt-in profiling: per request (X-Profile header, admins only) or per session (flag)
+    profile_id = None
+    requested = profiling.normalize_mode(profile_header) if is_admin(admin_token) else None
+    profile_mode = requested or target.profile_mode
+    with GOVERNOR.track(): # Queue depth and latency drive quality levels
+        if profile_mode:
+            response, profile_id = profiling.profile_call(
+                profile_mode, action, target.handle_input, input_data, emit,
+                session_id=target.session_id, allow_start=action == "start"
+            )
+        else:
+            response = target.handle_input(input_data, emit, allow_start=action == "start")
+    if action == "start" and target.game:
+        register_bridge_session(target)
+        if emit is not None: # After the start, whose init_game is already the reply
+            follow_session(emit, target)
+    # Log Response (large fields such as audio are truncated by the log)
     if response:
-        add_log(f"OUT: {json.dumps(response)}")
-        
+        add_log("OUT", response, target.session_id)
+    target.log_usage()
+    return response, profile_id
+
+@app.post("/api/bridge")
+async def api_bridge(request: BridgeRequest, http_response: Response, x_profile: str = Header(None), x_admin_token: str = Header(None)):
+    """Direct API endpoint for game logic communication."""
+    response, profile_id = await run_in_threadpool(
+        dispatch_bridge, request.action, request.data, x_profile, None, request.session_id, x_admin_token
+    )
+    if profile_id:
+        http_response.headers["X-Profile-Id"] = profile_id
+    # Polling clients without a socket learn the quality level here
+    http_response.headers["X-Quality-Level"] = str(GOVERNOR.level)
     return response or {} 
 
+@app.websocket("/ws/bridge")
+async def ws_bridge(websocket: WebSocket):
+    """
+    Persistent bridge: one socket per game page.
+    Client -> server: {"id": n, "action": ..., "data": {...}}
+    Server -> client: {"id": n, "reply": {...}} for requests,
+                      {"event": {"action": ..., "data": ...}} for pushed events
+                      (game start, AI spectator steps, voice clips).
+    A socket receives the events of the game it last sent "start" or "ready"
+    to, or the featured game's after "watch" (one of them at a time). A "profile" field is honored only when
+    the socket was opened with a valid X-Admin-Token header.
+    """
+    admin_token = websocket.headers.get("x-admin-token")
+    await websocket.accept()
+    loop = asyncio.get_running_loop()
+    outbox = asyncio.Queue() # Single writer: replies and events share one ordered queue
+    
+    def push(message):
+        # Called from worker threads
+        loop.call_soon_threadsafe(outbox.put_nowait, {"event": message})
+    
+    async def sender():
+        while True:
+            await websocket.send_json(await outbox.get())
+    
+    async def handle(message):
+        response, _ = await run_in_threadpool(
+            dispatch_bridge, message.get("action"), message.get("data") or {}, message.get("profile"), push,
+            message.get("session_id"), admin_token
+        )
+        await outbox.put({"id": message.get("id"), "reply": response or {}})
+    
+    sender_task = asyncio.create_task(sender())
+    tasks = set()
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except (ValueError, KeyError): # Not JSON, or a binary frame
+                message = None
+            if not isinstance(message, dict):
+                await outbox.put({"id": None, "reply": {"action": "tool_error", "data": {"message": "Malformed message: expected a JSON object."}}})
+                continue
+            task = asyncio.create_task(handle(message))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        follow_session(push, None)
+        sender_task.cancel()
+        for task in tasks:
+            task.cancel()
+
+@app.get("/api/audio/{clip_id}")
+async def api_audio(clip_id: str):
+    """Voice clips referenced from bridge replies."""
+    audio = CLIP_STORE.get(clip_id)
+    if audio is None:
+        raise HTTPException(status_code=404, detail="Clip expired")
+    return Response(content=audio, media_type="audio/mpeg", headers={"Cache-Control": "private, max-age=3600"})
+
+# --- Admin: Profiling ---
+
+def is_admin(token):
+    """True when ADMIN_TOKEN is configured and `token` matches it."""
+    expected = os.getenv("ADMIN_TOKEN")
+    return bool(expected) and hmac.compare_digest(str(token or ""), expected)
+
+def check_admin(token):
+    """Admin endpoints require ADMIN_TOKEN in the X-Admin-Token header; without ADMIN_TOKEN they don't exist."""
+    if not os.getenv("ADMIN_TOKEN"):
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not is_admin(token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.post("/admin/profiling")
+async def admin_set_profiling(mode: str = None, x_admin_token: str = Header(None)):
+    """Turns per-session profiling on (mode=sample|cprofile) or off (mode omitted/off)."""
+    check_admin(x_admin_token)
+    session.profile_mode = profiling.normalize_mode(mode)
+    return {"session_id": session.session_id, "profile_mode": session.profile_mode}
+
+@app.get("/admin/profiles")
+async def admin_list_profiles(x_admin_token: str = Header(None)):
+    check_admin(x_admin_token)
+    return {"profiles": profiling.PROFILE_STORE.list()}
+
+@app.get("/admin/profiles/{profile_id}")
+async def admin_get_profile(profile_id: str, format: str = None, x_admin_token: str = Header(None)):
+    """Downloads a profile: collapsed stacks (sample) or a pstats report/dump (cprofile)."""
+    check_admin(x_admin_token)
+    profile = profiling.PROFILE_STORE.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    fmt = format or ("collapsed" if profile["mode"] == "sample" else "text")
+    if fmt == "pstats" and "pstats" in profile:
+        return Response(
+            content=profile["pstats"],
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f"attachment; filename={profile_id}.pstats"}
+        )
+    if fmt in ("collapsed", "text") and fmt in profile:
+        return Response(
+            content=profile[fmt],
+            media_type="text/plain",
+            headers={"Content-Disposition": f"attachment; filename={profile_id}.{'folded' if fmt == 'collapsed' else 'txt'}"}
+        )
+    raise HTTPException(status_code=400, detail=f"Format '{fmt}' not available for a {profile['mode']} profile")
+
+@app.get("/api/logs")
+async def api_logs(cursor: int = 0, session_id: str = None, limit: int = 50):
+    """Incremental log polling: returns entries newer than `cursor` and the next cursor."""
+    entries, next_cursor = TRAFFIC_LOG.since(cursor, session_id=session_id, limit=limit)
+    return {"entries": entries, "cursor": next_cursor}
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus scrape target (game/metrics.py)."""
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # --- Game Logic Wrapper ---
 
+BRIDGE_ACTIONS = ("ready", "ai_step", "ai_autoplay", "select_suspect", "next_round", "chat_message", "use_tool", "batch", "sync_state", "question_all", "start")
+
+# Upper bound on actions in one "batch" request
+MAX_BATCH_ACTIONS = int(os.getenv("BRIDGE_MAX_BATCH", "20"))
+# Results that end a batch early: later actions assumed these succeeded
+BATCH_STOP_ACTIONS = ("tool_error", "game_over")
+# Never batched: they open games or subscriptions rather than act on this one
+UNBATCHABLE_ACTIONS = (None, "batch", "start", "watch")
+
+# Pause between AI spectator moves pushed over the WebSocket (reading time)
+AI_STEP_DELAY = float(os.getenv("AI_STEP_DELAY", "6"))
+
 class GameSession:
     def __init__(self):
         self.session_id = None
         self.game = None
+        self.state = None # Versioned player-visible projection of self.game
         self.voice_enabled = False
         self.game_mode = "interactive"
+        self.profile_mode = None # "sample" / "cprofile" profiles every bridge request
+        self.subscribers = set() # Callbacks receiving server-pushed events (WebSockets)
+        self._lock = threading.RLock() # One action at a time against the game
+        self._autoplay_thread = None
+        self._last_usage = None
+
+    def subscribe(self, callback):
+        self.subscribers.add(callback)
+
+    def unsubscribe(self, callback):
+        self.subscribers.discard(callback)
+
+    def publish(self, message):
+        """Pushes an event to every connected client."""
+        for callback in list(self.subscribers):
+            try:
+                callback(message)
+            except Exception as e:
+                print(f"Publish Error: {e}")
 
-    def start(self, difficulty="medium", mode="interactive", voice=True):
-        self.session_id, self.game = game_engine.start_game(difficulty)
-        self.voice_enabled = voice
-        self.game_mode = mode
-        return self._get_init_data()
+    def start(self, difficulty="medium", mode="interactive", voice=True, case_id=None):
+        with self._lock:
+            self.session_id, self.game = game_engine.start_game(difficulty, case_id, warm_voice=voice)
+            self.state = StateTracker(self.game)
+            self.voice_enabled = voice
+            self.game_mode = mode
+            init_data = self._get_init_data()
+        self.publish(init_data)
+        return init_data
 
     def _get_init_data(self):
         if not self.game:
             return None
             
-        # Prepare static data for tools
-        cameras = list(self.game.scenario["evidence"]["footage_data"].keys())
-        
-        dna_map = {}
-        for k, v in self.game.scenario["evidence"]["dna_evidence"].items():
-            dna_map[k] = v.get("label", k) # Fallback to ID if no label
-            
+        # Only the player-visible projection leaves the server (no murderer, no evidence tree)
         return {
             "action": "init_game",
             "data": {
-                "scenario": self.game.scenario,
-                "round": self.game.round,
-                "points": self.game.points,
-                "available_cameras": cameras,
-                "dna_map": dna_map,
-                "unlocked_evidence": self.game.unlocked_evidence,
-                "mode": self.game_mode
+                "state": self.state.full(),
+                "mode": self.game_mode,
+                "session_id": self.session_id,
+                "quality": GOVERNOR.signal()
             }
         }
 
-    def handle_input(self, input_json):
+    def _with_state(self, response):
+        """Attaches the state patch produced by an action to its response."""
+        if not self.state or (response and response.get("action") in ("init_game", "state_patch")):
+            return response
+        patch = self.state.update()
+        if not patch:
+            return response
+        if response is None:
+            return {"action": "state_patch", "data": patch}
+        response["state"] = patch
+        return response
+
+    def handle_input(self, input_json, emit=None, allow_start=False):
+        """
+        Handles one bridge action. `emit` (WebSocket only) receives follow-up events
+        such as voice clips that finish after the reply was sent. "start" runs only
+        with `allow_start`, which dispatch_bridge sets on the fresh session it
+        creates for it; anywhere else it would restart someone else's game.
+        """
         if not input_json:
             return None
             
@@ -102,6 +335,132 @@ class GameSession:
         action = data.get("action")
         payload = data.get("data", {})
         
+        if action == "batch":
+            return self.handle_batch(payload.get("actions"), emit)
+        return self._run_action(action, payload, emit, allow_start)
+
+    def handle_batch(self, actions, emit=None):
+        """
+        Applies an ordered list of {"action", "data"} entries in one request.
+        The session lock is held for the whole batch so no other request can
+        interleave; processing stops at the first error.
+        """
+        if not isinstance(actions, list) or not actions or len(actions) > MAX_BATCH_ACTIONS:
+            return {
+                "action": "tool_error",
+                "data": {"message": f"A batch needs 1 to {MAX_BATCH_ACTIONS} actions."}
+            }
+        
+        results = []
+        start = time.perf_counter()
+        try:
+            with self._lock:
+                for item in actions:
+                    if not isinstance(item, dict) or item.get("action") in UNBATCHABLE_ACTIONS:
+                        results.append({"action": "tool_error", "data": {"message": "Invalid batch entry."}})
+                        break
+                    try:
+                        result = self._run_action(item["action"], item.get("data") or {}, emit)
+                    except Exception as e:
+                        print(f"Batch Error: {item['action']} failed: {e}")
+                        results.append({"action": "tool_error", "data": {"message": f"{item['action']} failed."}})
+                        break
+                    results.append(result)
+                    if result and result.get("action") in BATCH_STOP_ACTIONS:
+                        break
+        finally:
+            metrics.BRIDGE_REQUESTS.inc(action="batch")
+            metrics.BRIDGE_LATENCY.observe(time.perf_counter() - start, action="batch")
+        
+        return {
+            "action": "batch_result",
+            "data": {
+                "results": results,
+                "completed": len(results) == len(actions) and not (results[-1] and results[-1].get("action") == "tool_error")
+            }
+        }
+
+    def _run_action(self, action, payload, emit=None, allow_start=False):
+        # Keep metric labels bounded: anything unexpected is "unknown"
+        label = action if action in BRIDGE_ACTIONS else "unknown"
+        start = time.perf_counter()
+        try:
+            with self._lock:
+                return self._with_state(self._handle_action(action, payload, emit, allow_start))
+        finally:
+            metrics.BRIDGE_REQUESTS.inc(action=label)
+            metrics.BRIDGE_LATENCY.observe(time.perf_counter() - start, action=label)
+
+    def log_usage(self):
+        """Adds the game's token/TTS spend to the traffic log whenever it changed."""
+        if not self.game:
+            return
+        report = self.game.usage_report()
+        if report != self._last_usage:
+            self._last_usage = report
+            add_log("USAGE", report, self.session_id)
+
+    def _voice_clip(self, suspect, text):
+        """Synthesizes a suspect's line; returns its /api/audio URL, or None when voice is off."""
+        cleaned = clean_for_tts(text)
+        if not (self.voice_enabled and suspect and "voice_id" in suspect and cleaned):
+            return None
+        audio_bytes = self.game.voice_manager.generate_audio(cleaned, suspect["voice_id"])
+        if not audio_bytes:
+            return None
+        return "/api/audio/" + CLIP_STORE.put(audio_bytes)
+
+    def _ai_step(self):
+        step_data = self.game.run_ai_step()
+        result = step_data.get("result", {})
+        if result.get("type") == "chat":
+            # Pushed spectators hear the suspect too (by reference, like chat replies)
+            suspect = next((s for s in self.game.scenario["suspects"] if s["id"] == result.get("suspect_id")), None)
+            result["audio"] = self._voice_clip(suspect, result.get("response"))
+        return {
+            "action": "ai_step_result",
+            "data": step_data
+        }
+
+    def _spectator_step(self, game):
+        """Plays and publishes one AI move. Returns the step, or None if the game was replaced."""
+        with self._lock:
+            if self.game is not game:
+                return None
+            step = self._with_state(self._ai_step())
+        self.publish(step)
+        self.log_usage()
+        return step
+
+    def _autoplay(self, game):
+        """Server-driven spectator loop: pushes AI moves instead of the page polling for them."""
+        while self.game is game and not game.game_over and self.subscribers:
+            step = self._spectator_step(game)
+            if step is None or step["data"].get("result", {}).get("type") == "game_over":
+                break
+            # Spectators are the first to wait when the server is shedding load
+            time.sleep(AI_STEP_DELAY * GOVERNOR.spectator_delay_factor())
+        self._autoplay_thread = None
+
+    def close(self):
+        """Drops the game (evicted bridge sessions)."""
+        if self.session_id:
+            game_engine.end_game(self.session_id)
+        self.game = None
+        self.state = None
+        self.subscribers.clear()
+
+    def _handle_action(self, action, payload, emit=None, allow_start=False):
+        if action == "start":
+            if not allow_start:
+                return {"action": "tool_error", "data": {"message": "Games are started by the bridge's \"start\" action only."}}
+            return self.start(
+                payload.get("difficulty", "medium"),
+                payload.get("mode", "interactive"),
+                bool(payload.get("voice", False)),
+                case_id=payload.get("case_id")
+            )
+
         if action == "ready":
             # Wait for explicit start from Gradio UI, or return existing state
             if self.game:
@@ -111,6 +470,16 @@ class GameSession:
         if not self.game:
             return None
 
+        if action == "sync_state":
+            # Client missed a patch (another tab acted, or a reply was lost)
+            return {"action": "state_patch", "data": self.state.since(payload.get("version"))}
+
+        if action == "ai_autoplay":
+            if not self._autoplay_thread:
+                self._autoplay_thread = threading.Thread(target=self._autoplay, args=(self.game,), daemon=True)
+                self._autoplay_thread.start()
+            return {"action": "ai_autoplay_started", "data": {}}
+
         if action == "ai_step":
             step_data = self.game.run_ai_step()
             
@@ -152,6 +521,8 @@ class GameSession:
             }
 
         if action == "select_suspect":
+            # Prefetch hint: the first question to this suspect skips agent and voice setup
+            self.game.prefetch_suspect(payload.get("suspect_id"), voice=self.voice_enabled)
             return None 
             
         if action == "next_round":
@@ -178,29 +549,18 @@ class GameSession:
             response = self.game.question_suspect(suspect_id, message)
             
             suspect = next((s for s in self.game.scenario["suspects"] if s["id"] == suspect_id), None)
-            suspect_name = next((s["name"] for s in self.game.scenario["suspects"] if s["id"] == suspect_id), "Suspect")
-            
-            # Clean text for ElevenLabs
-            cleaned_response = response
-            # Remove text within leading parentheses (e.g., "(A bit defensively)")
-            if cleaned_response.strip().startswith('(') and ')' in cleaned_response:
-                end_paren_idx = cleaned_response.find(')')
-                if end_paren_idx != -1:
-                    cleaned_response = cleaned_response[end_paren_idx + 1:].strip()
+            suspect_name = suspect["name"] if suspect else "Suspect"
             
-            # Remove all asterisks
-            cleaned_response = cleaned_response.replace('*', '')
-            
-            # Trim leading/trailing whitespace
-            cleaned_response = cleaned_response.strip()
-
-            # Generate Audio
-            audio_b64 = None
-            # Check Voice Enabled
-            if self.voice_enabled and suspect and "voice_id" in suspect and cleaned_response:
-                audio_bytes = self.game.voice_manager.generate_audio(cleaned_response, suspect["voice_id"])
-                if audio_bytes:
-                    audio_b64 = "data:audio/mpeg;base64," + base64.b64encode(audio_bytes).decode('utf-8')
+            audio_url = None
+            if emit:
+                # Streamed: the text goes out now, the clip follows as an event
+                def synthesize():
+                    audio_url = self._voice_clip(suspect, response)
+                    if audio_url:
+                        emit({"action": "play_audio", "data": {"suspect_id": suspect_id, "audio": audio_url}})
+                threading.Thread(target=synthesize, daemon=True).start()
+            else:
+                audio_url = self._voice_clip(suspect, response)
             
             return {
                 "action": "update_chat",
@@ -208,9 +568,49 @@ class GameSession:
                     "role": "suspect",
                     "name": suspect_name,
                     "content": response,
-                    "audio": audio_b64
+                    "audio": audio_url
                 }
             }
+
+        if action == "question_all":
+            # Line-up: one question to every remaining suspect, answered (and voiced) concurrently
+            message = payload.get("message")
+            suspects = {s["id"]: s for s in self.game.scenario["suspects"]}
+            clips = {}
+            tts = ThreadPoolExecutor(max_workers=4, thread_name_prefix="lineup-tts")
+            
+            def speak(suspect_id, response):
+                audio_url = self._voice_clip(suspects[suspect_id], response)
+                if audio_url:
+                    # Queued on the client so voices don't talk over each other
+                    emit({"action": "play_audio", "data": {"suspect_id": suspect_id, "audio": audio_url, "queue": True}})
+            
+            def on_answer(suspect_id, response):
+                if emit:
+                    emit({
+                        "action": "update_chat",
+                        "data": {"role": "suspect", "name": suspects[suspect_id]["name"], "content": response, "audio": None}
+                    })
+                    tts.submit(speak, suspect_id, response)
+                else:
+                    clips[suspect_id] = tts.submit(self._voice_clip, suspects[suspect_id], response)
+            
+            answers = self.game.question_all(message, on_answer)
+            # Streamed clips finish in the background; HTTP waits for them
+            tts.shutdown(wait=not emit)
+            
+            data = {"question": message, "streamed": bool(emit), "suspect_ids": list(answers)}
+            if not emit:
+                data["answers"] = [
+                    {
+                        "role": "suspect",
+                        "name": suspects[suspect_id]["name"],
+                        "content": response,
+                        "audio": clips[suspect_id].result()
+                    }
+                    for suspect_id, response in answers.items()
+                ]
+            return {"action": "lineup_result", "data": data}
             
         if action == "use_tool":
             tool_name = payload.get("tool")
@@ -275,9 +675,8 @@ class GameSession:
             # Format the result nicely
             evidence_data = format_tool_response(tool_name, arg, result, self.game.scenario)
             
-            # Include updated points and unlocks in response
+            # Points and unlocks reach the client through the state patch; newly_unlocked drives the UI hint
             evidence_data["updated_points"] = self.game.points
-            evidence_data["unlocked_evidence"] = self.game.unlocked_evidence
             
             if "newly_unlocked" in result and result["newly_unlocked"]:
                 evidence_data["newly_unlocked"] = result["newly_unlocked"]
@@ -406,38 +805,192 @@ def format_tool_response(tool_name, arg, result, scenario):
 
 session = GameSession()
 
+# Games opened through the bridge's "start" action (API clients, load tests), LRU by use.
+# The Gradio UI keeps using the global `session` above.
+MAX_BRIDGE_SESSIONS = int(os.getenv("MAX_BRIDGE_SESSIONS", "200"))
+BRIDGE_SESSIONS = OrderedDict()
+_bridge_sessions_lock = threading.Lock()
+
+def get_bridge_session(session_id):
+    if not session_id or session_id == session.session_id:
+        return session
+    with _bridge_sessions_lock:
+        target = BRIDGE_SESSIONS.get(session_id)
+        if target is not None:
+            BRIDGE_SESSIONS.move_to_end(session_id)
+        return target
+
+def follow_session(emit, target):
+    """Points a socket's pushed events at `target` only (None: at nothing)."""
+    BROADCAST.leave(emit)
+    with _bridge_sessions_lock:
+        others = [session] + list(BRIDGE_SESSIONS.values())
+    for other in others:
+        if other is not target:
+            other.unsubscribe(emit)
+    if target is not None:
+        target.subscribe(emit)
+
+def register_bridge_session(target):
+    evicted = []
+    with _bridge_sessions_lock:
+        BRIDGE_SESSIONS[target.session_id] = target
+        while len(BRIDGE_SESSIONS) > MAX_BRIDGE_SESSIONS:
+            evicted.append(BRIDGE_SESSIONS.popitem(last=False)[1])
+    for old in evicted:
+        old.close()
+
+# --- Broadcast: one featured AI game for every spectator ---
+
+BROADCAST_CASE = os.getenv("BROADCAST_CASE") # Fixed case_id; a random case of BROADCAST_DIFFICULTY when unset
+BROADCAST_DIFFICULTY = os.getenv("BROADCAST_DIFFICULTY", "medium")
+BROADCAST_VOICE = os.getenv("BROADCAST_VOICE", "1") != "0"
+BROADCAST_INTERMISSION = float(os.getenv("BROADCAST_INTERMISSION", "20")) # Seconds on the verdict before the next case
+BROADCAST_POLL_GRACE = 30 # Seconds an HTTP poll counts as someone watching
+
+class Broadcast:
+    """
+    One server-side AI game published to a Channel (game/broadcast.py). Viewers join
+    with the "watch" action over the WebSocket or poll /api/broadcast, so the LLM and
+    TTS cost is the same for one viewer or a thousand. The game only advances while
+    someone is watching; when a case ends the next starts after an intermission.
+    """
+
+    def __init__(self):
+        self.session = GameSession()
+        self.channel = Channel(self.session._get_init_data, replay_actions=("ai_step_result",))
+        self.session.subscribe(self.channel.publish)
+        self._last_poll = 0.0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def watched(self):
+        return self.channel.viewers > 0 or time.monotonic() - self._last_poll < BROADCAST_POLL_GRACE
+
+    def join(self, callback, since=0):
+        self.channel.subscribe(callback, since)
+        metrics.BROADCAST_VIEWERS.set(self.channel.viewers)
+        self._ensure_running()
+
+    def leave(self, callback):
+        self.channel.unsubscribe(callback)
+        metrics.BROADCAST_VIEWERS.set(self.channel.viewers)
+
+    def poll(self, since=0):
+        """Catch-up for viewers without a socket."""
+        self._last_poll = time.monotonic()
+        self._ensure_running()
+        return {"seq": self.channel.seq, "events": self.channel.catch_up(since)}
+
+    def _ensure_running(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="broadcast", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        try:
+            while True:
+                with self._lock:
+                    if not self.watched():
+                        return
+                game = self.session.game
+                if game is None or game.game_over:
+                    if game is not None:
+                        time.sleep(BROADCAST_INTERMISSION)
+                        self.session.close()
+                    self.session.start(BROADCAST_DIFFICULTY, "broadcast", BROADCAST_VOICE, case_id=BROADCAST_CASE)
+                    continue
+                self.session._spectator_step(game)
+                time.sleep(AI_STEP_DELAY * GOVERNOR.spectator_delay_factor())
+        except Exception as e:
+            print(f"Broadcast Error: {e}")
+        finally:
+            with self._lock:
+                self._thread = None
+
+BROADCAST = Broadcast()
+
+@app.get("/api/broadcast")
+async def api_broadcast(since: int = 0):
+    """Featured AI game for polling viewers: events after `since`, with a snapshot first when needed."""
+    return await run_in_threadpool(BROADCAST.poll, since)
+
+def broadcast_quality(signal):
+    """Tells every connected page about a load governor level change."""
+    with _bridge_sessions_lock:
+        targets = [session, BROADCAST.session] + list(BRIDGE_SESSIONS.values())
+    for target in targets:
+        target.publish({"action": "quality_level", "data": signal})
+
+GOVERNOR.listeners.append(broadcast_quality)
+
+@app.on_event("startup")
+def start_background_workers():
+    """Background threads (pool producers, load governor) run in the serving process only, not on import."""
+    get_scenario_pool().start()
+    game_engine.INSTANCE_POOL.start()
+    GOVERNOR.start()
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    GOVERNOR.stop()
+
 # --- Gradio App ---
 
+@app.get("/game", response_class=HTMLResponse)
+async def game_page():
+    """Game page for dev setups without a built dist/ (production uses the fingerprinted copy)."""
+    return HTMLResponse(render_game_page(), headers={"Cache-Control": "no-cache"})
+
+@lru_cache(maxsize=1)
 def get_game_iframe():
-    with open("ui/templates/game_interface.html", "r") as f:
-        html_content = f.read()
-    html_content = html_content.replace('../static/', '/static/')
-    html_content_escaped = html_content.replace('"', '&quot;')
-    
+    # Loaded by URL so the browser caches the page instead of re-shipping it in every Gradio load
     # Iframe is hidden initially
     iframe = f"""
     <iframe 
         id="game-iframe"
-        srcdoc="{html_content_escaped}"
+        src="{game_page_url()}"
         style="width: 100%; height: 50vh; border: none;"
         allow="autoplay; fullscreen"
     ></iframe>
     """
     return iframe
 
-def start_game_from_ui(case_name, mode, voice):
-    difficulty = "medium"
-    if "Coffee" in case_name: difficulty = "easy"
-    if "Gallery" in case_name: difficulty = "hard"
+def case_choices():
+    """Dropdown entries (label, case_id) from the scenario catalog, easiest first."""
+    order = {d: i for i, d in enumerate(DIFFICULTIES)}
+    entries = sorted(get_catalog().list(), key=lambda e: (order.get(e["difficulty"], len(order)), e["title"]))
+    choices = [(f"{e['title']} ({e['difficulty'].capitalize()})", e["id"]) for e in entries]
+    # Procedural cases only once the pool has one ready (otherwise "start" falls back to the catalog)
+    ready = get_scenario_pool().sizes() if get_scenario_pool().enabled else {}
+    choices += [(f"🎲 New Procedural Case ({d.capitalize()})", GENERATED_PREFIX + d) for d in DIFFICULTIES if ready.get(d)]
+    return choices
+
+def start_game_from_ui(case_id, mode, voice):
+    if "Watch" in mode:
+        # The featured game is already running server-side: the page just subscribes
+        return (
+            gr.update(visible=False),
+            gr.update(visible=True),
+            json.dumps({"action": "watch_broadcast", "data": {}}),
+            gr.update(), gr.update(), gr.update()
+        )
+    
+    entry = get_catalog().get_entry(case_id)
+    difficulty = entry["difficulty"] if entry else "medium"
+    if case_id and case_id.startswith(GENERATED_PREFIX):
+        difficulty = case_id[len(GENERATED_PREFIX):]
     
     mode_slug = "spectator" if "Spectator" in mode else "interactive"
     
-    init_data = session.start(difficulty, mode_slug, voice)
+    init_data = session.start(difficulty, mode_slug, voice, case_id=case_id)
     
     # Extract data for tools
-    phones = [s["phone_number"] for s in init_data["data"]["scenario"]["suspects"]]
-    cameras = init_data["data"]["available_cameras"]
-    suspects = [s["name"] for s in init_data["data"]["scenario"]["suspects"]]
+    state = init_data["data"]["state"]["set"]
+    phones = [s["phone_number"] for s in state["suspects"]]
+    cameras = state["available_cameras"]
+    suspects = [s["name"] for s in state["suspects"]]
     
     # Return visible updates
     return (
@@ -501,15 +1054,16 @@ with gr.Blocks(title="Murder.Ai") as demo:
             gr.Markdown("# 🕵️ MURDER.AI")
         
             gr.Markdown("### 1. Select Case File")
+            cases = case_choices()
             case_dropdown = gr.Dropdown(
-                choices=["The Silicon Valley Incident (Medium)", "The Coffee Shop Murder (Easy)", "The Gallery Heist (Hard)"],
-                value="The Silicon Valley Incident (Medium)",
+                choices=cases,
+                value="A47" if "A47" in get_catalog() else (cases[0][1] if cases else None),
                 show_label=False
             )
 
             gr.Markdown("### 2. Game Configuration")
             with gr.Row():
-                game_mode = gr.Radio(["Interactive", "AI Spectator (Beta)"], value="Interactive", label="Game Mode")
+                game_mode = gr.Radio(["Interactive", "AI Spectator (Beta)", "Watch Live (Featured Case)"], value="Interactive", label="Game Mode")
                 voice_toggle = gr.Checkbox(value=True, label="Enable Voice (ElevenLabs)")
 
             gr.Markdown("### 3. Investigation")
@@ -532,13 +1086,19 @@ with gr.Blocks(title="Murder.Ai") as demo:
     
     # Log Polling
     log_timer = gr.Timer(1, active=False)
+    log_cursor = gr.State(0)
     
-    def poll_logs():
-        return "".join(LOG_BUFFER)
+    def poll_logs(cursor):
+        # Only touch the textbox when something new arrived since the last poll
+        new_entries, next_cursor = TRAFFIC_LOG.since(cursor, session_id=session.session_id)
+        if not new_entries and cursor:
+            return gr.skip(), next_cursor
+        entries, _ = TRAFFIC_LOG.since(0, session_id=session.session_id, limit=50)
+        return "".join(format_entry(e) for e in entries), next_cursor
 
-    log_timer.tick(fn=poll_logs, outputs=log_box)
+    log_timer.tick(fn=poll_logs, inputs=log_cursor, outputs=[log_box, log_cursor])
     
-    refresh_logs_btn.click(fn=poll_logs, outputs=log_box)
+    refresh_logs_btn.click(fn=lambda: poll_logs(0), outputs=[log_box, log_cursor])
     
     def toggle_timer(active):
         return gr.Timer(active=active)
@@ -613,10 +1173,7 @@ with gr.Blocks(title="Murder.Ai") as demo:
         suspect = next((s for s in session.game.scenario["suspects"] if s["id"] == s_id), None)
         
         # Clean text
-        cleaned = resp
-        if cleaned.strip().startswith('(') and ')' in cleaned:
-            cleaned = cleaned[cleaned.find(')')+1:].strip()
-        cleaned = cleaned.replace('*', '').strip()
+        cleaned = clean_for_tts(resp)
         
         if suspect and "voice_id" in suspect and cleaned:
             audio_bytes = session.game.voice_manager.generate_audio(cleaned, suspect["voice_id"])
@@ -630,6 +1187,14 @@ with gr.Blocks(title="Murder.Ai") as demo:
 
     int_btn.click(wrap_chat, inputs=[int_suspect, int_q], outputs=[int_out_text, int_out_audio])
 
+    # Case list is rebuilt per page load: procedural cases appear once the pool has some
+    def refresh_cases(current):
+        choices = case_choices()
+        ids = [case_id for _, case_id in choices]
+        return gr.update(choices=choices, value=current if current in ids else (ids[0] if ids else None))
+
+    demo.load(refresh_cases, inputs=case_dropdown, outputs=case_dropdown)
+
     # Start Game Event
     start_btn.click(
         fn=start_game_from_ui,
@@ -0,0 +1,109 @@
+"""
+Startup-time benchmark.
+
+Imports each target module in a fresh interpreter several times and checks the
+median against a budget (milliseconds). Exits non-zero when a budget is blown.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 10 --importtime
+    STARTUP_BUDGET_APP_MS=6000 python benchmarks/bench_startup.py
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# module -> default budget in ms (override with STARTUP_BUDGET_<NAME>_MS)
+TARGETS = {
+    "game.game_engine": 300,
+    "app": 4000,
+}
+
+# Modules that must NOT be imported just by loading the game engine
+LAZY_MODULES = ("google.generativeai", "elevenlabs", "dotenv")
+
+def _budget(module):
+    env_name = "STARTUP_BUDGET_" + module.split(".")[-1].upper() + "_MS"
+    return float(os.getenv(env_name, TARGETS[module]))
+
+def time_import(module):
+    """Wall time (ms) to start an interpreter and import `module`."""
+    code = f"import {module}"
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, capture_output=True, text=True)
+    elapsed = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "import failed")
+    return elapsed
+
+def baseline_ms(runs):
+    """Bare interpreter start, subtracted so budgets only measure our imports."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], cwd=ROOT_DIR, capture_output=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def top_imports(module, limit=15):
+    """Most expensive imports reported by -X importtime (cumulative, us)."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT_DIR, capture_output=True, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            rows.append((int(cumulative_us), name.strip()))
+        except ValueError:
+            continue
+    return sorted(rows, reverse=True)[:limit]
+
+def lazy_violations():
+    """Returns the heavy provider modules that got imported by `import game.game_engine`."""
+    code = (
+        "import sys, game.game_engine\n"
+        f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, capture_output=True, text=True)
+    return [m for m in proc.stdout.strip().split(",") if m]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start import time against a budget.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--importtime", action="store_true", help="Show the slowest imports per target")
+    args = parser.parse_args()
+
+    base = baseline_ms(args.runs)
+    print(f"Interpreter baseline: {base:.0f} ms")
+    failed = False
+
+    for module in TARGETS:
+        budget = _budget(module)
+        try:
+            samples = [time_import(module) - base for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{module:<20} SKIPPED ({e})")
+            continue
+        median = statistics.median(samples)
+        status = "OK" if median <= budget else "OVER BUDGET"
+        failed = failed or median > budget
+        print(f"{module:<20} median {median:7.0f} ms  (min {min(samples):.0f}, max {max(samples):.0f}, budget {budget:.0f})  {status}")
+        if args.importtime:
+            for cumulative_us, name in top_imports(module):
+                print(f"    {cumulative_us / 1000:8.1f} ms  {name}")
+
+    eager = lazy_violations()
+    if eager:
+        print(f"Provider SDKs imported eagerly: {', '.join(eager)}")
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,73 @@
 import json
-import re
-from .llm_manager import LLMManager
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from .llm_manager import LLMManager, load_prompt, parse_json_response
+from . import metrics
+from .planner import Planner, PLANNER_ENABLED
+from mcp.tools import find_suspect_by_phone
+
+# Self-consistency: sample K decisions in parallel and keep the one most samples agree on.
+# 1 keeps the single-call behaviour.
+SAMPLES = int(os.getenv("AI_DETECTIVE_SAMPLES", "1"))
+SAMPLE_BUDGET = float(os.getenv("AI_DETECTIVE_BUDGET", "8")) # seconds to wait for votes
+SAMPLE_TEMPERATURE = 0.9 # Diversity between samples
+
+ACTIONS = ("use_tool", "chat", "accuse")
+ARG_NAMES = ("location", "phone_number", "evidence_id", "alibi_id", "question")
+
+# Common ways the model drifts from the contract -> what it meant
+ACTION_ALIASES = {"interrogate": "chat", "question": "chat", "ask": "chat", "tool": "use_tool"}
+ARG_ALIASES = {"camera": "location", "camera_name": "location", "phone": "phone_number", "item_id": "evidence_id", "evidence": "evidence_id"}
+
+def decision_schema(game):
+    """
+    The detective's action contract as a Gemini response_schema.
+    Enums come from the live game, so the model can only name real cameras and suspects.
+    """
+    from .game_engine import TOOL_NAMES
+    active = [s["id"] for s in game.scenario["suspects"] if s["id"] not in game.eliminated_suspects]
+    args = {name: {"type": "string"} for name in ARG_NAMES}
+    args["location"] = {"type": "string", "enum": list(game.scenario["evidence"]["footage_data"].keys())}
+    if game.unlocked_evidence:
+        args["evidence_id"] = {"type": "string", "enum": list(game.unlocked_evidence)}
+    return {
+        "type": "object",
+        "properties": {
+            "thought": {"type": "string"},
+            "action": {"type": "string", "enum": list(ACTIONS)},
+            "tool_name": {"type": "string", "enum": list(TOOL_NAMES)},
+            "args": {"type": "object", "properties": args},
+            "suspect_id": {"type": "string", "enum": active},
+            "message": {"type": "string"},
+        },
+        "required": ["thought", "action"],
+    }
+
+def decision_key(decision):
+    """What two decisions must share to count as the same vote (free text is ignored)."""
+    action = decision.get("action")
+    if action == "use_tool":
+        args = decision.get("args") or {}
+        target = args.get("location") or args.get("phone_number") or args.get("evidence_id") or args.get("alibi_id")
+        return (action, decision.get("tool_name"), str(target).lower())
+    return (action, decision.get("suspect_id"))
 
 class AIDetective:
     def __init__(self, game_instance):
         self.game = game_instance
-        self.llm = LLMManager()
+        self.llm = LLMManager(usage=game_instance.usage)
         # We reuse the LLMManager but we need to register the new prompt role dynamically
         # or just load it manually.
         self.prompt_template = self._load_prompt()
+        self.planner = Planner(game_instance) if PLANNER_ENABLED else None
         self.history = []
         self.memory = [] # Store structured past actions
 
     def _load_prompt(self):
         try:
-            with open("prompts/detective_player.txt", "r") as f:
-                return f.read()
+            return load_prompt("detective_player.txt")
         except:
             return "Error loading prompt."
 
@@ -27,10 +79,223 @@ class AIDetective:
         if len(self.memory) > 5:
             self.memory.pop(0)
 
+    def validate_decision(self, decision):
+        """Returns a list of problems with a decision against the live game (empty when playable)."""
+        from .game_engine import TOOL_COSTS
+        if not isinstance(decision, dict):
+            return ["not an object"]
+        
+        scenario = self.game.scenario
+        active = [s["id"] for s in scenario["suspects"] if s["id"] not in self.game.eliminated_suspects]
+        action = decision.get("action")
+        
+        if action in ("chat", "accuse"):
+            errors = []
+            if decision.get("suspect_id") not in active:
+                errors.append(f"unknown or eliminated suspect {decision.get('suspect_id')}")
+            if action == "chat" and not str(decision.get("message") or "").strip():
+                errors.append("empty message")
+            return errors
+        
+        if action != "use_tool":
+            return [f"unknown action {action}"]
+        
+        tool_name = decision.get("tool_name")
+        args = decision.get("args")
+        if tool_name not in TOOL_COSTS:
+            return [f"unknown tool {tool_name}"]
+        if not isinstance(args, dict):
+            return ["args must be an object"]
+        if TOOL_COSTS[tool_name] > self.game.points:
+            return [f"{tool_name} costs {TOOL_COSTS[tool_name]} pts, {self.game.points} left"]
+        
+        if tool_name == "get_location":
+            if not find_suspect_by_phone(scenario, args.get("phone_number")):
+                return [f"unknown phone {args.get('phone_number')}"]
+        elif tool_name == "get_footage":
+            # Same fuzzy match as mcp.tools.get_footage
+            location = str(args.get("location") or "").lower()
+            cameras = scenario["evidence"]["footage_data"].keys()
+            if not location or not any(location in c.lower() or c.lower() in location for c in cameras):
+                return [f"unknown camera {args.get('location')}"]
+        elif tool_name == "get_dna_test":
+            if args.get("evidence_id") not in self.game.unlocked_evidence:
+                return [f"evidence {args.get('evidence_id')} is not unlocked"]
+        elif tool_name == "call_alibi":
+            alibi_ids = [s.get("alibi_id") for s in scenario["suspects"]]
+            if args.get("alibi_id") not in alibi_ids and not find_suspect_by_phone(scenario, args.get("phone_number")):
+                return [f"unknown alibi {args.get('alibi_id')}"]
+        return []
+
+    def fallback_decision(self):
+        """A move that is always valid: unseen footage, then untested DNA, then questioning."""
+        from .game_engine import TOOL_COSTS
+        used = [e.get("_input_args", {}) for e in self.game.evidence_revealed if isinstance(e, dict)]
+        watched = {str(a.get("location")).lower() for a in used if "location" in a}
+        tested = {a.get("evidence_id") for a in used if "evidence_id" in a}
+        
+        if self.game.points >= TOOL_COSTS["get_footage"]:
+            for camera in self.game.scenario["evidence"]["footage_data"]:
+                if camera.lower() not in watched:
+                    return {
+                        "thought": "I need more to go on. Let me check the security footage.",
+                        "action": "use_tool",
+                        "tool_name": "get_footage",
+                        "args": {"location": camera}
+                    }
+        if self.game.points >= TOOL_COSTS["get_dna_test"]:
+            for item_id in self.game.unlocked_evidence:
+                if item_id not in tested:
+                    return {
+                        "thought": "This item could carry DNA. Sending it to the lab.",
+                        "action": "use_tool",
+                        "tool_name": "get_dna_test",
+                        "args": {"evidence_id": item_id}
+                    }
+        suspects = self.game.scenario["suspects"]
+        suspect = next((s for s in suspects if s["id"] not in self.game.eliminated_suspects), suspects[0])
+        return {
+            "thought": "I'll press a suspect for their story.",
+            "action": "chat",
+            "suspect_id": suspect["id"],
+            "message": f"Walk me through where you were around {self.game.scenario['victim']['time_of_death']}."
+        }
+
+    def _parse_decision(self, response_text):
+        """Model reply -> decision dict, or None if it can't be read."""
+        try:
+            # First complete JSON object; code fences, chatter and later braces are ignored
+            decision = parse_json_response(response_text)
+            if not isinstance(decision, dict):
+                raise ValueError("Decision is not an object")
+            return decision
+        except Exception as e:
+            print(f"AI Detective Error: {e} | Response: {response_text}")
+            metrics.DETECTIVE_PARSE_FALLBACKS.inc()
+            return None
+
+    def repair_decision(self, decision):
+        """
+        Cheap, local fixes for near-miss decisions (no extra LLM call): aliased action and
+        argument names, arguments at the top level, tools named as the action, suspects
+        named instead of id'd, camera/item names instead of keys. Returns a new dict.
+        """
+        from .game_engine import TOOL_NAMES
+        decision = dict(decision)
+        scenario = self.game.scenario
+        
+        action = str(decision.get("action") or "").strip().lower()
+        action = ACTION_ALIASES.get(action, action)
+        if action in TOOL_NAMES:
+            decision.setdefault("tool_name", action)
+            action = "use_tool"
+        decision["action"] = action
+        
+        if action == "use_tool":
+            args = dict(decision.get("args") or {})
+            for key, value in decision.items():
+                if (key in ARG_NAMES or key in ARG_ALIASES) and key not in args:
+                    args[key] = value
+            for alias, key in ARG_ALIASES.items():
+                if alias in args and key not in args:
+                    args[key] = args.pop(alias)
+            
+            location = str(args.get("location") or "").lower()
+            if location:
+                cameras = scenario["evidence"]["footage_data"].keys()
+                match = next((c for c in cameras if c.lower() == location.replace(" ", "_")), None)
+                match = match or next((c for c in cameras if location in c.lower() or c.lower() in location), None)
+                if match:
+                    args["location"] = match
+            evidence_id = args.get("evidence_id")
+            if evidence_id and evidence_id not in self.game.unlocked_evidence:
+                dna = scenario["evidence"]["dna_evidence"]
+                target = str(evidence_id).lower()
+                args["evidence_id"] = next(
+                    (k for k in self.game.unlocked_evidence if str(dna.get(k, {}).get("label", "")).lower() == target),
+                    evidence_id
+                )
+            decision["args"] = args
+        else:
+            suspect_id = decision.get("suspect_id")
+            ids = [s["id"] for s in scenario["suspects"]]
+            if suspect_id not in ids and suspect_id:
+                target = str(suspect_id).lower()
+                decision["suspect_id"] = next(
+                    (s["id"] for s in scenario["suspects"] if s["name"].lower() == target or s["name"].lower().split()[0] == target),
+                    suspect_id
+                )
+        return decision
+
+    def _sample(self, prompt, generation_config=None):
+        """One model call -> a valid decision, or None."""
+        decision = self._parse_decision(self.llm.get_response_raw(prompt, generation_config=generation_config))
+        if decision is None:
+            return None
+        errors = self.validate_decision(decision)
+        if errors:
+            repaired = self.repair_decision(decision)
+            if not self.validate_decision(repaired):
+                metrics.DETECTIVE_REPAIRS.inc()
+                return repaired
+            decision = repaired
+            errors = self.validate_decision(decision)
+        if errors:
+            print(f"AI Detective: rejected {decision_key(decision)}: {'; '.join(errors)}")
+            metrics.DETECTIVE_INVALID_DECISIONS.inc()
+            return None
+        return decision
+
+    def _vote(self, prompt, samples, budget):
+        """
+        Samples `samples` decisions concurrently. Returns as soon as one decision has a
+        majority, otherwise the most common valid decision once all samples are in or
+        the budget runs out (ties go to the earliest). None if nothing valid arrived.
+        """
+        pool = ThreadPoolExecutor(max_workers=samples, thread_name_prefix="detective-sample")
+        config = dict(self._generation_config(), temperature=SAMPLE_TEMPERATURE)
+        pending = {pool.submit(self._sample, prompt, config) for _ in range(samples)}
+        votes = Counter()
+        first_seen = {}
+        deadline = time.monotonic() + budget
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=max(0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+                if not done:
+                    break # Budget spent: go with what we have
+                for future in done:
+                    decision = future.result()
+                    if decision is None:
+                        continue
+                    key = decision_key(decision)
+                    votes[key] += 1
+                    first_seen.setdefault(key, decision)
+                    if votes[key] * 2 > samples:
+                        return decision
+        finally:
+            # Stragglers finish in the background; nobody waits for them
+            pool.shutdown(wait=False, cancel_futures=True)
+        if not votes:
+            return None
+        best = max(votes.values())
+        return next(first_seen[key] for key in first_seen if votes[key] == best)
+
+    def _generation_config(self):
+        """Structured output: the reply must be JSON matching decision_schema()."""
+        return {"response_mime_type": "application/json", "response_schema": decision_schema(self.game)}
+
     def decide_next_move(self):
         """
         Analyzes game state and returns a JSON action.
+        Routine moves come from the planner without an LLM call.
+        Decisions are checked against the live game; invalid ones never reach use_tool.
         """
+        if self.planner:
+            decision = self.planner.plan()
+            if decision and not self.validate_decision(decision):
+                metrics.DETECTIVE_PLANNED.inc(action=decision["action"])
+                return decision
+        
         # 1. Construct Context
         evidence_list = [f"{e.get('title', e.get('info', 'Evidence'))}: {e.get('html_content', e.get('description', str(e)))}" for e in self.game.evidence_revealed]
         evidence_summary = "; ".join(evidence_list) if evidence_list else "None"
@@ -62,7 +327,8 @@ class AIDetective:
             # Tool Hints
             cameras=", ".join(cameras),
             suspect_phones="\n".join(suspect_phones),
-            unlocked_items=", ".join(unlocked_items)
+            unlocked_items=", ".join(unlocked_items),
+            contradictions=self.game.facts.describe_contradictions()
         )
         
         # 2. Call LLM
@@ -81,23 +347,15 @@ class AIDetective:
         # Direct generation using the underlying model logic would be cleaner, 
         # but we'll use the existing abstraction.
         # We will send the ENTIRE prompt as the message.
-        response_text = self.llm.get_response_raw(prompt)
+        # 3. Parse and validate (optionally several samples voting)
+        if SAMPLES > 1:
+            decision = self._vote(prompt, SAMPLES, SAMPLE_BUDGET)
+        else:
+            decision = self._sample(prompt, self._generation_config())
         
-        # 3. Parse JSON
-        try:
-            # Extract JSON from code blocks if present
-            json_match = re.search(r"\{.*\}", response_text, re.DOTALL)
-            if json_match:
-                response_text = json_match.group(0)
-            
-            action = json.loads(response_text)
-            return action
-        except Exception as e:
-            print(f"AI Detective Error: {e} | Response: {response_text}")
-            # Fallback action
-            return {
-                "thought": "I am confused. I will check the footage.",
-                "action": "use_tool",
-                "tool_name": "get_footage",
-                "args": {"location": "10th_floor_camera"}
-            }
+        if decision is None:
+            # Fallback action (always valid for this case)
+            metrics.DETECTIVE_DECISIONS.inc(action="fallback")
+            return self.fallback_decision()
+        metrics.DETECTIVE_DECISIONS.inc(action=str(decision.get("action")))
+        return decision
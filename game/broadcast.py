@@ -0,0 +1,71 @@
+import threading
+from collections import deque
+
+class Channel:
+    """
+    Pub/sub channel with a compact catch-up log, for one game watched by many.
+
+    Every published message gets a sequence number and goes to all live
+    subscribers. The log keeps only the last `history` replayable messages (AI
+    steps, with their small state patches). A viewer that is further behind, or
+    new, first gets `snapshot()` (the game with its full current state), then the
+    backlog marked "replay", then live messages.
+    """
+
+    def __init__(self, snapshot, history=50, replay_actions=None):
+        self.snapshot = snapshot
+        self.replay_actions = replay_actions # None: everything is replayable
+        self.seq = 0
+        self.log = deque(maxlen=history)
+        self.subscribers = set()
+        self._base = 0 # Viewers at or past this seq can catch up from the log alone
+        self._lock = threading.Lock()
+
+    @property
+    def viewers(self):
+        return len(self.subscribers)
+
+    def publish(self, message):
+        # Delivered under the lock so catch-up and live messages never interleave;
+        # subscribers must not block (they queue, like the WebSocket push)
+        with self._lock:
+            self.seq += 1
+            message = dict(message, seq=self.seq)
+            if message.get("action") == "init_game":
+                self.log.clear() # New game: the old backlog no longer applies
+                self._base = self.seq
+            elif self.replay_actions is None or message.get("action") in self.replay_actions:
+                if len(self.log) == self.log.maxlen:
+                    self._base = self.log[0]["seq"]
+                self.log.append(message)
+            for callback in list(self.subscribers):
+                try:
+                    callback(message)
+                except Exception as e:
+                    print(f"Broadcast Error: subscriber failed: {e}")
+
+    def catch_up(self, since=0):
+        """What a viewer that has seen everything up to `since` needs (see class docstring)."""
+        with self._lock:
+            return self._catch_up(since)
+
+    def _catch_up(self, since):
+        if since and since >= self.seq:
+            return []
+        backlog = [dict(m, replay=True) for m in self.log if m["seq"] > since]
+        if since and since >= self._base:
+            return backlog
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return backlog
+        return [dict(snapshot, seq=self.seq, replay=True)] + backlog
+
+    def subscribe(self, callback, since=0):
+        with self._lock:
+            for message in self._catch_up(since):
+                callback(message)
+            self.subscribers.add(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            self.subscribers.discard(callback)
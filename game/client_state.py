@@ -0,0 +1,108 @@
+import threading
+from collections import deque
+
+# What the game page is allowed to know about a case.
+# Anything not listed here (is_murderer, true_location, motive, the evidence
+# tree...) stays on the server.
+PUBLIC_VICTIM_FIELDS = ("name", "age", "occupation", "time_of_death", "location")
+PUBLIC_SUSPECT_FIELDS = ("id", "name", "role", "gender", "phone_number")
+
+def project_state(game):
+    """Player-visible view of a game. Small, JSON-ready, and free of answers."""
+    scenario = game.scenario
+    evidence = scenario["evidence"]
+    victim = scenario["victim"]
+    dna = evidence["dna_evidence"]
+    return {
+        "title": scenario["title"],
+        "victim": {k: victim.get(k) for k in PUBLIC_VICTIM_FIELDS},
+        "suspects": [{k: s.get(k) for k in PUBLIC_SUSPECT_FIELDS} for s in scenario["suspects"]],
+        "round": game.round,
+        "points": game.points,
+        "available_cameras": list(evidence["footage_data"].keys()),
+        # Labels only for items the player has unlocked
+        "dna_map": {k: dna[k].get("label", k) for k in game.unlocked_evidence if k in dna},
+        "unlocked_evidence": list(game.unlocked_evidence),
+        "eliminated": list(game.eliminated_suspects),
+        # Raised only by evidence the player has already uncovered
+        "contradictions": list(game.facts.contradictions),
+        "game_over": game.game_over,
+    }
+
+def diff_state(old, new):
+    """
+    Top-level patch turning `old` into `new`:
+    {"set": {key: value}, "append": {key: [items]}, "unset": [keys]}.
+    Lists that only grew are sent as their new tail.
+    """
+    patch = {}
+    for key, value in new.items():
+        if key in old and old[key] == value:
+            continue
+        previous = old.get(key)
+        if isinstance(value, list) and isinstance(previous, list) and value[:len(previous)] == previous:
+            patch.setdefault("append", {})[key] = value[len(previous):]
+        else:
+            patch.setdefault("set", {})[key] = value
+    removed = [key for key in old if key not in new]
+    if removed:
+        patch["unset"] = removed
+    return patch
+
+def apply_patch(state, patch):
+    """Applies a patch from diff_state (mirrors applyStatePatch in game_logic.js)."""
+    if patch.get("reset"):
+        return dict(patch.get("set", {}))
+    state = dict(state)
+    state.update(patch.get("set", {}))
+    for key, items in patch.get("append", {}).items():
+        state[key] = list(state.get(key, [])) + items
+    for key in patch.get("unset", []):
+        state.pop(key, None)
+    return state
+
+class StateTracker:
+    """
+    Versioned projection of one game.
+
+    `update()` is called after every bridge action; when the projection changed
+    the version is bumped and a patch {"from", "version", ...} is returned.
+    Clients that fell behind ask `since(their_version)`: they get a patch from a
+    recent snapshot, or a full reset when their version is too old.
+    """
+
+    def __init__(self, game, history=16):
+        self.game = game
+        self.version = 1
+        self._state = project_state(game)
+        self._history = deque([(1, self._state)], maxlen=history) # (version, snapshot)
+        self._lock = threading.Lock()
+
+    def full(self):
+        with self._lock:
+            return {"from": None, "version": self.version, "reset": True, "set": self._state}
+
+    def update(self):
+        """Re-projects the game. Returns the patch since the last version, or None if nothing changed."""
+        state = project_state(self.game)
+        with self._lock:
+            patch = diff_state(self._state, state)
+            if not patch:
+                return None
+            patch["from"] = self.version
+            self.version += 1
+            patch["version"] = self.version
+            self._state = state
+            self._history.append((self.version, state))
+        return patch
+
+    def since(self, version):
+        """Patch from a client's version to the current one (a full reset if unknown)."""
+        with self._lock:
+            for known_version, snapshot in self._history:
+                if known_version == version:
+                    patch = diff_state(snapshot, self._state)
+                    patch["from"] = version
+                    patch["version"] = self.version
+                    return patch
+        return self.full()
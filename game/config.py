@@ -0,0 +1,21 @@
+import os
+
+# Project root (one level above game/)
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_ENV_LOADED = False
+
+def load_env():
+    """
+    Loads .env once. python-dotenv is only imported when a .env file exists,
+    so deployments that set real environment variables never pay for it.
+    """
+    global _ENV_LOADED
+    if _ENV_LOADED:
+        return
+    _ENV_LOADED = True
+    for path in (os.path.join(os.getcwd(), ".env"), os.path.join(ROOT_DIR, ".env")):
+        if os.path.exists(path):
+            from dotenv import load_dotenv
+            load_dotenv(path)
+            break
@@ -0,0 +1,287 @@
+import re
+import threading
+from bisect import bisect_left, bisect_right, insort
+from mcp.tools import find_suspect_by_phone
+
+# Coarse kinds of place, so "Dinner with friends" and "Downtown Restaurant" agree
+# while "At home watching Netflix" and "Crime scene" do not. Each case adds a
+# "scene" kind from its own camera names.
+PLACE_KINDS = {
+    "home": ("home", "house", "apartment", "flat", "netflix", "bed", "sleeping", "gaming"),
+    "dining": ("restaurant", "dinner", "lunch", "cafe", "bar", "pub", "diner"),
+    "travel": ("airport", "flight", "plane", "lounge", "terminal", "sfo", "bus", "train", "station", "taxi"),
+    "gym": ("gym", "workout", "training"),
+    "bank": ("bank", "deposit", "atm"),
+    "scene": ("crime scene",),
+}
+
+# Claims about a place closer than this many minutes are compared
+DEFAULT_WINDOW = 15
+
+_TIME = re.compile(r"\b(\d{1,2})(?::(\d{2}))?(?:\s*([ap])\.?m\b\.?)?", re.I)
+# Testimony is only taken as a claim about the speaker's own whereabouts: they are
+# the subject ("my brother went to..." is not), and it isn't denied ("never", "wasn't")
+_FIRST_PERSON = re.compile(r"\b(i|i'm|i've|i'd|i'll|we|we're|we've|we'd)\b", re.I)
+_THIRD_PERSON = re.compile(r"\b(he|she|they|he's|she's|they're|him|her|them|his|their)\b", re.I)
+_NEGATION = re.compile(r"\b(no|not|never|nowhere|nobody|neither|nor)\b|n't\b", re.I)
+_VAGUE_TIME = re.compile(r"\b(earlier|later|before|after|afterwards)\b", re.I)
+
+def parse_times(text, meridiem=None):
+    """Minutes after midnight for each time in text ("8:47 PM", "9pm", or "8:43" given a `meridiem`)."""
+    times = []
+    for hour, minute, half in _TIME.findall(text or ""):
+        half = half or (meridiem if minute else None)
+        if half:
+            times.append(_to_minutes(int(hour), int(minute or 0), half))
+    return times
+
+def _to_minutes(hour, minute, half):
+    hour = hour % 12 + (12 if half.lower().startswith("p") else 0)
+    return hour * 60 + minute
+
+def format_time(minutes):
+    if minutes is None:
+        return None
+    hour, minute = divmod(minutes, 60)
+    return f"{(hour - 1) % 12 + 1}:{minute:02d} {'PM' if hour >= 12 else 'AM'}"
+
+def _meridiem(text):
+    match = re.search(r"\b([ap])\.?m\b", text or "", re.I)
+    return match.group(1) if match else None
+
+def _camera_place(camera):
+    return re.sub(r"[_\s]+(cam|camera)$", "", camera).replace("_", " ")
+
+class FactIndex:
+    """
+    Structured claims extracted from testimony and tool results as they arrive,
+    indexed by suspect and time, with contradictions flagged on insert.
+
+    A claim is "stated" (alibi story, testimony) or observed (phone location,
+    footage, DNA, alibi contacts). A stated claim contradicts an observed one (or
+    a later story) when both name a kind of place, the kinds differ, and their
+    times are within `window` minutes. Places of unknown kind are never flagged.
+    """
+
+    def __init__(self, scenario, window=DEFAULT_WINDOW):
+        self.scenario = scenario
+        self.window = window
+        self.by_suspect = {s["id"]: [] for s in scenario["suspects"]}
+        self.by_time = [] # (minutes, claim id), sorted
+        self._longest = 0 # Longest claim span in minutes (bounds the by_time search)
+        self.claims_by_id = {}
+        self.contradictions = []
+        self._pairs = set()
+        self._lock = threading.Lock()
+
+        victim = scenario["victim"]
+        self.time_of_death = (parse_times(victim.get("time_of_death")) or [None])[0]
+        scene = list(PLACE_KINDS["scene"])
+        scene += [_camera_place(c).lower() for c in scenario.get("evidence", {}).get("footage_data", {})]
+        if victim.get("location"):
+            scene.append(victim["location"].lower())
+        self.place_kinds = dict(PLACE_KINDS, scene=tuple(scene))
+        self._patterns = {
+            kind: re.compile(r"\b(" + "|".join(re.escape(w) for w in words) + r")\b", re.I)
+            for kind, words in self.place_kinds.items()
+        }
+        # Who a line of footage can refer to: full name, first name, or "Suspect N"
+        self._names = []
+        for s in scenario["suspects"]:
+            number = s["id"].rsplit("_", 1)[-1]
+            for alias in (s["name"], s["name"].split()[0], f"suspect {number}"):
+                self._names.append((re.compile(r"\b" + re.escape(alias) + r"\b", re.I), s["id"]))
+
+        for s in scenario["suspects"]:
+            if s.get("alibi_story"):
+                self._add(s["id"], "alibi", s["alibi_story"], s["alibi_story"], self.time_of_death, stated=True)
+
+    def place_kinds_of(self, text):
+        return {kind for kind, pattern in self._patterns.items() if pattern.search(text or "")}
+
+    def suspects_in(self, text):
+        found = []
+        for pattern, suspect_id in self._names:
+            if pattern.search(text) and suspect_id not in found:
+                found.append(suspect_id)
+        return found
+
+    # --- Ingest ---
+
+    def add_testimony(self, suspect_id, text):
+        """
+        Sentences of a suspect's reply that place the speaker somewhere. Denials and
+        sentences about anyone else are skipped. Returns new contradictions.
+        """
+        if suspect_id not in self.by_suspect or not text:
+            return []
+        new = []
+        for sentence in re.split(r"(?<=[.!?])\s+", text):
+            if not _FIRST_PERSON.search(sentence) or not self.place_kinds_of(sentence):
+                continue
+            if _NEGATION.search(sentence) or self._mentions_others(suspect_id, sentence):
+                continue
+            # Unless they say when, a story is about the time of the murder
+            times = parse_times(sentence)
+            if not times and _VAGUE_TIME.search(sentence):
+                continue
+            new += self._add(suspect_id, "testimony", sentence.strip()[:160], sentence, (times or [self.time_of_death])[0], stated=True)
+        return new
+
+    def add_tool_result(self, tool_name, args, result):
+        """Claims from a successful tool result. Returns new contradictions."""
+        if not isinstance(result, dict) or "error" in result:
+            return []
+        args = args or {}
+        if tool_name == "get_location":
+            return self._add_location(args, result)
+        if tool_name == "get_footage":
+            return self._add_footage(result)
+        if tool_name == "get_dna_test":
+            return self._add_dna(result)
+        if tool_name == "call_alibi":
+            return self._add_alibi_call(args, result)
+        return []
+
+    def _mentions_others(self, suspect_id, sentence):
+        return bool(_THIRD_PERSON.search(sentence)) or any(s != suspect_id for s in self.suspects_in(sentence))
+
+    def _add_location(self, args, result):
+        suspect_id = find_suspect_by_phone(self.scenario, args.get("phone_number"))
+        if suspect_id not in self.by_suspect:
+            return []
+        points = []
+        if "timestamp" in result:
+            points.append((result["timestamp"], result.get("description", "")))
+        for line in result.get("history", []):
+            stamp, _, place = line.partition(": ")
+            points.append((stamp, place))
+        new = []
+        for stamp, place in points:
+            times = parse_times(stamp)
+            new += self._add(suspect_id, "phone", f"phone at {place}", place, times[0] if times else None)
+        return new
+
+    def _add_footage(self, result):
+        camera = result.get("location", "")
+        place = _camera_place(camera)
+        time_range = result.get("time_range") or ""
+        meridiem = _meridiem(time_range)
+        span = parse_times(time_range, meridiem)
+        new = []
+        for line in list(result.get("visible_people", [])) + [result.get("key_details") or ""]:
+            suspect_ids = self.suspects_in(line)
+            if not suspect_ids:
+                continue
+            times = parse_times(line, meridiem)
+            if times:
+                start = end = times[0]
+            elif _VAGUE_TIME.search(line) or not span:
+                start = end = None
+            else:
+                start, end = span[0], span[-1]
+            for suspect_id in suspect_ids:
+                new += self._add(suspect_id, "footage", f"{place} camera: {line}", place, start, until=end)
+        return new
+
+    def _add_dna(self, result):
+        label = result.get("evidence_id", "")
+        dna = self.scenario.get("evidence", {}).get("dna_evidence", {}).get(label, {})
+        names = result.get("matches") or [result.get("primary_match")]
+        new = []
+        for name in names:
+            for suspect_id in self.suspects_in(name or ""):
+                new += self._add(suspect_id, "dna", f"DNA on {dna.get('label', label)}", dna.get("label", label), None)
+        return new
+
+    def _add_alibi_call(self, args, result):
+        suspect = next((s for s in self.scenario["suspects"] if s.get("alibi_id") == args.get("alibi_id")), None)
+        if suspect is None:
+            return []
+        text = f"{result.get('contact_name', 'Contact')} ({result.get('confidence', 'Unknown')}): {result.get('response', '')}"
+        # Third-party accounts are kept for reference but not compared
+        self._add(suspect["id"], "alibi_call", text[:200], None, None)
+        return []
+
+    def _add(self, suspect_id, kind, text, place, time, stated=False, until=None):
+        claim = {
+            "suspect_id": suspect_id,
+            "kind": kind,
+            "stated": stated,
+            "text": text,
+            "place": place,
+            "kinds": sorted(self.place_kinds_of(place)) if place else [],
+            "time": time,
+            "until": time if until is None else until,
+        }
+        with self._lock:
+            claim["id"] = len(self.claims_by_id)
+            self.claims_by_id[claim["id"]] = claim
+            self.by_suspect[suspect_id].append(claim)
+            if time is not None:
+                insort(self.by_time, (time, claim["id"]))
+                self._longest = max(self._longest, claim["until"] - time)
+            new = []
+            for other in self.by_suspect[suspect_id][:-1]:
+                contradiction = self._check(other, claim)
+                if contradiction:
+                    self.contradictions.append(contradiction)
+                    new.append(contradiction)
+        return new
+
+    def _check(self, a, b):
+        if not (a["stated"] or b["stated"]):
+            return None # Evidence never contradicts evidence here
+        stated, observed = (a, b) if a["stated"] else (b, a)
+        if not (stated["kinds"] and observed["kinds"]) or set(stated["kinds"]) & set(observed["kinds"]):
+            return None
+        if stated["time"] is None or observed["time"] is None:
+            return None
+        if observed["time"] - self.window > stated["until"] or stated["time"] - self.window > observed["until"]:
+            return None
+        pair = (min(a["id"], b["id"]), max(a["id"], b["id"]))
+        if pair in self._pairs:
+            return None
+        self._pairs.add(pair)
+        return {
+            "suspect_id": stated["suspect_id"],
+            "time": format_time(observed["time"]),
+            "claim": stated["text"],
+            "evidence": observed["text"],
+            "source": observed["kind"], # phone, footage, or testimony (a changed story)
+        }
+
+    # --- Queries ---
+
+    def claims(self, suspect_id=None, kind=None):
+        with self._lock:
+            pool = self.by_suspect.get(suspect_id, []) if suspect_id else list(self.claims_by_id.values())
+            return [c for c in pool if kind is None or c["kind"] == kind]
+
+    def around(self, time, window=None):
+        """Claims about any suspect within `window` minutes of `time` (minutes or "8:47 PM")."""
+        if isinstance(time, str):
+            time = (parse_times(time) or [None])[0]
+        if time is None:
+            return []
+        window = self.window if window is None else window
+        with self._lock:
+            # Starts within reach of `time`; a span can reach back at most _longest minutes
+            lo = bisect_left(self.by_time, (time - window - self._longest, -1))
+            hi = bisect_right(self.by_time, (time + window, float("inf")))
+            claims = [self.claims_by_id[claim_id] for _, claim_id in self.by_time[lo:hi]]
+        return [c for c in claims if time <= c["until"] + window]
+
+    def contradictions_for(self, suspect_id):
+        with self._lock:
+            return [c for c in self.contradictions if c["suspect_id"] == suspect_id]
+
+    def describe_contradictions(self):
+        """One line per contradiction (for prompts)."""
+        names = {s["id"]: s["name"] for s in self.scenario["suspects"]}
+        with self._lock:
+            lines = [
+                f"{names.get(c['suspect_id'], c['suspect_id'])} ({c['suspect_id']}) said \"{c['claim']}\" but at {c['time']}: {c['evidence']}"
+                for c in self.contradictions
+            ]
+        return "\n".join(lines) if lines else "None yet."
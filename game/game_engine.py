@@ -1,16 +1,36 @@
+import os
+import math
 import uuid
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from .scenario_generator import generate_crime_scenario
 from .llm_manager import LLMManager
 from .voice_manager import VoiceManager
 from .ai_detective import AIDetective
+from .fact_index import FactIndex
+from . import metrics
+from .usage import session_usage
+from .load_governor import GOVERNOR
 from mcp import tools
 
+TOOL_NAMES = ("get_location", "get_footage", "get_dna_test", "call_alibi")
+TOOL_COSTS = {"get_location": 2, "get_footage": 3, "get_dna_test": 4, "call_alibi": 1}
+
+# Suspects questioned at once in a line-up (each has its own chat session)
+LINEUP_WORKERS = int(os.getenv("LINEUP_WORKERS", "8"))
+
+# Background warm-ups started when the player selects a suspect (shared by all games)
+PREFETCH_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("PREFETCH_WORKERS", "4")), thread_name_prefix="prefetch")
+
 class GameInstance:
-    def __init__(self, difficulty="medium"):
+    def __init__(self, difficulty="medium", case_id=None):
         self.id = str(uuid.uuid4())
-        self.scenario = generate_crime_scenario(difficulty)
-        self.llm_manager = LLMManager()
-        self.voice_manager = VoiceManager()
+        self.scenario = generate_crime_scenario(difficulty, case_id)
+        self.usage = session_usage() # Tokens and TTS characters spent by this game (with budgets)
+        self.llm_manager = LLMManager(usage=self.usage)
+        self.voice_manager = VoiceManager(usage=self.usage)
         self.ai_detective = None # Initialized later to avoid circular dep issues if any, or just now.
         
         self.round = 1
@@ -22,8 +42,12 @@ class GameInstance:
         self.verdict_correct = False
         self.eliminated_suspects = []
         self.unlocked_evidence = [] # Track unlocked DNA items
+        self.facts = FactIndex(self.scenario) # Claims from testimony and tools, with contradictions
+        
+        self._prefetched = set() # Suspects already warmed by prefetch_suspect
+        self._prefetch_lock = threading.Lock()
         
-        # Initialize Agents
+        # Initialize Agents (built lazily, on first question or prefetch)
         self._init_agents()
         self.ai_detective = AIDetective(self)
         
@@ -81,7 +105,7 @@ class GameInstance:
             "location": self.scenario["evidence"]["location_data"].get("suspect_1_phone", {}).get("8:47 PM", {}).get("location", "Unknown"), # Approximate
             "investigation_state": "Initial briefing."
         }
-        self.llm_manager.create_agent("detective", "detective", detective_context)
+        self.llm_manager.define_agent("detective", "detective", detective_context)
         
         # 2. Suspects
         for i, suspect in enumerate(self.scenario["suspects"]):
@@ -112,7 +136,60 @@ class GameInstance:
                 "motive": suspect["motive"]
             }
             
-            self.llm_manager.create_agent(suspect["id"], role, context)
+            self.llm_manager.define_agent(suspect["id"], role, context)
+
+    def warm_up_voices(self, char_budget=None):
+        """
+        Kicks off background synthesis of each suspect's scripted `opening_lines` in
+        their voice. Never blocks. Returns None (and spends nothing) when the case
+        scripts no lines: replies are LLM-written, so there is nothing else to predict.
+        """
+        if char_budget is None:
+            char_budget = int(os.getenv("VOICE_WARMUP_CHARS", "400"))
+        lines = [
+            (text, suspect["voice_id"])
+            for suspect in self.scenario["suspects"] if suspect.get("voice_id")
+            for text in suspect.get("opening_lines", [])
+        ]
+        if not lines:
+            return None
+        return self.voice_manager.prefetch(lines, char_budget)
+
+    def prefetch_suspect(self, suspect_id, voice=False):
+        """
+        Hint that the player is about to question a suspect: builds their agent (and its
+        cached context) and opens the voice client in the background, so the first
+        question skips that setup. Returns the future, or None if there is nothing to do.
+        """
+        if self.game_over or not any(s["id"] == suspect_id for s in self.scenario["suspects"]):
+            return None
+        key = (suspect_id, bool(voice))
+        with self._prefetch_lock:
+            if key in self._prefetched:
+                return None
+            self._prefetched.add(key)
+        return PREFETCH_POOL.submit(self._prefetch, suspect_id, voice)
+
+    def _prefetch(self, suspect_id, voice):
+        start = time.perf_counter()
+        try:
+            self.llm_manager.get_agent(suspect_id)
+            if voice and GOVERNOR.voice_enabled():
+                self.voice_manager.warm_up()
+            metrics.PREFETCHES.inc(outcome="ok")
+        except Exception as e:
+            print(f"Prefetch Error: {suspect_id}: {e}")
+            metrics.PREFETCHES.inc(outcome="error")
+        finally:
+            metrics.PREFETCH_LATENCY.observe(time.perf_counter() - start)
+
+    def usage_report(self):
+        """Game spend with a per-agent token breakdown (for the traffic log)."""
+        report = self.usage.snapshot()
+        agents = dict(self.llm_manager.agents)
+        report["agents"] = {agent_id: agent.usage.total_tokens for agent_id, agent in agents.items()}
+        report["agents"]["ai_detective"] = self.ai_detective.llm.raw_usage.total_tokens
+        return report
 
     def log_event(self, speaker, message):
         self.logs.append({"speaker": speaker, "message": message})
@@ -129,22 +206,52 @@ class GameInstance:
         # 2. Suspect responds
         response = self.llm_manager.get_response(suspect_id, question)
         self.log_event(suspect_name, response)
+        self.facts.add_testimony(suspect_id, response)
         
         return response
 
+    def question_all(self, question, on_answer=None):
+        """
+        Line-up: asks every suspect still in play the same question concurrently.
+        on_answer(suspect_id, response) is called as each answer arrives, fastest first.
+        Returns {suspect_id: response} in line-up order.
+        """
+        if self.game_over:
+            return {}
+        suspect_ids = [s["id"] for s in self.scenario["suspects"] if s["id"] not in self.eliminated_suspects]
+        if not suspect_ids:
+            return {}
+        
+        responses = {}
+        with ThreadPoolExecutor(max_workers=min(LINEUP_WORKERS, len(suspect_ids)), thread_name_prefix="lineup") as pool:
+            futures = {pool.submit(self.question_suspect, suspect_id, question): suspect_id for suspect_id in suspect_ids}
+            for future in as_completed(futures):
+                suspect_id = futures[future]
+                responses[suspect_id] = future.result()
+                if on_answer:
+                    on_answer(suspect_id, responses[suspect_id])
+        return {suspect_id: responses[suspect_id] for suspect_id in suspect_ids}
+
     def use_tool(self, tool_name, **kwargs):
+        start = time.perf_counter()
+        result = self._use_tool(tool_name, **kwargs)
+        label = tool_name if tool_name in TOOL_NAMES else "unknown"
+        outcome = "error" if "error" in result else "ok"
+        metrics.TOOL_CALLS.inc(tool=label, outcome=outcome)
+        metrics.TOOL_LATENCY.observe(time.perf_counter() - start, tool=label)
+        return result
+
+    def _use_tool(self, tool_name, **kwargs):
         if self.points <= 0:
             return {"error": "Not enough investigation points!"}
             
-        cost = 0
+        cost = TOOL_COSTS.get(tool_name, 0)
         result = {}
         
         # Map tool names to functions
         if tool_name == "get_location":
-            cost = 2
             result = tools.get_location(self.scenario, kwargs.get("phone_number"), kwargs.get("timestamp"))
         elif tool_name == "get_footage":
-            cost = 3
             result = tools.get_footage(self.scenario, kwargs.get("location"), kwargs.get("time_range"))
             
             # Handle unlocks
@@ -157,11 +264,9 @@ class GameInstance:
                 result["newly_unlocked"] = new_items
                 
         elif tool_name == "get_dna_test":
-            cost = 4
             result = tools.get_dna_test(self.scenario, kwargs.get("evidence_id"))
         elif tool_name == "call_alibi":
-            cost = 1
-            result = tools.call_alibi(self.scenario, **kwargs)
+            result = tools.call_alibi(self.scenario, usage=self.usage, **kwargs)
         else:
             return {"error": f"Unknown tool: {tool_name}"}
             
@@ -175,6 +280,7 @@ class GameInstance:
             result["_input_args"] = kwargs
             
         self.evidence_revealed.append(result)
+        self.facts.add_tool_result(tool_name, kwargs, result)
         self.log_event("System", f"Used {tool_name}. Cost: {cost} pts. Result: {str(result)}")
         return result
 
@@ -217,13 +323,114 @@ class GameInstance:
                     "new_points": self.points
                 }
 
+class InstancePool:
+    """
+    Pre-built, unused GameInstances so "OPEN CASE FILE" is a handoff, not a construction.
+
+    Instances are pooled per case key (a case_id, or a difficulty for random cases).
+    Each key that has been requested keeps `base_size` warm instances, plus more
+    (up to `max_size`) while its recent demand is high. Demand decays with a
+    half-life so quiet keys shrink back down.
+    """
+
+    def __init__(self, base_size=1, max_size=4, warm_keys=(), half_life=600.0, factory=None):
+        self.base_size = base_size
+        self.max_size = max_size
+        self.half_life = half_life
+        self.factory = factory or (lambda difficulty, case_id: GameInstance(difficulty, case_id))
+        self._ready = {} # key -> deque of GameInstance
+        self._specs = {} # key -> (difficulty, case_id)
+        self._demand = {} # key -> (score, last_update)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        for key in warm_keys:
+            self._specs[key] = (key, None)
+
+    @property
+    def enabled(self):
+        return self.base_size > 0
+
+    def start(self):
+        if not self.enabled or self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name="instance-pool", daemon=True)
+        self._thread.start()
+        self._wake.set()
+
+    def _record_demand(self, key):
+        now = time.monotonic()
+        score, last = self._demand.get(key, (0.0, now))
+        score = score * 0.5 ** ((now - last) / self.half_life) + 1.0
+        self._demand[key] = (score, now)
+
+    def target(self, key):
+        """How many warm instances `key` should have right now."""
+        if key not in self._specs:
+            return 0
+        score, last = self._demand.get(key, (0.0, time.monotonic()))
+        score *= 0.5 ** ((time.monotonic() - last) / self.half_life)
+        return min(self.max_size, self.base_size + int(math.log2(1 + score)))
+
+    def take(self, difficulty="medium", case_id=None):
+        """Returns a ready instance, building one inline only when the pool is cold."""
+        key = case_id or difficulty.lower()
+        with self._lock:
+            self._specs.setdefault(key, (difficulty, case_id))
+            self._record_demand(key)
+            ready = self._ready.get(key)
+            game = ready.popleft() if ready else None
+        self._wake.set()
+        if game is None:
+            game = self.factory(difficulty, case_id)
+        return game
+
+    def fill_once(self):
+        """Builds one instance for the neediest key. Returns False when every key is at target."""
+        with self._lock:
+            deficits = {k: self.target(k) - len(self._ready.get(k, ())) for k in self._specs}
+            key = max(deficits, key=deficits.get) if deficits else None
+            if key is None or deficits[key] <= 0:
+                return False
+            difficulty, case_id = self._specs[key]
+        try:
+            game = self.factory(difficulty, case_id)
+        except Exception as e:
+            print(f"Instance Pool Error: could not build {key}: {e}")
+            return False
+        with self._lock:
+            self._ready.setdefault(key, deque()).append(game)
+        return True
+
+    def sizes(self):
+        with self._lock:
+            return {k: len(v) for k, v in self._ready.items()}
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            while self.fill_once():
+                pass
+
 # Global Session Store
 SESSIONS = {}
 
-def start_game(difficulty="medium"):
-    game = GameInstance(difficulty)
+INSTANCE_POOL = InstancePool(
+    base_size=int(os.getenv("GAME_POOL_SIZE", "1")),
+    max_size=int(os.getenv("GAME_POOL_MAX", "4")),
+    warm_keys=[k for k in os.getenv("GAME_POOL_WARM", "").split(",") if k]
+)
+
+def start_game(difficulty="medium", case_id=None, warm_voice=False):
+    game = INSTANCE_POOL.take(difficulty, case_id)
     SESSIONS[game.id] = game
+    if warm_voice:
+        game.warm_up_voices()
     return game.id, game
 
 def get_game(session_id):
     return SESSIONS.get(session_id)
+
+def end_game(session_id):
+    return SESSIONS.pop(session_id, None)
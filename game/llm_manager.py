@@ -1,26 +1,164 @@
 import os
-import google.generativeai as genai
-from dotenv import load_dotenv
+import json
+import time
+import hashlib
+import datetime
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from . import metrics
+from .config import load_env, ROOT_DIR
+from .usage import Usage, record_llm, SHORT_HISTORY_TURNS
+from .load_governor import GOVERNOR
+from . import model_routing
 
-load_dotenv()
+load_env()
 
-# Configure the API
 API_KEY = os.getenv("GEMINI_API_KEY")
-if API_KEY:
-    genai.configure(api_key=API_KEY)
+# Alternate Gemini endpoint, e.g. the fake provider in loadtest/ (http://127.0.0.1:8801)
+API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+
+# google.generativeai is heavy to import; it is loaded and configured on first use
+_genai = None
+_genai_lock = threading.Lock()
+
+def get_genai():
+    """Imports and configures the Gemini SDK once, the first time a real call needs it."""
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                import google.generativeai as genai
+                if API_ENDPOINT:
+                    genai.configure(api_key=API_KEY, transport="rest", client_options={"api_endpoint": API_ENDPOINT})
+                else:
+                    genai.configure(api_key=API_KEY)
+                _genai = genai
+    return _genai
+
+def parse_json_response(text):
+    """Decodes the first JSON object in a model reply (ignores code fences and chatter around it)."""
+    decoder = json.JSONDecoder()
+    start = text.find("{")
+    while start != -1:
+        try:
+            value, _ = decoder.raw_decode(text, start)
+            return value
+        except json.JSONDecodeError:
+            start = text.find("{", start + 1)
+    raise ValueError("No JSON object found in response")
+
+# Provider-side caching of system instructions (Gemini CachedContent)
+CONTEXT_CACHE_ENABLED = os.getenv("GEMINI_CONTEXT_CACHE", "1") != "0"
+CONTEXT_CACHE_TTL = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", "3600")) # seconds
+
+def _create_model(model_name, system_instruction):
+    """
+    Returns (model, expires_at, cached_content). Tries a provider-side cached context
+    first; instructions under the provider's minimum size (or an SDK without caching)
+    get a plain model, with no expiry and nothing to delete.
+    """
+    genai = get_genai()
+    if CONTEXT_CACHE_ENABLED and system_instruction:
+        try:
+            from google.generativeai import caching
+            cached = caching.CachedContent.create(
+                model=f"models/{model_name}",
+                system_instruction=system_instruction,
+                ttl=datetime.timedelta(seconds=CONTEXT_CACHE_TTL)
+            )
+            metrics.CONTEXT_CACHE.inc(outcome="provider")
+            # Refresh a minute early so no session holds an expired cache
+            return genai.GenerativeModel.from_cached_content(cached_content=cached), time.time() + CONTEXT_CACHE_TTL - 60, cached
+        except Exception as e:
+            print(f"Context Cache: provider cache unavailable for {model_name} ({e}); sharing the model locally.")
+    metrics.CONTEXT_CACHE.inc(outcome="local")
+    return genai.GenerativeModel(model_name=model_name, system_instruction=system_instruction), None, None
+
+class ContextCache:
+    """
+    One model per (model name, system instruction), shared by every session.
+
+    Suspect and alibi instructions are filled from the scenario alone (the
+    detective's question to an alibi is the user turn), so every session of a case
+    builds byte-identical prefixes: the first session registers them, later
+    sessions, calls and turns reference the same cached context.
+    """
+
+    def __init__(self, capacity=256, factory=_create_model, clock=time.time):
+        self.capacity = capacity
+        self.factory = factory
+        self.clock = clock
+        self._models = OrderedDict() # key -> (model, expires_at, cached_content)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model_name, system_instruction):
+        return model_name, hashlib.sha256((system_instruction or "").encode("utf-8")).hexdigest()
+
+    def model_for(self, model_name, system_instruction):
+        """
+        The current model for an instruction. Agents call this every turn: once a
+        provider cache expires they get (and must switch to) a freshly built model.
+        """
+        key = self.key(model_name, system_instruction)
+        with self._lock:
+            entry = self._models.get(key)
+            if entry and (entry[1] is None or entry[1] > self.clock()):
+                self._models.move_to_end(key)
+                metrics.CONTEXT_CACHE.inc(outcome="hit")
+                return entry[0]
+        # Built outside the lock: provider calls are slow; a rare duplicate is harmless
+        entry = self.factory(model_name, system_instruction)
+        with self._lock:
+            dropped = [self._models[key]] if key in self._models else []
+            self._models[key] = entry
+            self._models.move_to_end(key)
+            while len(self._models) > self.capacity:
+                dropped.append(self._models.popitem(last=False)[1])
+        for old in dropped:
+            self._release(old)
+        return entry[0]
+
+    @staticmethod
+    def _release(entry):
+        """Deletes a dropped entry's provider cache instead of leaving it to its TTL."""
+        cached = entry[2]
+        if cached is None:
+            return
+        try:
+            cached.delete()
+        except Exception as e:
+            print(f"Context Cache: could not delete a provider cache ({e}).")
+
+    def __len__(self):
+        return len(self._models)
+
+CONTEXT_CACHE = ContextCache()
+
+@lru_cache(maxsize=None)
+def load_prompt(filename):
+    """Reads a prompt template from prompts/ (cached for the life of the process)."""
+    with open(os.path.join(ROOT_DIR, "prompts", filename), "r") as f:
+        return f.read()
+
+# In-character reply once a session has spent its token budget
+BUDGET_REPLY = "I've told you everything I'm going to tell you."
 
 class GeminiAgent:
-    def __init__(self, model_name="gemini-2.5-flash", system_instruction=None):
-        self.model_name = model_name
+    def __init__(self, model_name=None, system_instruction=None, role="witness", usage=None):
+        # Model and generation settings come from the role's route unless a model is given
+        self.model_name = model_name or model_routing.route_for(role)["model"]
         self.system_instruction = system_instruction
+        self.role = role
         self.chat_session = None
         self.history = []
+        self.usage = Usage() # This agent's spend
+        self.session_usage = usage # The game's spend (carries the budget)
         
         if API_KEY:
-            self.model = genai.GenerativeModel(
-                model_name=model_name,
-                system_instruction=system_instruction
-            )
+            # Shared across sessions: identical instructions reuse one cached context
+            self.model = CONTEXT_CACHE.model_for(self.model_name, system_instruction)
             self.chat_session = self.model.start_chat(history=[])
         else:
             print("Warning: No GEMINI_API_KEY found. Agent will run in mock mode.")
@@ -30,33 +168,73 @@ class GeminiAgent:
         if not self.model:
             return f"[MOCK] I received: {user_input}. (Set GEMINI_API_KEY to get real responses)"
         
+        if self.session_usage is not None:
+            if not self.session_usage.llm_allowed():
+                metrics.LLM_CALLS.inc(role=self.role, outcome="budget")
+                return BUDGET_REPLY
+            if self.session_usage.short_history():
+                self.trim_history(SHORT_HISTORY_TURNS)
+        
+        start = time.perf_counter()
         try:
-            response = self.chat_session.send_message(user_input)
+            response = self._send(user_input)
+            metrics.LLM_CALLS.inc(role=self.role, outcome="ok")
+            record_llm(response, self.role, self.usage, self.session_usage)
             return response.text
         except Exception as e:
+            metrics.LLM_CALLS.inc(role=self.role, outcome="error")
             return f"Error generating response: {str(e)}"
+        finally:
+            metrics.LLM_LATENCY.observe(time.perf_counter() - start, role=self.role)
+
+    def _send(self, user_input):
+        """Sends one turn, on a faster model and/or with a reply cap while the server is under load."""
+        model_name = GOVERNOR.model_override()
+        config = model_routing.generation_config(self.role, token_cap=GOVERNOR.reply_token_cap())
+        options = {"generation_config": config} if config else {}
+        if not model_name or model_name == self.model_name:
+            model = CONTEXT_CACHE.model_for(self.model_name, self.system_instruction)
+            if model is not self.model:
+                # Our cached context expired or was evicted: same conversation on the new one
+                self.model = model
+                self.chat_session = model.start_chat(history=self.chat_session.history)
+            return self.chat_session.send_message(user_input, **options)
+        # Same instruction and history on the fast model; the conversation carries over both ways
+        fast_session = CONTEXT_CACHE.model_for(model_name, self.system_instruction).start_chat(history=self.chat_session.history)
+        response = fast_session.send_message(user_input, **options)
+        self.chat_session.history = fast_session.history
+        return response
+
+    def trim_history(self, turns):
+        """Keeps only the last `turns` exchanges in the chat session (cheaper prompts)."""
+        history = self.chat_session.history
+        if len(history) > turns * 2:
+            self.chat_session.history = history[-turns * 2:]
 
 class LLMManager:
-    def __init__(self):
-        self.agents = {}
+    def __init__(self, usage=None):
+        self.agents = {} # Materialized agents
+        self.specs = {} # agent_id -> (role, system_instruction), for agents built on first use
+        self._agent_locks = {}
         self.prompts = self._load_prompts()
+        self.usage = usage # Game-wide spend shared by every agent created here
+        self.raw_usage = Usage() # Spend of one-shot get_response_raw calls
 
     def _load_prompts(self):
         prompts = {}
-        prompt_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "prompts")
         for filename in ["murderer.txt", "witness.txt", "detective.txt", "alibi_agent.txt"]:
             key = filename.replace(".txt", "")
             try:
-                with open(os.path.join(prompt_dir, filename), "r") as f:
-                    prompts[key] = f.read()
+                prompts[key] = load_prompt(filename)
             except FileNotFoundError:
                 print(f"Warning: Prompt file {filename} not found.")
                 prompts[key] = ""
         return prompts
 
-    def create_agent(self, agent_id, role, context_data):
+    def define_agent(self, agent_id, role, context_data):
         """
-        Creates a new GeminiAgent for a specific character.
+        Registers a character without building its GeminiAgent; that happens on first
+        use (get_agent), so characters nobody talks to cost nothing.
         
         agent_id: Unique ID (e.g., 'suspect_1', 'detective')
         role: 'murderer', 'witness', 'detective', 'alibi_agent'
@@ -79,14 +257,29 @@ class LLMManager:
         except KeyError as e:
             print(f"Warning: Missing key {e} in context data for {agent_id}")
             system_instruction = base_prompt # Fallback
-            
-        # Create agent
-        agent = GeminiAgent(system_instruction=system_instruction)
-        self.agents[agent_id] = agent
-        return agent
+        
+        self.specs[agent_id] = (role, system_instruction)
+        self._agent_locks.setdefault(agent_id, threading.Lock())
+        self.agents.pop(agent_id, None) # Redefined: rebuilt on next use
+
+    def create_agent(self, agent_id, role, context_data):
+        """Defines a character and builds its GeminiAgent right away."""
+        self.define_agent(agent_id, role, context_data)
+        return self.get_agent(agent_id)
 
     def get_agent(self, agent_id):
-        return self.agents.get(agent_id)
+        """The agent for agent_id, built from its definition the first time it is needed."""
+        agent = self.agents.get(agent_id)
+        if agent is not None or agent_id not in self.specs:
+            return agent
+        # Per-agent lock: suspects in a line-up materialize in parallel, each only once
+        with self._agent_locks[agent_id]:
+            agent = self.agents.get(agent_id)
+            if agent is None:
+                role, system_instruction = self.specs[agent_id]
+                agent = GeminiAgent(system_instruction=system_instruction, role=role, usage=self.usage)
+                self.agents[agent_id] = agent
+        return agent
 
     def get_response(self, agent_id, user_input):
         agent = self.get_agent(agent_id)
@@ -94,14 +287,27 @@ class LLMManager:
             return agent.generate_response(user_input)
         return "Error: Agent not found."
 
-    def get_response_raw(self, prompt):
-        """Stateless generation for AI Detective logic."""
+    def get_response_raw(self, prompt, role="ai_detective", generation_config=None):
+        """
+        Stateless generation for AI Detective logic (and other one-shot roles).
+        `generation_config` is applied on top of the role's route (e.g. a response schema).
+        """
         if not API_KEY:
             return '{"thought": "Mock thought", "action": "chat", "suspect_id": "suspect_1", "message": "Hello"}'
+        if self.usage is not None and not self.usage.llm_allowed():
+            metrics.LLM_CALLS.inc(role=role, outcome="budget")
+            return "Error: token budget spent"
             
+        start = time.perf_counter()
         try:
-            model = genai.GenerativeModel('gemini-2.5-flash')
-            response = model.generate_content(prompt)
+            # Under load the governor swaps in a faster model (replies stay uncapped: they are JSON)
+            model = get_genai().GenerativeModel(GOVERNOR.model_override() or model_routing.route_for(role)["model"])
+            response = model.generate_content(prompt, generation_config=model_routing.generation_config(role, generation_config))
+            metrics.LLM_CALLS.inc(role=role, outcome="ok")
+            record_llm(response, role, self.raw_usage, self.usage)
             return response.text
         except Exception as e:
+            metrics.LLM_CALLS.inc(role=role, outcome="error")
             return f"Error: {str(e)}"
+        finally:
+            metrics.LLM_LATENCY.observe(time.perf_counter() - start, role=role)
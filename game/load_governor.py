@@ -0,0 +1,149 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from . import metrics
+
+# Quality steps, cheapest last. Each level keeps the degradations of the ones before it.
+LEVELS = (
+    "normal",
+    "voice_off",       # no new ElevenLabs synthesis (cached clips still play)
+    "fast_model",      # suspects and the AI detective move to FAST_MODEL
+    "short_replies",   # suspect replies capped at REPLY_TOKEN_CAP tokens
+    "slow_spectator",  # AI spectator games pause SPECTATOR_SLOWDOWN x longer between moves
+)
+
+FAST_MODEL = os.getenv("LOAD_FAST_MODEL", "gemini-2.5-flash-lite")
+REPLY_TOKEN_CAP = int(os.getenv("LOAD_REPLY_TOKENS", "120"))
+SPECTATOR_SLOWDOWN = 3.0
+
+class LoadGovernor:
+    """
+    Load-aware quality policy for the bridge.
+
+    Every bridge request runs inside `track()`, which counts requests in flight and
+    records latency. When the in-flight count or the recent p95 latency breaches its
+    limit the level goes up one step (at most once per `hold` seconds); after
+    `cooldown` seconds of calm it comes down one step. Listeners hear every change.
+    """
+
+    def __init__(self, max_inflight=32, slo_seconds=5.0, window_seconds=30, hold=10, cooldown=30, clock=time.monotonic):
+        self.max_inflight = max_inflight
+        self.slo_seconds = slo_seconds
+        self.window_seconds = window_seconds
+        self.hold = hold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.level = 0
+        self.in_flight = 0
+        self.listeners = []
+        self._latencies = deque(maxlen=500) # (finished_at, seconds)
+        self._changed_at = clock()
+        self._calm_since = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def name(self):
+        return LEVELS[self.level]
+
+    @contextmanager
+    def track(self):
+        with self._lock:
+            self.in_flight += 1
+        metrics.BRIDGE_IN_FLIGHT.inc()
+        start = self.clock()
+        try:
+            yield
+        finally:
+            now = self.clock()
+            with self._lock:
+                self.in_flight -= 1
+                self._latencies.append((now, now - start))
+            metrics.BRIDGE_IN_FLIGHT.dec()
+            self.evaluate()
+
+    def p95(self):
+        horizon = self.clock() - self.window_seconds
+        with self._lock:
+            recent = sorted(seconds for finished, seconds in self._latencies if finished >= horizon)
+        if not recent:
+            return 0.0
+        return recent[min(len(recent) - 1, int(len(recent) * 0.95))]
+
+    def evaluate(self):
+        """Moves at most one level. Returns the new level."""
+        p95 = self.p95()
+        now = self.clock()
+        with self._lock:
+            overloaded = self.in_flight > self.max_inflight or p95 > self.slo_seconds
+            calm = self.in_flight <= self.max_inflight // 2 and p95 <= self.slo_seconds * 0.6
+            new_level = self.level
+            if overloaded:
+                self._calm_since = None
+                if self.level < len(LEVELS) - 1 and now - self._changed_at >= self.hold:
+                    new_level = self.level + 1
+            elif calm and self.level > 0:
+                if self._calm_since is None:
+                    self._calm_since = now
+                elif now - self._calm_since >= self.cooldown:
+                    new_level = self.level - 1
+            else:
+                self._calm_since = None
+            if new_level == self.level:
+                return self.level
+            self.level = new_level
+            self._changed_at = now
+            self._calm_since = None
+            self._latencies.clear() # Judge the new level on its own traffic
+        metrics.LOAD_LEVEL.set(new_level)
+        print(f"Load Governor: level {new_level} ({LEVELS[new_level]}), in flight {self.in_flight}, p95 {p95:.2f}s")
+        for listener in list(self.listeners):
+            try:
+                listener(self.signal())
+            except Exception as e:
+                print(f"Load Governor Error: listener failed: {e}")
+        return new_level
+
+    def start(self, interval=2.0):
+        """Re-evaluates periodically so an idle server recovers without new traffic."""
+        if self._thread:
+            return
+        stopped = self._stopped = threading.Event()
+        def run():
+            while not stopped.wait(interval):
+                self.evaluate()
+        self._thread = threading.Thread(target=run, name="load-governor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the periodic evaluation started by start()."""
+        if not self._thread:
+            return
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+
+    def signal(self):
+        """What the UI is told about the current level."""
+        return {"level": self.level, "name": self.name, "degraded": list(LEVELS[1:self.level + 1])}
+
+    # --- Policy queries ---
+
+    def voice_enabled(self):
+        return self.level < 1
+
+    def model_override(self):
+        return FAST_MODEL if self.level >= 2 else None
+
+    def reply_token_cap(self):
+        return REPLY_TOKEN_CAP if self.level >= 3 else None
+
+    def spectator_delay_factor(self):
+        return SPECTATOR_SLOWDOWN if self.level >= 4 else 1.0
+
+GOVERNOR = LoadGovernor(
+    max_inflight=int(os.getenv("LOAD_MAX_INFLIGHT", "32")),
+    slo_seconds=float(os.getenv("LOAD_SLO_MS", "5000")) / 1000,
+)
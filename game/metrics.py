@@ -0,0 +1,220 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Minimal Prometheus text-format metrics (no client library needed).
+# Exposed by app.py at /metrics.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = []
+    for k, v in pairs:
+        v = str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        escaped.append(f'{k}="{v}"')
+    return "{" + ",".join(escaped) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}_total{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, func=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self._func = func # Evaluated at scrape time (unlabelled gauges only)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def get(self, **labels):
+        if self._func is not None:
+            return self._func()
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        if self._func is not None:
+            try:
+                return [f"{self.name} {_format_value(self._func())}"]
+            except Exception as e:
+                print(f"Metrics Error: gauge {self.name} failed: {e}")
+                return []
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def get_count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state["count"] if state else 0
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((k, {"counts": list(v["counts"]), "sum": v["sum"], "count": v["count"]}) for k, v in self._values.items())
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state["counts"]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            base = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{base} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{base} {state['count']}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        return "\n".join(m.render() for m in metrics) + "\n"
+
+REGISTRY = Registry()
+
+def render():
+    """Prometheus text exposition of every registered metric."""
+    return REGISTRY.render()
+
+def _resident_memory_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss is KB on Linux (peak, not current) - good enough as a fallback
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+# --- Game Metrics ---
+
+BRIDGE_REQUESTS = Counter("murder_bridge_requests", "Bridge actions handled by GameSession.handle_input.", ["action"])
+BRIDGE_LATENCY = Histogram("murder_bridge_latency_seconds", "Latency of bridge actions.", ["action"])
+
+TOOL_CALLS = Counter("murder_tool_calls", "Investigation tool calls in GameInstance.use_tool.", ["tool", "outcome"])
+TOOL_LATENCY = Histogram("murder_tool_latency_seconds", "Latency of investigation tools.", ["tool"])
+
+LLM_CALLS = Counter("murder_llm_calls", "Gemini calls by agent role.", ["role", "outcome"])
+LLM_LATENCY = Histogram("murder_llm_latency_seconds", "Gemini call latency by agent role.", ["role"])
+CONTEXT_CACHE = Counter("murder_llm_context_cache", "System-instruction cache lookups (hit, provider, local).", ["outcome"])
+
+TTS_CALLS = Counter("murder_tts_calls", "ElevenLabs synthesis calls.", ["outcome"])
+TTS_LATENCY = Histogram("murder_tts_latency_seconds", "ElevenLabs synthesis latency.")
+
+LLM_TOKENS = Counter("murder_llm_tokens", "Gemini tokens by agent role and kind (prompt/output/cached).", ["role", "kind"])
+TTS_CHARS = Counter("murder_tts_characters", "Characters sent to ElevenLabs.")
+
+PREFETCHES = Counter("murder_prefetches", "Suspect warm-ups started by select_suspect.", ["outcome"])
+PREFETCH_LATENCY = Histogram("murder_prefetch_latency_seconds", "Time to build a suspect's agent and voice client ahead of the first question.")
+
+BROADCAST_VIEWERS = Gauge("murder_broadcast_viewers", "Viewers subscribed to the featured AI game.")
+
+LOAD_LEVEL = Gauge("murder_load_level", "Quality level set by the load governor (0 = full quality).")
+BRIDGE_IN_FLIGHT = Gauge("murder_bridge_in_flight", "Bridge requests being handled.")
+
+DETECTIVE_DECISIONS = Counter("murder_ai_detective_decisions", "AI detective decisions by action.", ["action"])
+DETECTIVE_PARSE_FALLBACKS = Counter("murder_ai_detective_parse_fallbacks", "AI detective responses that could not be parsed.")
+DETECTIVE_INVALID_DECISIONS = Counter("murder_ai_detective_invalid_decisions", "AI detective decisions rejected against the live game state.")
+DETECTIVE_PLANNED = Counter("murder_ai_detective_planned", "AI detective moves decided by the local planner (no LLM call).", ["action"])
+DETECTIVE_REPAIRS = Counter("murder_ai_detective_repairs", "Invalid AI detective decisions fixed locally instead of rejected.")
+
+def _active_sessions():
+    from .game_engine import SESSIONS
+    return len(SESSIONS)
+
+def _active_agents():
+    from .game_engine import SESSIONS
+    return sum(len(game.llm_manager.agents) for game in list(SESSIONS.values()))
+
+ACTIVE_SESSIONS = Gauge("murder_active_sessions", "Game sessions held in memory.", func=_active_sessions)
+ACTIVE_AGENTS = Gauge("murder_active_agents", "LLM agents held by active sessions.", func=_active_agents)
+PROCESS_MEMORY = Gauge("process_resident_memory_bytes", "Resident memory size in bytes.", func=_resident_memory_bytes)
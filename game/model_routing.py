@@ -0,0 +1,71 @@
+import os
+import json
+from .config import load_env, ROOT_DIR
+
+load_env()
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+# Generation settings a route may carry (passed to Gemini as generation_config)
+GENERATION_KEYS = ("max_output_tokens", "temperature", "top_p", "top_k", "stop_sequences")
+
+# Model and generation settings per agent role. 2.5 Flash spends part of
+# max_output_tokens on thinking, so its limits are looser than Flash-Lite's.
+DEFAULT_ROUTES = {
+    "default": {"model": DEFAULT_MODEL},
+    "murderer": {"model": DEFAULT_MODEL, "max_output_tokens": 2048, "temperature": 0.9},
+    "witness": {"model": DEFAULT_MODEL, "max_output_tokens": 1024, "temperature": 0.8},
+    "detective": {"model": DEFAULT_MODEL, "max_output_tokens": 1024, "temperature": 0.7},
+    # Alibi contacts answer one yes/no style question per call: short and fast
+    "alibi_agent": {"model": "gemini-2.5-flash-lite", "max_output_tokens": 200, "temperature": 0.4},
+    "ai_detective": {"model": DEFAULT_MODEL, "max_output_tokens": 2048},
+    "scenario_writer": {"model": DEFAULT_MODEL, "max_output_tokens": 8192, "temperature": 1.0},
+}
+
+def load_routes(path=None):
+    """
+    Default routes, overridden per role by a JSON file (MODEL_ROUTES, or model_routes.json
+    at the project root), e.g. {"murderer": {"model": "gemini-2.5-pro", "temperature": 1.0}}.
+    Settings missing from the file keep their defaults.
+    """
+    routes = {role: dict(route) for role, route in DEFAULT_ROUTES.items()}
+    path = path or os.getenv("MODEL_ROUTES") or os.path.join(ROOT_DIR, "model_routes.json")
+    if not os.path.exists(path):
+        return routes
+    try:
+        with open(path, "r") as f:
+            overrides = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Model Routing Error: could not read {path} ({e}); using default routes.")
+        return routes
+    for role, route in overrides.items():
+        if not isinstance(route, dict):
+            print(f"Model Routing Error: route for '{role}' is not an object; ignored.")
+            continue
+        unknown = set(route) - set(GENERATION_KEYS) - {"model"}
+        if unknown:
+            print(f"Model Routing Warning: ignoring unknown settings {sorted(unknown)} for '{role}'.")
+        routes.setdefault(role, {"model": DEFAULT_MODEL}).update(
+            {k: v for k, v in route.items() if k not in unknown}
+        )
+    return routes
+
+ROUTES = load_routes()
+
+def route_for(role):
+    """The route for a role (the default route for unknown roles)."""
+    route = dict(ROUTES["default"])
+    route.update(ROUTES.get(role, {}))
+    return route
+
+def generation_config(role, overrides=None, token_cap=None):
+    """
+    Generation settings for a call: the role's route, then the caller's `overrides`
+    (e.g. a response schema), with max_output_tokens lowered to `token_cap` if given.
+    """
+    route = route_for(role)
+    config = {k: route[k] for k in GENERATION_KEYS if route.get(k) is not None}
+    config.update(overrides or {})
+    if token_cap:
+        config["max_output_tokens"] = min(config.get("max_output_tokens", token_cap), token_cap)
+    return config
@@ -0,0 +1,149 @@
+import os
+from mcp.tools import find_suspect_by_phone
+
+# Routine AI detective moves decided locally; the LLM is only asked about
+# interrogation and choices the evidence doesn't settle.
+PLANNER_ENABLED = os.getenv("AI_DETECTIVE_PLANNER", "1") != "0"
+
+# Accuse once the leading suspect scores this much, this far ahead of the next
+ACCUSE_SCORE = 4
+ACCUSE_MARGIN = 2
+
+# Evidence scores (see Planner.scores)
+CONTRADICTION_SCORE = 3 # per kind of evidence (phone, footage) that breaks their story
+CHANGED_STORY_SCORE = 1
+SOLE_DNA_SCORE = 2 # only match on an item
+SHARED_DNA_SCORE = 1 # one of several matches
+AT_SCENE_SCORE = 1 # seen or located at the scene around the time of death
+
+# Items worth the lab first (matched against public ids and labels)
+WEAPON_WORDS = ("weapon", "knife", "gun", "blade", "poison", "vial", "rope", "bat", "hammer", "trophy", "glass", "bottle")
+
+class Planner:
+    """
+    Deterministic moves from what the detective already knows: the public camera
+    list, items unlocked so far, tool results and the fact index. It never reads
+    the hidden answers (murderer, unseen footage, untested DNA).
+
+    Order: accuse when conclusive, watch the first footage, test newly unlocked
+    items (likely weapons first), locate the leading suspects' phones, watch the
+    remaining footage. Anything else (questioning, a close call) returns None
+    and goes to the LLM.
+    """
+
+    def __init__(self, game):
+        self.game = game
+
+    def _used(self, tool_name):
+        """Argument dicts of successful calls to a tool."""
+        return [
+            e.get("_input_args", {}) for e in self.game.evidence_revealed
+            if isinstance(e, dict) and e.get("_input_args") is not None and self._tool_of(e) == tool_name
+        ]
+
+    @staticmethod
+    def _tool_of(result):
+        args = result.get("_input_args", {})
+        if "evidence_id" in args:
+            return "get_dna_test"
+        if "alibi_id" in args or "question" in args:
+            return "call_alibi"
+        if "phone_number" in args:
+            return "get_location"
+        if "location" in args:
+            return "get_footage"
+        return None
+
+    def active_suspects(self):
+        return [s for s in self.game.scenario["suspects"] if s["id"] not in self.game.eliminated_suspects]
+
+    def scores(self):
+        """Suspicion per active suspect, from contradictions, DNA and sightings at the scene."""
+        facts = self.game.facts
+        scores = {}
+        for suspect in self.active_suspects():
+            suspect_id = suspect["id"]
+            score = 0
+            sources = {c["source"] for c in facts.contradictions_for(suspect_id)}
+            score += CONTRADICTION_SCORE * len(sources - {"testimony"})
+            if "testimony" in sources:
+                score += CHANGED_STORY_SCORE
+            claims = facts.claims(suspect_id)
+            for claim in claims:
+                if claim["kind"] == "dna":
+                    sharing = [c for c in facts.claims(kind="dna") if c["place"] == claim["place"]]
+                    score += SOLE_DNA_SCORE if len(sharing) == 1 else SHARED_DNA_SCORE
+            tod = facts.time_of_death
+            if tod is not None and any(
+                c["kind"] in ("phone", "footage") and "scene" in c["kinds"] and c["time"] is not None
+                and c["time"] - facts.window <= tod <= c["until"] + facts.window
+                for c in claims
+            ):
+                score += AT_SCENE_SCORE
+            scores[suspect_id] = score
+        return scores
+
+    def conclusive(self):
+        """The suspect to accuse, or None while the evidence is still open."""
+        ranked = sorted(self.scores().items(), key=lambda item: -item[1])
+        if not ranked:
+            return None
+        leader, top = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0
+        if top >= ACCUSE_SCORE and top - runner_up >= ACCUSE_MARGIN:
+            return leader
+        return None
+
+    def plan(self):
+        """A decision dict like the LLM's, or None to let the LLM choose."""
+        from .game_engine import TOOL_COSTS
+        game = self.game
+        if game.game_over:
+            return None
+        names = {s["id"]: s["name"] for s in game.scenario["suspects"]}
+
+        suspect_id = self.conclusive()
+        if suspect_id:
+            return {
+                "thought": f"The evidence points one way: {names[suspect_id]}'s story doesn't survive it.",
+                "action": "accuse",
+                "suspect_id": suspect_id,
+            }
+
+        watched = {str(a.get("location")).lower() for a in self._used("get_footage")}
+        cameras = [c for c in game.scenario["evidence"]["footage_data"] if c.lower() not in watched]
+        can_afford = lambda tool: TOOL_COSTS[tool] <= game.points
+
+        if not watched and cameras and can_afford("get_footage"):
+            return self._tool("Footage first: it shows who was around and what there is to test.", "get_footage", location=cameras[0])
+
+        tested = {a.get("evidence_id") for a in self._used("get_dna_test")}
+        untested = [item for item in game.unlocked_evidence if item not in tested]
+        if untested and can_afford("get_dna_test"):
+            labels = game.scenario["evidence"]["dna_evidence"]
+            weapon_first = sorted(untested, key=lambda item: not any(
+                word in f"{item} {labels.get(item, {}).get('label', '')}".lower() for word in WEAPON_WORDS
+            ))
+            return self._tool("A newly unlocked item could carry prints. Sending it to the lab.", "get_dna_test", evidence_id=weapon_first[0])
+
+        if can_afford("get_location"):
+            located = {find_suspect_by_phone(game.scenario, a.get("phone_number")) for a in self._used("get_location")}
+            scores = self.scores()
+            contradicted = {c["suspect_id"] for c in game.facts.contradictions}
+            candidates = [
+                s for s in self.active_suspects()
+                if s["id"] not in located and s["id"] not in contradicted and s.get("phone_number")
+            ]
+            # Most suspicious first: their phone is the likeliest to settle it
+            candidates.sort(key=lambda s: -scores.get(s["id"], 0))
+            if candidates:
+                suspect = candidates[0]
+                return self._tool(f"Let me check where {suspect['name']}'s phone really was.", "get_location", phone_number=suspect["phone_number"])
+
+        if cameras and can_afford("get_footage"):
+            return self._tool("Another camera might fill the gaps.", "get_footage", location=cameras[0])
+        return None
+
+    @staticmethod
+    def _tool(thought, tool_name, **args):
+        return {"thought": thought, "action": "use_tool", "tool_name": tool_name, "args": args}
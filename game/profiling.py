@@ -0,0 +1,124 @@
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+
+# On-demand profiling of bridge requests.
+# Nothing here runs unless a caller explicitly asks for a profile.
+
+MODES = ("sample", "cprofile")
+SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.002")) # seconds
+
+def normalize_mode(value):
+    """Maps a header/flag value to a profiler mode, or None when profiling is off."""
+    if not value:
+        return None
+    value = str(value).strip().lower()
+    if value in ("0", "false", "off", "no"):
+        return None
+    if value in MODES:
+        return value
+    return "sample" # "1", "true", ... -> default profiler
+
+class _Sampler(threading.Thread):
+    """Samples the stack of one thread at a fixed interval (collapsed-stack output)."""
+
+    def __init__(self, target_thread_id, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.target_thread_id = target_thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def collapsed(self):
+        """Brendan Gregg's folded format, ready for flamegraph.pl / speedscope."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+class ProfileStore:
+    """Keeps the last few profiles in memory for download from the admin endpoint."""
+
+    def __init__(self, capacity=20):
+        self.capacity = capacity
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile):
+        with self._lock:
+            self._profiles[profile["id"]] = profile
+            while len(self._profiles) > self.capacity:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id):
+        return self._profiles.get(profile_id)
+
+    def list(self):
+        with self._lock:
+            profiles = list(self._profiles.values())
+        return [{k: v for k, v in p.items() if k not in ("collapsed", "text", "pstats")} for p in reversed(profiles)]
+
+PROFILE_STORE = ProfileStore()
+
+def profile_call(mode, label, fn, *args, session_id=None, **kwargs):
+    """
+    Runs fn(*args, **kwargs) under the requested profiler and stores the result.
+    Returns (fn_result, profile_id).
+    """
+    profile = {
+        "id": uuid.uuid4().hex[:12],
+        "label": label,
+        "mode": mode,
+        "session_id": session_id,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    start = time.perf_counter()
+
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+            profile["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            profiler.create_stats()
+            # Dump first: pstats.Stats() takes ownership of profiler.stats
+            profile["pstats"] = marshal.dumps(profiler.stats)
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(40)
+            profile["text"] = out.getvalue()
+            PROFILE_STORE.add(profile)
+    else:
+        sampler = _Sampler(threading.get_ident())
+        sampler.start()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            sampler.stop()
+            profile["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            profile["samples"] = sum(sampler.stacks.values())
+            profile["collapsed"] = sampler.collapsed()
+            PROFILE_STORE.add(profile)
+
+    return result, profile["id"]
@@ -1,10 +1,20 @@
 import json
 import random
 import os
+import threading
+import uuid
+from collections import deque
+from .config import ROOT_DIR
+from .llm_manager import LLMManager, load_prompt, parse_json_response, API_KEY
+from .scenario_pack import get_catalog, validate_scenario, DIFFICULTIES
 
 # Path to scenarios directory
 SCENARIOS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "scenarios")
 
+# Case ids like "generated:hard" ask for a fresh LLM-written case of that difficulty
+GENERATED_PREFIX = "generated:"
+POOL_PATH = os.getenv("SCENARIO_POOL_PATH", os.path.join(ROOT_DIR, ".cache", "scenario_pool.json"))
+
 def load_scenario(filename):
     """Loads a scenario from a JSON file."""
     path = os.path.join(SCENARIOS_DIR, filename)
@@ -18,26 +28,165 @@ def load_scenario(filename):
         print(f"Error: Invalid JSON in {filename}")
         return None
 
-def generate_crime_scenario(difficulty="medium"):
+def generate_llm_scenario(difficulty="medium"):
     """
-    Currently picks a pre-scripted scenario based on difficulty or random.
-    In future, this will call an LLM to generate unique JSON.
+    Asks the LLM for a brand new case. Returns a validated scenario dict or None.
+    Slow (tens of seconds) - call it from the background pool, not the click path.
     """
+    prompt = load_prompt("scenario_generator.txt").format(
+        difficulty=difficulty, difficulty_label=difficulty.capitalize()
+    )
+    response_text = LLMManager().get_response_raw(
+        prompt, role="scenario_writer", generation_config={"response_mime_type": "application/json"}
+    )
+    try:
+        scenario = parse_json_response(response_text)
+    except ValueError:
+        print(f"Scenario Generator Error: no JSON in response ({response_text[:200]})")
+        return None
     
-    # For prototype, map difficulty to specific files or random
-    # We have: silicon_valley.json (Medium), coffee_shop.json (Easy), art_gallery.json (Hard)
+    scenario["case_id"] = "GEN-" + uuid.uuid4().hex[:6].upper()
+    scenario["difficulty"] = difficulty.capitalize()
+    scenario["tags"] = list(scenario.get("tags", [])) + ["generated"]
     
-    if difficulty.lower() == "easy":
-        chosen_file = "coffee_shop.json"
-    elif difficulty.lower() == "hard":
-        chosen_file = "art_gallery.json"
-    else:
-        chosen_file = "silicon_valley.json"
-        
-    # Or just pick random for variety if difficulty not strictly enforced
-    # chosen_file = random.choice(["silicon_valley.json", "coffee_shop.json", "art_gallery.json"])
+    errors = validate_scenario(scenario)
+    if errors:
+        print(f"Scenario Generator Error: rejected case ({'; '.join(errors[:5])})")
+        return None
+    return scenario
+
+class ScenarioPool:
+    """
+    Warm pool of LLM-generated cases per difficulty.
+    A background producer keeps each difficulty topped up to `target_size`,
+    the pool survives restarts on disk, and pop() never waits on the LLM.
+    """
+
+    def __init__(self, target_size=0, path=POOL_PATH, generator=generate_llm_scenario):
+        self.target_size = target_size
+        self.path = path
+        self.generator = generator
+        self._pools = {d: deque() for d in DIFFICULTIES}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._dirty = False
+        self._thread = None
+        self._failures = 0
+        self._load()
+
+    @property
+    def enabled(self):
+        return self.target_size > 0
+
+    def start(self):
+        """Starts the producer thread (no-op when disabled or already running)."""
+        if not self.enabled or self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name="scenario-pool", daemon=True)
+        self._thread.start()
+
+    def pop(self, difficulty):
+        """Returns a ready case (O(1)) or None if that difficulty is empty."""
+        with self._lock:
+            pool = self._pools.get(difficulty.lower())
+            scenario = pool.popleft() if pool else None
+            if scenario is not None:
+                self._dirty = True
+        if scenario is not None:
+            self._wake.set() # Refill + persist in the background
+        return scenario
+
+    def sizes(self):
+        with self._lock:
+            return {d: len(p) for d, p in self._pools.items()}
+
+    def produce_one(self):
+        """Generates one case for the emptiest difficulty. Returns False when the pool is full."""
+        with self._lock:
+            needed = [d for d, p in self._pools.items() if len(p) < self.target_size]
+            difficulty = min(needed, key=lambda d: len(self._pools[d])) if needed else None
+        if difficulty is None:
+            return False
+        scenario = self.generator(difficulty)
+        if scenario:
+            self._failures = 0
+            with self._lock:
+                self._pools[difficulty].append(scenario)
+                self._dirty = True
+        else:
+            self._failures += 1
+        return True
+
+    def _run(self):
+        while True:
+            if self._dirty:
+                self._save()
+            produced = self.produce_one()
+            if not produced:
+                self._wake.wait()
+                self._wake.clear()
+            elif self._failures:
+                # Back off on repeated generation failures (max 5 minutes)
+                self._wake.wait(min(300, 5 * 2 ** min(self._failures, 6)))
+                self._wake.clear()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                stored = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        for difficulty, cases in stored.items():
+            if difficulty in self._pools:
+                self._pools[difficulty].extend(c for c in cases if not validate_scenario(c))
+
+    def _save(self):
+        with self._lock:
+            snapshot = {d: list(p) for d, p in self._pools.items()}
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Scenario Pool Error: could not persist pool: {e}")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_scenario_pool():
+    """Process-wide pool sized by SCENARIO_POOL_SIZE (0 = disabled; needs GEMINI_API_KEY)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                size = int(os.getenv("SCENARIO_POOL_SIZE", "0")) if API_KEY else 0
+                _pool = ScenarioPool(target_size=size)
+    return _pool
+
+def generate_crime_scenario(difficulty="medium", case_id=None):
+    """
+    Loads a pre-scripted scenario from the scenario catalog (game/scenario_pack.py).
+    A specific case is used when `case_id` is given, otherwise a random case of
+    the requested difficulty. "generated:<difficulty>" takes a pre-generated LLM
+    case from the scenario pool, falling back to the catalog if the pool is empty.
+    """
+    if case_id and case_id.startswith(GENERATED_PREFIX):
+        difficulty = case_id[len(GENERATED_PREFIX):] or difficulty
+        scenario = get_scenario_pool().pop(difficulty)
+        if scenario:
+            return scenario
+        print(f"Scenario Pool: no {difficulty} case ready, using a pre-scripted one.")
+        case_id = None
+    
+    catalog = get_catalog()
     
-    scenario = load_scenario(chosen_file)
+    if not case_id or case_id not in catalog:
+        case_id = catalog.pick(difficulty) or catalog.pick()
+        
+    scenario = catalog.load(case_id) if case_id else None
     
     if not scenario:
         # Fallback
@@ -0,0 +1,296 @@
+"""
+Compiled scenario packs.
+
+Many case files are validated and packed into one indexed binary file:
+
+    python -m game.scenario_pack compile                 # scenarios/*.json -> scenarios/cases.pack
+    python -m game.scenario_pack compile my_cases/ -o out.pack
+    python -m game.scenario_pack list --difficulty hard
+
+Layout: 8-byte magic, index offset and length (little-endian uint64), the case
+JSON blobs back to back, then a JSON index describing every case (id, title,
+difficulty, tags, offset, length). At runtime the pack is memory-mapped and
+only the index is parsed; a case is decoded when it is selected.
+"""
+import argparse
+import glob
+import json
+import mmap
+import os
+import random
+import struct
+import sys
+import threading
+
+from .config import ROOT_DIR
+
+SCENARIOS_DIR = os.path.join(ROOT_DIR, "scenarios")
+DEFAULT_PACK_PATH = os.path.join(SCENARIOS_DIR, "cases.pack")
+
+MAGIC = b"MAIPACK1"
+HEADER = struct.Struct("<8sQQ")
+DIFFICULTIES = ("easy", "medium", "hard")
+
+_STRING = {"type": "string"}
+
+SCENARIO_SCHEMA = {
+    "type": "object",
+    "required": ["case_id", "title", "difficulty", "victim", "suspects", "evidence"],
+    "properties": {
+        "case_id": _STRING,
+        "title": _STRING,
+        "difficulty": {"type": "string", "enum": ["Easy", "Medium", "Hard"]},
+        "tags": {"type": "array", "items": _STRING},
+        "victim": {
+            "type": "object",
+            "required": ["name", "time_of_death"],
+            "properties": {"name": _STRING, "age": {"type": "integer"}, "occupation": _STRING, "time_of_death": _STRING, "location": _STRING},
+        },
+        "suspects": {
+            "type": "array",
+            "minItems": 2,
+            "items": {
+                "type": "object",
+                "required": ["id", "name", "role", "gender", "is_murderer", "motive", "true_location", "alibi_story", "phone_number", "bio"],
+                "properties": {
+                    "id": _STRING, "name": _STRING, "role": _STRING,
+                    "gender": {"type": "string", "enum": ["male", "female"]},
+                    "is_murderer": {"type": "boolean"},
+                    "motive": _STRING, "true_location": _STRING, "alibi_story": _STRING,
+                    "alibi_id": _STRING, "phone_number": _STRING, "bio": _STRING,
+                    "opening_lines": {"type": "array", "items": _STRING},
+                },
+            },
+        },
+        "evidence": {
+            "type": "object",
+            "required": ["location_data", "footage_data", "dna_evidence", "alibis"],
+            "properties": {
+                "location_data": {"type": "object"},
+                "footage_data": {"type": "object"},
+                "dna_evidence": {"type": "object"},
+                "alibis": {"type": "object"},
+            },
+        },
+        "timeline": {"type": "object"},
+    },
+}
+
+_TYPES = {"object": dict, "array": list, "string": str, "boolean": bool, "integer": int}
+
+def _check(value, schema, path, errors):
+    """Tiny JSON-schema subset: type, enum, required, properties, items, minItems."""
+    expected = _TYPES.get(schema.get("type"))
+    if expected and (not isinstance(value, expected) or (expected is int and isinstance(value, bool))):
+        errors.append(f"{path}: expected {schema['type']}")
+        return
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path}: must be one of {schema['enum']}")
+    if isinstance(value, dict):
+        for key in schema.get("required", []):
+            if key not in value:
+                errors.append(f"{path}.{key}: required")
+        for key, sub in schema.get("properties", {}).items():
+            if key in value:
+                _check(value[key], sub, f"{path}.{key}", errors)
+    if isinstance(value, list):
+        if len(value) < schema.get("minItems", 0):
+            errors.append(f"{path}: needs at least {schema['minItems']} items")
+        if "items" in schema:
+            for i, item in enumerate(value):
+                _check(item, schema["items"], f"{path}[{i}]", errors)
+
+def validate_scenario(scenario):
+    """Returns a list of problems (empty when the scenario is playable)."""
+    errors = []
+    _check(scenario, SCENARIO_SCHEMA, "$", errors)
+    if errors:
+        return errors
+
+    suspect_ids = [s["id"] for s in scenario["suspects"]]
+    if len(set(suspect_ids)) != len(suspect_ids):
+        errors.append("$.suspects: duplicate suspect ids")
+    if sum(1 for s in scenario["suspects"] if s["is_murderer"]) != 1:
+        errors.append("$.suspects: exactly one suspect must be the murderer")
+
+    evidence = scenario["evidence"]
+    for key in evidence["location_data"]:
+        if key.replace("_phone", "") not in suspect_ids:
+            errors.append(f"$.evidence.location_data.{key}: unknown suspect")
+    for key in evidence["alibis"]:
+        if key.replace("_alibi", "") not in suspect_ids:
+            errors.append(f"$.evidence.alibis.{key}: unknown suspect")
+    for item_id, dna in evidence["dna_evidence"].items():
+        matches = dna.get("matches", [dna["primary_match"]] if "primary_match" in dna else [])
+        if not matches:
+            errors.append(f"$.evidence.dna_evidence.{item_id}: needs primary_match or matches")
+        for match in matches:
+            if match not in suspect_ids and match != "victim":
+                errors.append(f"$.evidence.dna_evidence.{item_id}: unknown suspect {match}")
+    for camera, clips in evidence["footage_data"].items():
+        for item_id in clips.get("unlocks", []):
+            if item_id not in evidence["dna_evidence"]:
+                errors.append(f"$.evidence.footage_data.{camera}.unlocks: unknown item {item_id}")
+    return errors
+
+def _index_entry(scenario):
+    return {
+        "id": scenario["case_id"],
+        "title": scenario["title"],
+        "difficulty": scenario["difficulty"].lower(),
+        "tags": scenario.get("tags", []),
+        "suspects": len(scenario["suspects"]),
+    }
+
+def pack_scenarios(scenarios):
+    """Serializes validated scenarios into pack bytes."""
+    blobs = []
+    index = []
+    offset = HEADER.size
+    seen = set()
+    for scenario in scenarios:
+        if scenario["case_id"] in seen:
+            raise ValueError(f"Duplicate case_id {scenario['case_id']}")
+        seen.add(scenario["case_id"])
+        blob = json.dumps(scenario, separators=(",", ":")).encode("utf-8")
+        entry = _index_entry(scenario)
+        entry["offset"] = offset
+        entry["length"] = len(blob)
+        index.append(entry)
+        blobs.append(blob)
+        offset += len(blob)
+    index_blob = json.dumps({"version": 1, "cases": index}, separators=(",", ":")).encode("utf-8")
+    return HEADER.pack(MAGIC, offset, len(index_blob)) + b"".join(blobs) + index_blob
+
+def load_directory(directory=SCENARIOS_DIR):
+    """Reads and validates every *.json case in a directory. Raises ValueError on bad cases."""
+    scenarios = []
+    problems = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        try:
+            with open(path, "r") as f:
+                scenario = json.load(f)
+        except json.JSONDecodeError as e:
+            problems.append(f"{os.path.basename(path)}: invalid JSON ({e})")
+            continue
+        errors = validate_scenario(scenario)
+        if errors:
+            problems.extend(f"{os.path.basename(path)}: {err}" for err in errors)
+        else:
+            scenarios.append(scenario)
+    if problems:
+        raise ValueError("Invalid scenarios:\n" + "\n".join(problems))
+    return scenarios
+
+def compile_pack(directory=SCENARIOS_DIR, output=DEFAULT_PACK_PATH):
+    scenarios = load_directory(directory)
+    data = pack_scenarios(scenarios)
+    tmp_path = output + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, output) # Atomic swap for running servers
+    return len(scenarios)
+
+class ScenarioCatalog:
+    """Read-only view over a scenario pack. Only the index is parsed up front."""
+
+    def __init__(self, buffer, source="<memory>"):
+        self._buffer = buffer
+        self.source = source
+        magic, index_offset, index_length = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{source} is not a scenario pack")
+        index = json.loads(bytes(buffer[index_offset:index_offset + index_length]))
+        self._cases = {entry["id"]: entry for entry in index["cases"]}
+
+    @classmethod
+    def open(cls, path=DEFAULT_PACK_PATH):
+        """Memory-maps a compiled pack."""
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer, source=path)
+
+    @classmethod
+    def from_directory(cls, directory=SCENARIOS_DIR):
+        """Compiles a directory in memory (dev fallback when no pack was built)."""
+        return cls(pack_scenarios(load_directory(directory)), source=directory)
+
+    def __len__(self):
+        return len(self._cases)
+
+    def __contains__(self, case_id):
+        return case_id in self._cases
+
+    def list(self, difficulty=None, tags=None):
+        """Index entries, optionally filtered by difficulty and (all of) tags. No case is decoded."""
+        results = []
+        for entry in self._cases.values():
+            if difficulty and entry["difficulty"] != difficulty.lower():
+                continue
+            if tags and not set(tags).issubset(entry["tags"]):
+                continue
+            results.append({k: v for k, v in entry.items() if k not in ("offset", "length")})
+        return results
+
+    def get_entry(self, case_id):
+        entry = self._cases.get(case_id)
+        return {k: v for k, v in entry.items() if k not in ("offset", "length")} if entry else None
+
+    def load(self, case_id):
+        """Decodes one case. Returns a fresh dict each call (games mutate their scenario)."""
+        entry = self._cases.get(case_id)
+        if not entry:
+            return None
+        start = entry["offset"]
+        return json.loads(bytes(self._buffer[start:start + entry["length"]]))
+
+    def pick(self, difficulty=None, tags=None):
+        """Random case id matching the filters, or None."""
+        matches = self.list(difficulty, tags)
+        return random.choice(matches)["id"] if matches else None
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+def get_catalog():
+    """Process-wide catalog: SCENARIO_PACK / scenarios/cases.pack if built, else scenarios/*.json."""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                path = os.getenv("SCENARIO_PACK", DEFAULT_PACK_PATH)
+                if os.path.exists(path):
+                    _catalog = ScenarioCatalog.open(path)
+                else:
+                    _catalog = ScenarioCatalog.from_directory()
+    return _catalog
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile and inspect scenario packs.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    compile_cmd = sub.add_parser("compile", help="Validate *.json cases and write a pack")
+    compile_cmd.add_argument("directory", nargs="?", default=SCENARIOS_DIR)
+    compile_cmd.add_argument("-o", "--output", default=DEFAULT_PACK_PATH)
+
+    list_cmd = sub.add_parser("list", help="List cases in a pack")
+    list_cmd.add_argument("pack", nargs="?", default=DEFAULT_PACK_PATH)
+    list_cmd.add_argument("--difficulty", choices=DIFFICULTIES)
+    list_cmd.add_argument("--tag", action="append", dest="tags")
+
+    args = parser.parse_args(argv)
+    if args.command == "compile":
+        try:
+            count = compile_pack(args.directory, args.output)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        print(f"Packed {count} cases into {args.output}")
+    else:
+        catalog = ScenarioCatalog.open(args.pack)
+        for entry in catalog.list(args.difficulty, args.tags):
+            print(f"{entry['id']:<8} {entry['difficulty']:<7} {entry['title']}  [{', '.join(entry['tags'])}]")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
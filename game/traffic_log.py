@@ -0,0 +1,100 @@
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Strings longer than this are cut down before they are stored (base64 audio, HTML blobs...)
+MAX_FIELD_CHARS = 300
+
+class TrafficLog:
+    """
+    Fixed-size ring buffer of structured traffic entries.
+
+    Every entry gets a monotonically increasing `seq`. Pollers keep the last
+    `seq` they saw (the cursor) and only fetch what came after it.
+    Entries are also kept in a small per-session ring so one player's log box
+    doesn't have to scan everyone else's traffic.
+    """
+
+    def __init__(self, capacity=200, session_capacity=50, max_sessions=100, max_field_chars=MAX_FIELD_CHARS):
+        self.capacity = capacity
+        self.session_capacity = session_capacity
+        self.max_sessions = max_sessions
+        self.max_field_chars = max_field_chars
+        self._entries = deque(maxlen=capacity)
+        self._sessions = OrderedDict() # session_id -> deque of entries (LRU)
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def add(self, direction, payload, session_id=None):
+        """Appends an entry and returns its sequence number."""
+        entry = {
+            "time": time.strftime("%H:%M:%S"),
+            "direction": direction,
+            "session_id": session_id,
+            "payload": truncate(payload, self.max_field_chars)
+        }
+        with self._lock:
+            self._seq += 1
+            entry["seq"] = self._seq
+            self._entries.append(entry)
+            if session_id is not None:
+                ring = self._sessions.get(session_id)
+                if ring is None:
+                    ring = self._sessions[session_id] = deque(maxlen=self.session_capacity)
+                    if len(self._sessions) > self.max_sessions:
+                        self._sessions.popitem(last=False)
+                else:
+                    self._sessions.move_to_end(session_id)
+                ring.append(entry)
+        return entry["seq"]
+
+    def since(self, cursor=0, session_id=None, limit=None):
+        """
+        Returns (entries, next_cursor) for everything newer than `cursor`.
+        Pass `next_cursor` back on the next poll.
+        """
+        with self._lock:
+            ring = self._entries if session_id is None else self._sessions.get(session_id, ())
+            new_entries = []
+            # Walk backwards: on a quiet log this stops after one comparison
+            for entry in reversed(ring):
+                if entry["seq"] <= cursor:
+                    break
+                new_entries.append(entry)
+            next_cursor = max(cursor, self._seq)
+        new_entries.reverse()
+        if limit is not None and len(new_entries) > limit:
+            new_entries = new_entries[-limit:]
+        return new_entries, next_cursor
+
+    @property
+    def cursor(self):
+        return self._seq
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sessions.clear()
+
+def truncate(value, limit=MAX_FIELD_CHARS):
+    """Recursively shortens long strings so the log never holds audio payloads."""
+    if isinstance(value, str):
+        if len(value) > limit:
+            return value[:limit] + f"... [{len(value) - limit} more chars]"
+        return value
+    if isinstance(value, dict):
+        return {k: truncate(v, limit) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [truncate(v, limit) for v in value]
+    return value
+
+def format_entry(entry):
+    """Renders an entry the way the old text log looked."""
+    payload = entry["payload"]
+    if not isinstance(payload, str):
+        payload = json.dumps(payload)
+    return f"[{entry['time']}] {entry['direction']}: {payload}\n" + "-"*40 + "\n"
+
+# Global traffic log shared by the API bridge and the Gradio log box
+TRAFFIC_LOG = TrafficLog()
@@ -0,0 +1,110 @@
+import os
+import threading
+from . import metrics
+
+# Per-session spend limits (0 = unlimited). Over budget a game degrades instead of failing:
+#   tokens past SOFT_LIMIT of the budget -> agents keep a short chat history
+#   tokens past the budget                -> canned replies, AI detective falls back to local moves
+#   TTS characters past their budget      -> voice off
+SESSION_TOKEN_BUDGET = int(os.getenv("SESSION_TOKEN_BUDGET", "0"))
+SESSION_TTS_CHAR_BUDGET = int(os.getenv("SESSION_TTS_CHAR_BUDGET", "0"))
+SOFT_LIMIT = 0.75
+SHORT_HISTORY_TURNS = 4 # user/model exchanges kept once over the soft limit
+
+class Usage:
+    """Token and character counters for one scope (an agent, a game, or the process)."""
+
+    def __init__(self, token_budget=0, tts_char_budget=0):
+        self.token_budget = token_budget
+        self.tts_char_budget = tts_char_budget
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.cached_tokens = 0
+        self.tts_calls = 0
+        self.tts_chars = 0
+        self._lock = threading.Lock()
+
+    @property
+    def total_tokens(self):
+        return self.prompt_tokens + self.output_tokens
+
+    def add_llm(self, prompt_tokens=0, output_tokens=0, cached_tokens=0):
+        with self._lock:
+            self.llm_calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.output_tokens += output_tokens
+            self.cached_tokens += cached_tokens
+
+    def add_tts(self, chars):
+        with self._lock:
+            self.tts_calls += 1
+            self.tts_chars += chars
+
+    def token_pressure(self):
+        """Fraction of the token budget spent (0 when unlimited)."""
+        if not self.token_budget:
+            return 0.0
+        return self.total_tokens / self.token_budget
+
+    def short_history(self):
+        return self.token_pressure() >= SOFT_LIMIT
+
+    def llm_allowed(self):
+        return self.token_pressure() < 1.0
+
+    def tts_allowed(self, chars):
+        return not self.tts_char_budget or self.tts_chars + chars <= self.tts_char_budget
+
+    def degraded(self):
+        """Names of the degradations currently in force."""
+        modes = []
+        if self.short_history():
+            modes.append("short_history")
+        if not self.llm_allowed():
+            modes.append("llm_off")
+        if self.tts_char_budget and self.tts_chars >= self.tts_char_budget:
+            modes.append("voice_off")
+        return modes
+
+    def snapshot(self):
+        return {
+            "llm_calls": self.llm_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "cached_tokens": self.cached_tokens,
+            "total_tokens": self.total_tokens,
+            "tts_calls": self.tts_calls,
+            "tts_chars": self.tts_chars,
+            "token_budget": self.token_budget,
+            "tts_char_budget": self.tts_char_budget,
+            "degraded": self.degraded(),
+        }
+
+def session_usage():
+    """Usage for a new game, with the configured budgets."""
+    return Usage(SESSION_TOKEN_BUDGET, SESSION_TTS_CHAR_BUDGET)
+
+# Everything this process has spent
+PROCESS_USAGE = Usage()
+
+def record_llm(response, role, *scopes):
+    """Reads usage_metadata off a Gemini response and adds it to each scope, the process and metrics."""
+    meta = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(meta, "prompt_token_count", 0) or 0
+    # Thinking models report their reasoning separately; it is billed as output
+    output_tokens = (getattr(meta, "candidates_token_count", 0) or 0) + (getattr(meta, "thoughts_token_count", 0) or 0)
+    cached_tokens = getattr(meta, "cached_content_token_count", 0) or 0
+    for scope in scopes + (PROCESS_USAGE,):
+        if scope is not None:
+            scope.add_llm(prompt_tokens, output_tokens, cached_tokens)
+    metrics.LLM_TOKENS.inc(prompt_tokens, role=role, kind="prompt")
+    metrics.LLM_TOKENS.inc(output_tokens, role=role, kind="output")
+    if cached_tokens:
+        metrics.LLM_TOKENS.inc(cached_tokens, role=role, kind="cached")
+
+def record_tts(chars, *scopes):
+    for scope in scopes + (PROCESS_USAGE,):
+        if scope is not None:
+            scope.add_tts(chars)
+    metrics.TTS_CHARS.inc(chars)
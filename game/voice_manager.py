@@ -1,13 +1,85 @@
 import os
 import random
-from elevenlabs.client import ElevenLabs
+import time
+import threading
+import uuid
+from collections import OrderedDict
+from . import metrics
+from .config import load_env
+from .usage import record_tts
+from .load_governor import GOVERNOR
+
+def clean_for_tts(text):
+    """Strips stage directions like '(Nervously)' and markdown asterisks before synthesis."""
+    cleaned = text or ""
+    # Remove text within leading parentheses (e.g., "(A bit defensively)")
+    if cleaned.strip().startswith('(') and ')' in cleaned:
+        cleaned = cleaned[cleaned.find(')') + 1:]
+    return cleaned.replace('*', '').strip()
+
+class AudioCache:
+    """Process-wide LRU of synthesized audio keyed by (voice_id, text), bounded in bytes."""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, voice_id, text):
+        with self._lock:
+            audio = self._items.get((voice_id, text))
+            if audio is not None:
+                self._items.move_to_end((voice_id, text))
+            return audio
+
+    def put(self, voice_id, text, audio):
+        with self._lock:
+            key = (voice_id, text)
+            if key in self._items:
+                return
+            self._items[key] = audio
+            self._size += len(audio)
+            while self._size > self.max_bytes and self._items:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+
+    def __contains__(self, key):
+        return key in self._items
+
+AUDIO_CACHE = AudioCache(int(os.getenv("VOICE_CACHE_BYTES", str(32 * 1024 * 1024))))
+
+class ClipStore:
+    """
+    Short-lived audio clips handed to the browser by reference (/api/audio/<id>)
+    instead of base64 inside bridge replies. Oldest clips are dropped first.
+    """
+
+    def __init__(self, capacity=200):
+        self.capacity = capacity
+        self._clips = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, audio):
+        clip_id = uuid.uuid4().hex
+        with self._lock:
+            self._clips[clip_id] = audio
+            while len(self._clips) > self.capacity:
+                self._clips.popitem(last=False)
+        return clip_id
+
+    def get(self, clip_id):
+        return self._clips.get(clip_id)
+
+CLIP_STORE = ClipStore()
 
 class VoiceManager:
-    def __init__(self):
+    def __init__(self, usage=None):
+        load_env()
+        self.usage = usage # Game spend; synthesis stops once its character budget is used
         self.api_key = os.getenv("ELEVENLABS_API_KEY")
-        self.client = None
-        if self.api_key:
-            self.client = ElevenLabs(api_key=self.api_key)
+        self._client = None
+        self._client_lock = threading.Lock()
             
         # Archetype-based Voice Mapping
         # We map the suspect's 'archetype' (from image metadata or role logic) or gender to these.
@@ -29,6 +101,25 @@ class VoiceManager:
             }
         }
 
+    @property
+    def client(self):
+        """ElevenLabs client, created (and the SDK imported) on first synthesis."""
+        if self._client is None and self.api_key:
+            with self._client_lock:
+                if self._client is None:
+                    from elevenlabs.client import ElevenLabs
+                    # ELEVENLABS_BASE_URL points synthesis elsewhere (e.g. the fake provider in loadtest/)
+                    base_url = os.getenv("ELEVENLABS_BASE_URL")
+                    if base_url:
+                        self._client = ElevenLabs(api_key=self.api_key, base_url=base_url)
+                    else:
+                        self._client = ElevenLabs(api_key=self.api_key)
+        return self._client
+
+    def warm_up(self):
+        """Builds the client ahead of the first synthesis. Returns whether TTS is available."""
+        return self.client is not None
+
     def assign_voice(self, gender, role=""):
         """Pick a voice based on gender and role archetype."""
         g = "male" if gender.lower() == "male" else "female"
@@ -53,11 +144,23 @@ class VoiceManager:
         return voice_map.get(archetype, voice_map["default"])
 
     def generate_audio(self, text, voice_id):
-        """Generates audio bytes from text."""
+        """Generates audio bytes from text (served from the audio cache when pre-synthesized)."""
         if not self.client:
             print("Warning: No ElevenLabs API Key. Skipping TTS.")
             return None
             
+        cached = AUDIO_CACHE.get(voice_id, text)
+        if cached is not None:
+            metrics.TTS_CALLS.inc(outcome="cache_hit")
+            return cached
+        if self.usage is not None and not self.usage.tts_allowed(len(text)):
+            metrics.TTS_CALLS.inc(outcome="budget")
+            return None
+        if not GOVERNOR.voice_enabled():
+            metrics.TTS_CALLS.inc(outcome="shed")
+            return None
+            
+        start = time.perf_counter()
         try:
             # Modern SDK usage
             audio_generator = self.client.text_to_speech.convert(
@@ -67,7 +170,39 @@ class VoiceManager:
             )
             # Consolidate generator into bytes
             audio_bytes = b"".join(audio_generator)
+            metrics.TTS_CALLS.inc(outcome="ok")
+            record_tts(len(text), self.usage)
+            AUDIO_CACHE.put(voice_id, text, audio_bytes)
             return audio_bytes
         except Exception as e:
             print(f"ElevenLabs Error: {e}")
-            return None
\ No newline at end of file
+            metrics.TTS_CALLS.inc(outcome="error")
+            return None
+        finally:
+            metrics.TTS_LATENCY.observe(time.perf_counter() - start)
+
+    def prefetch(self, lines, char_budget):
+        """
+        Synthesizes (text, voice_id) pairs in a background thread, stopping once
+        `char_budget` characters have been sent to ElevenLabs. Lines already in the
+        cache are free. Returns the thread (None when TTS is unavailable).
+        """
+        if not self.api_key or char_budget <= 0:
+            return None
+        
+        def run():
+            spent = 0
+            for text, voice_id in lines:
+                if not GOVERNOR.voice_enabled():
+                    break
+                text = clean_for_tts(text)
+                if not text or (voice_id, text) in AUDIO_CACHE:
+                    continue
+                if spent + len(text) > char_budget:
+                    break
+                spent += len(text)
+                self.generate_audio(text, voice_id)
+        
+        thread = threading.Thread(target=run, name="voice-warmup", daemon=True)
+        thread.start()
+        return thread
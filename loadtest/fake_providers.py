@@ -0,0 +1,174 @@
+"""
+Local stand-ins for Gemini and ElevenLabs, for load tests.
+
+    python -m loadtest.fake_providers --gemini-port 8801 --tts-port 8802 \\
+        --gemini-latency-ms 900 --gemini-error-rate 0.01 --tts-latency-ms 400
+
+Point the app at them with:
+
+    GEMINI_API_KEY=fake GEMINI_API_ENDPOINT=http://127.0.0.1:8801
+    ELEVENLABS_API_KEY=fake ELEVENLABS_BASE_URL=http://127.0.0.1:8802
+
+Latency is log-normal around the median (`--*-jitter` is its sigma); a
+fraction of requests fail with the configured status, like an overloaded
+provider would.
+"""
+import argparse
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SUSPECT_LINES = [
+    "I was at home all evening. Ask my neighbour, she saw my lights on.",
+    "I left the office at eight. I had nothing to do with this.",
+    "Look, we argued, everybody knows that. That doesn't make me a killer.",
+    "I was on the phone with my sister most of the night.",
+    "You should be asking who had keys to that floor, detective.",
+]
+
+class Profile:
+    """Latency (log-normal) and error distribution of one fake service."""
+
+    def __init__(self, latency_ms, jitter=0.5, error_rate=0.0, error_status=503):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+
+    def delay(self):
+        if self.latency_ms > 0:
+            time.sleep(random.lognormvariate(math.log(self.latency_ms), self.jitter) / 1000)
+
+    def fails(self):
+        return random.random() < self.error_rate
+
+def _first_enum(schema, name):
+    """Reads properties.<name>.enum[0] from a responseSchema (any key casing)."""
+    try:
+        values = schema["properties"][name]["enum"]
+        return values[0] if values else None
+    except (KeyError, TypeError, IndexError):
+        return None
+
+def fake_decision(generation_config):
+    """A plausible AI detective move, using the live enums from the response schema."""
+    schema = generation_config.get("responseSchema") or generation_config.get("response_schema") or {}
+    suspect_id = _first_enum(schema, "suspect_id") or "suspect_1"
+    camera = _first_enum(schema.get("properties", {}).get("args", {}), "location")
+    if camera and random.random() < 0.3:
+        return {"thought": "Footage first.", "action": "use_tool", "tool_name": "get_footage", "args": {"location": camera}}
+    return {"thought": "Let me press them.", "action": "chat", "suspect_id": suspect_id, "message": "Where were you at the time of the murder?"}
+
+def _count_tokens(value):
+    return max(1, len(json.dumps(value)) // 4)
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    profile = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        data = self.rfile.read(length) if length else b""
+        try:
+            return json.loads(data) if data else {}
+        except json.JSONDecodeError:
+            return {}
+
+    def _send(self, status, data, content_type="application/json"):
+        if not isinstance(data, bytes):
+            data = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+class GeminiHandler(_Handler):
+    """generateContent (REST shape, with usageMetadata). Context caches are always refused."""
+
+    def do_POST(self):
+        body = self._body()
+        path = self.path.split("?")[0]
+        if path.endswith("/cachedContents"):
+            # Like a real instruction below the provider's minimum cache size
+            return self._send(400, {"error": {"code": 400, "message": "Cached content is too small.", "status": "INVALID_ARGUMENT"}})
+        if not re.search(r"/models/[^/]+:generateContent$", path):
+            return self._send(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+
+        self.profile.delay()
+        if self.profile.fails():
+            return self._send(self.profile.error_status, {"error": {"code": self.profile.error_status, "message": "Overloaded", "status": "UNAVAILABLE"}})
+
+        config = body.get("generationConfig") or {}
+        if config.get("responseMimeType") == "application/json":
+            text = json.dumps(fake_decision(config))
+        else:
+            text = random.choice(SUSPECT_LINES)
+        prompt_tokens = _count_tokens(body.get("contents", [])) + _count_tokens(body.get("systemInstruction", ""))
+        output_tokens = _count_tokens(text)
+        self._send(200, {
+            "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP", "index": 0}],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": output_tokens,
+                "totalTokenCount": prompt_tokens + output_tokens,
+            },
+        })
+
+class ElevenLabsHandler(_Handler):
+    """text-to-speech/{voice_id}: returns fake MP3 bytes sized like real speech (~1 KB per 10 chars)."""
+
+    def do_POST(self):
+        body = self._body()
+        if not self.path.startswith("/v1/text-to-speech/"):
+            return self._send(404, {"detail": "Not found"})
+        self.profile.delay()
+        if self.profile.fails():
+            return self._send(self.profile.error_status, {"detail": {"status": "system_busy", "message": "Overloaded"}})
+        size = max(1024, len(body.get("text", "")) * 100)
+        self._send(200, b"ID3" + b"\0" * size, content_type="audio/mpeg")
+
+def serve(handler, profile, host="127.0.0.1", port=0):
+    """Starts a fake service on a daemon thread. Returns the server (server_address has the port)."""
+    handler = type(handler.__name__, (handler,), {"profile": profile})
+    httpd = ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, name=f"fake-{handler.__name__}", daemon=True).start()
+    return httpd
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fake Gemini and ElevenLabs services for load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--gemini-port", type=int, default=8801)
+    parser.add_argument("--gemini-latency-ms", type=float, default=900)
+    parser.add_argument("--gemini-jitter", type=float, default=0.5)
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-error-status", type=int, default=503)
+    parser.add_argument("--tts-port", type=int, default=8802)
+    parser.add_argument("--tts-latency-ms", type=float, default=400)
+    parser.add_argument("--tts-jitter", type=float, default=0.4)
+    parser.add_argument("--tts-error-rate", type=float, default=0.0)
+    parser.add_argument("--tts-error-status", type=int, default=503)
+    args = parser.parse_args(argv)
+
+    gemini = serve(GeminiHandler, Profile(args.gemini_latency_ms, args.gemini_jitter, args.gemini_error_rate, args.gemini_error_status), args.host, args.gemini_port)
+    tts = serve(ElevenLabsHandler, Profile(args.tts_latency_ms, args.tts_jitter, args.tts_error_rate, args.tts_error_status), args.host, args.tts_port)
+    print(f"Fake Gemini:     http://{args.host}:{gemini.server_address[1]}", file=sys.stderr)
+    print(f"Fake ElevenLabs: http://{args.host}:{tts.server_address[1]}", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
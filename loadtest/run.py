@@ -0,0 +1,236 @@
+"""
+Load generator: concurrent virtual players driving /api/bridge.
+
+    python -m loadtest.fake_providers &
+    GEMINI_API_KEY=fake GEMINI_API_ENDPOINT=http://127.0.0.1:8801 \\
+    ELEVENLABS_API_KEY=fake ELEVENLABS_BASE_URL=http://127.0.0.1:8802 python app.py &
+    python -m loadtest.run --players 50 --duration 60 --voice
+
+Each player opens a case ("start"), questions suspects, uses tools, runs a
+line-up and accuses until the game ends, then starts another. The report has
+throughput, latency percentiles and error rates per action, and memory per
+concurrent game (from /metrics).
+"""
+import argparse
+import http.client
+import json
+import random
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+QUESTIONS = [
+    "Where were you at the time of the murder?",
+    "How well did you know the victim?",
+    "Who can confirm your alibi?",
+    "What's your Alibi ID?",
+]
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list) # action -> seconds
+        self.errors = defaultdict(int) # action -> transport/HTTP failures
+        self.game_errors = defaultdict(int) # action -> tool_error replies
+        self.games = 0
+        self._lock = threading.Lock()
+
+    def record(self, action, seconds, ok, game_error=False):
+        with self._lock:
+            self.latencies[action].append(seconds)
+            if not ok:
+                self.errors[action] += 1
+            elif game_error:
+                self.game_errors[action] += 1
+
+    def game_done(self):
+        with self._lock:
+            self.games += 1
+
+class Player:
+    """One virtual player on its own keep-alive connection."""
+
+    def __init__(self, base_url, stats, think_ms=500, voice=False):
+        url = urlsplit(base_url)
+        conn_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        self.conn = conn_class(url.hostname, url.port, timeout=120)
+        self.stats = stats
+        self.think_ms = think_ms
+        self.voice = voice
+        self.session_id = None
+
+    def send(self, action, data=None):
+        body = json.dumps({"action": action, "data": data or {}, "session_id": self.session_id})
+        label = data.get("tool", action) if action == "use_tool" and data else action
+        start = time.perf_counter()
+        try:
+            self.conn.request("POST", "/api/bridge", body, {"Content-Type": "application/json"})
+            response = self.conn.getresponse()
+            payload = response.read()
+            ok = response.status == 200
+            reply = json.loads(payload) if ok and payload else {}
+        except (OSError, http.client.HTTPException, json.JSONDecodeError):
+            self.conn.close() # Reconnects on the next request
+            ok, reply = False, {}
+        self.stats.record(label, time.perf_counter() - start, ok, reply.get("action") == "tool_error")
+        return reply
+
+    def think(self):
+        if self.think_ms > 0:
+            time.sleep(random.expovariate(1000 / self.think_ms))
+
+    def play_game(self):
+        self.session_id = None
+        init = self.send("start", {"difficulty": random.choice(["easy", "medium", "hard"]), "voice": self.voice})
+        if init.get("action") != "init_game":
+            return
+        self.session_id = init["data"]["session_id"]
+        state = init["data"]["state"]["set"]
+        suspects = [s["id"] for s in state["suspects"]]
+
+        for suspect_id in random.sample(suspects, min(2, len(suspects))):
+            self.think()
+            self.send("chat_message", {"suspect_id": suspect_id, "message": random.choice(QUESTIONS)})
+        self.think()
+        self.send("use_tool", {"tool": "get_footage", "input": random.choice(state["available_cameras"])})
+        self.think()
+        phone = random.choice(state["suspects"])["phone_number"]
+        self.send("use_tool", {"tool": "get_location", "input": phone})
+        self.think()
+        self.send("question_all", {"message": random.choice(QUESTIONS)})
+
+        # Accuse until the game ends (at most once per suspect)
+        for suspect_id in random.sample(suspects, len(suspects)):
+            self.think()
+            reply = self.send("use_tool", {"tool": "accuse", "suspect_id": suspect_id})
+            if reply.get("action") in ("game_over", "tool_error", None):
+                break
+        self.stats.game_done()
+
+def scrape_metrics(base_url):
+    """(resident memory bytes, active sessions) from /metrics, or None."""
+    url = urlsplit(base_url)
+    conn = http.client.HTTPConnection(url.hostname, url.port, timeout=10)
+    try:
+        conn.request("GET", "/metrics")
+        text = conn.getresponse().read().decode("utf-8")
+    except (OSError, http.client.HTTPException):
+        return None
+    finally:
+        conn.close()
+    values = {}
+    for name in ("process_resident_memory_bytes", "murder_active_sessions"):
+        match = re.search(rf"^{name} (\S+)$", text, re.M)
+        values[name] = float(match.group(1)) if match else 0.0
+    return values["process_resident_memory_bytes"], values["murder_active_sessions"]
+
+def run(base_url, players, duration, think_ms=500, voice=False, ramp=5.0):
+    stats = Stats()
+    deadline = time.monotonic() + duration
+    baseline = scrape_metrics(base_url)
+    memory_samples = []
+    stop = threading.Event()
+
+    def sample_memory():
+        while not stop.wait(2):
+            sample = scrape_metrics(base_url)
+            if sample:
+                memory_samples.append(sample)
+
+    def player_loop(index):
+        time.sleep(ramp * index / max(1, players)) # Spread the starts
+        player = Player(base_url, stats, think_ms, voice)
+        while time.monotonic() < deadline:
+            player.play_game()
+
+    sampler = threading.Thread(target=sample_memory, daemon=True)
+    sampler.start()
+    started = time.monotonic()
+    threads = [threading.Thread(target=player_loop, args=(i,), daemon=True) for i in range(players)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    stop.set()
+    return build_report(stats, elapsed, players, baseline, memory_samples)
+
+def build_report(stats, elapsed, players, baseline, memory_samples):
+    actions = {}
+    total = errors = game_errors = 0
+    for action, values in sorted(stats.latencies.items()):
+        total += len(values)
+        errors += stats.errors[action]
+        game_errors += stats.game_errors[action]
+        actions[action] = {
+            "requests": len(values),
+            "error_rate": stats.errors[action] / len(values),
+            "tool_error_rate": stats.game_errors[action] / len(values),
+            "p50_ms": percentile(values, 50) * 1000,
+            "p90_ms": percentile(values, 90) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "max_ms": max(values) * 1000,
+        }
+    report = {
+        "players": players,
+        "seconds": elapsed,
+        "requests": total,
+        "throughput_rps": total / elapsed if elapsed else 0.0,
+        "games_completed": stats.games,
+        "error_rate": errors / total if total else 0.0,
+        "tool_error_rate": game_errors / total if total else 0.0,
+        "actions": actions,
+    }
+    if baseline and memory_samples:
+        peak_rss, peak_sessions = max(memory_samples)
+        report["memory"] = {
+            "baseline_rss_mb": baseline[0] / 2**20,
+            "peak_rss_mb": peak_rss / 2**20,
+            "sessions_at_peak": peak_sessions,
+            "mb_per_game": (peak_rss - baseline[0]) / 2**20 / max(1.0, peak_sessions - baseline[1]),
+        }
+    return report
+
+def print_report(report):
+    print(f"\n{report['players']} players, {report['seconds']:.1f}s: {report['requests']} requests, "
+          f"{report['throughput_rps']:.1f} req/s, {report['games_completed']} games completed")
+    print(f"errors {report['error_rate']:.2%}  tool errors {report['tool_error_rate']:.2%}\n")
+    print(f"{'action':<16}{'reqs':>7}{'err%':>7}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for action, row in report["actions"].items():
+        print(f"{action:<16}{row['requests']:>7}{row['error_rate']*100:>7.1f}"
+              f"{row['p50_ms']:>9.0f}{row['p90_ms']:>9.0f}{row['p99_ms']:>9.0f}{row['max_ms']:>9.0f}")
+    memory = report.get("memory")
+    if memory:
+        print(f"\nRSS {memory['baseline_rss_mb']:.0f} MB -> {memory['peak_rss_mb']:.0f} MB "
+              f"at {memory['sessions_at_peak']:.0f} sessions: {memory['mb_per_game']:.2f} MB per game")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive concurrent players through /api/bridge.")
+    parser.add_argument("--url", default="http://127.0.0.1:7860")
+    parser.add_argument("--players", type=int, default=20, help="Concurrent players")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to keep starting games")
+    parser.add_argument("--think-ms", type=float, default=500, help="Mean pause between a player's actions")
+    parser.add_argument("--ramp", type=float, default=5, help="Seconds over which players join")
+    parser.add_argument("--voice", action="store_true", help="Request TTS for suspect replies")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args(argv)
+
+    report = run(args.url, args.players, args.duration, args.think_ms, args.voice, args.ramp)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
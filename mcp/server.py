@@ -0,0 +1,421 @@
+"""
+MCP server for the investigation tools.
+
+Runs without Gradio, so external agents can open a case and play it:
+
+    python -m mcp.server --stdio                 # newline-delimited JSON-RPC on stdin/stdout
+    python -m mcp.server --http --port 8765      # streamable HTTP on POST /mcp
+
+Every tool except `start_case` takes a `session_id` returned by `start_case`.
+Calls against different sessions run concurrently; calls against the same
+session are serialized, like bridge actions in app.py. A game ends on its
+verdict, on `end_case`, when the HTTP client that opened it sends DELETE, or
+when it is the least recently used past MCP_MAX_GAMES. An HTTP client's
+Mcp-Session-Id lasts until its last game ends (it initializes again for the
+next one), and at most MCP_MAX_GAMES of them are known at once.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from game import game_engine
+
+PROTOCOL_VERSION = "2025-03-26"
+SUPPORTED_VERSIONS = ("2025-03-26", "2024-11-05")
+SERVER_INFO = {"name": "murder-ai", "version": "1.0.0"}
+
+# Open games kept per server; the least recently used is ended past this
+MAX_GAMES = int(os.getenv("MCP_MAX_GAMES", "200"))
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+
+def _schema(properties, required=()):
+    return {"type": "object", "properties": properties, "required": list(required)}
+
+_SESSION = {"type": "string", "description": "Id returned by start_case."}
+
+TOOLS = [
+    {
+        "name": "start_case",
+        "description": "Opens a new murder case and returns its session_id, victim and suspects.",
+        "inputSchema": _schema({
+            "difficulty": {"type": "string", "enum": ["easy", "medium", "hard"]},
+            "case_id": {"type": "string", "description": "Specific case to open (optional)."},
+        }),
+    },
+    {
+        "name": "get_location",
+        "description": "Phone location history of a suspect. Costs 2 points.",
+        "inputSchema": _schema({
+            "session_id": _SESSION,
+            "phone_number": {"type": "string"},
+            "timestamp": {"type": "string", "description": "e.g. 8:47 PM (optional)."},
+        }, ["session_id", "phone_number"]),
+    },
+    {
+        "name": "get_footage",
+        "description": "Security camera footage. May unlock physical evidence. Costs 3 points.",
+        "inputSchema": _schema({
+            "session_id": _SESSION,
+            "location": {"type": "string", "description": "Camera name."},
+            "time_range": {"type": "string"},
+        }, ["session_id", "location"]),
+    },
+    {
+        "name": "get_dna_test",
+        "description": "DNA test on an unlocked evidence item. Costs 4 points.",
+        "inputSchema": _schema({
+            "session_id": _SESSION,
+            "evidence_id": {"type": "string"},
+        }, ["session_id", "evidence_id"]),
+    },
+    {
+        "name": "call_alibi",
+        "description": "Calls a suspect's alibi witness with a question. Costs 1 point.",
+        "inputSchema": _schema({
+            "session_id": _SESSION,
+            "alibi_id": {"type": "string"},
+            "question": {"type": "string"},
+        }, ["session_id", "alibi_id", "question"]),
+    },
+    {
+        "name": "interrogate",
+        "description": "Asks a suspect a question. Free.",
+        "inputSchema": _schema({
+            "session_id": _SESSION,
+            "suspect_id": {"type": "string"},
+            "question": {"type": "string"},
+        }, ["session_id", "suspect_id", "question"]),
+    },
+    {
+        "name": "accuse",
+        "description": "Accuses a suspect. A wrong accusation costs a round; three ends the game.",
+        "inputSchema": _schema({
+            "session_id": _SESSION,
+            "suspect_id": {"type": "string"},
+        }, ["session_id", "suspect_id"]),
+    },
+    {
+        "name": "end_case",
+        "description": "Closes a case you no longer need (finished cases close themselves).",
+        "inputSchema": _schema({"session_id": _SESSION}, ["session_id"]),
+    },
+]
+
+TOOL_INDEX = {tool["name"]: tool for tool in TOOLS}
+
+class ToolError(Exception):
+    """Bad tool arguments: reported as a tool result with isError, not a protocol error."""
+
+class InvestigationServer:
+    """Transport-independent MCP request handling."""
+
+    def __init__(self, max_games=MAX_GAMES):
+        self.max_games = max_games
+        self.games = OrderedDict() # session_id -> owner (Mcp-Session-Id, None over stdio), LRU by use
+        self.clients = OrderedDict() # Mcp-Session-Id -> None, HTTP clients handed an id by initialize, LRU by use
+        self._locks = {} # session_id -> Lock, for open games only
+        self._locks_guard = threading.Lock()
+
+    def _session_lock(self, session_id):
+        with self._locks_guard:
+            lock = self._locks.get(session_id)
+            if lock is None:
+                lock = self._locks[session_id] = threading.Lock()
+            return lock
+
+    def _open(self, session_id, owner):
+        with self._locks_guard:
+            self.games[session_id] = owner
+            evicted = []
+            while len(self.games) > self.max_games:
+                evicted.append(self.games.popitem(last=False)[0])
+        for old in evicted:
+            self.end(old)
+
+    def _touch(self, session_id):
+        with self._locks_guard:
+            if session_id in self.games:
+                self.games.move_to_end(session_id)
+
+    def end(self, session_id):
+        """Ends a game and forgets its lock (and its owner's id once the owner has no games left)."""
+        with self._locks_guard:
+            owner = self.games.pop(session_id, None)
+            self._locks.pop(session_id, None)
+            if owner is not None and owner not in self.games.values():
+                self.clients.pop(owner, None)
+        return game_engine.end_game(session_id) is not None
+
+    def end_owner(self, owner):
+        """Ends every game opened by an HTTP client (its Mcp-Session-Id) and forgets the client."""
+        with self._locks_guard:
+            self.clients.pop(owner, None)
+            owned = [session_id for session_id, o in self.games.items() if o == owner]
+        for session_id in owned:
+            self.end(session_id)
+        return len(owned)
+
+    def open_client(self):
+        """New Mcp-Session-Id; the least recently used client past max_games is ended."""
+        client = uuid.uuid4().hex
+        with self._locks_guard:
+            self.clients[client] = None
+            evicted = []
+            while len(self.clients) > self.max_games:
+                evicted.append(self.clients.popitem(last=False)[0])
+        for old in evicted:
+            self.end_owner(old)
+        return client
+
+    def has_client(self, client):
+        with self._locks_guard:
+            if client not in self.clients:
+                return False
+            self.clients.move_to_end(client)
+            return True
+
+    def handle(self, message, owner=None):
+        """One JSON-RPC message (or batch) -> response (None for notifications)."""
+        if isinstance(message, list):
+            if not message:
+                return _error(None, INVALID_REQUEST, "Empty batch")
+            responses = [r for r in (self.handle(m, owner) for m in message) if r is not None]
+            return responses or None
+        if not isinstance(message, dict) or message.get("jsonrpc") != "2.0" or "method" not in message:
+            return _error(message.get("id") if isinstance(message, dict) else None, INVALID_REQUEST, "Invalid request")
+
+        request_id = message.get("id")
+        is_notification = "id" not in message
+        params = message.get("params") or {}
+        try:
+            result = self.dispatch(message["method"], params, owner)
+        except _RpcError as e:
+            return None if is_notification else _error(request_id, e.code, str(e))
+        except Exception as e:
+            print(f"MCP Error: {message['method']} failed: {e}", file=sys.stderr)
+            return None if is_notification else _error(request_id, -32603, "Internal error")
+        if is_notification:
+            return None
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    def dispatch(self, method, params, owner=None):
+        if method == "initialize":
+            requested = params.get("protocolVersion")
+            return {
+                "protocolVersion": requested if requested in SUPPORTED_VERSIONS else PROTOCOL_VERSION,
+                "capabilities": {"tools": {"listChanged": False}},
+                "serverInfo": SERVER_INFO,
+            }
+        if method in ("notifications/initialized", "notifications/cancelled"):
+            return None
+        if method == "ping":
+            return {}
+        if method == "tools/list":
+            return {"tools": TOOLS}
+        if method == "tools/call":
+            return self.call_tool(params.get("name"), params.get("arguments") or {}, owner)
+        raise _RpcError(METHOD_NOT_FOUND, f"Unknown method {method}")
+
+    def call_tool(self, name, arguments, owner=None):
+        if name not in TOOL_INDEX:
+            raise _RpcError(INVALID_PARAMS, f"Unknown tool {name}")
+        try:
+            result = self._run_tool(name, dict(arguments), owner)
+        except ToolError as e:
+            return _tool_result({"error": str(e)}, is_error=True)
+        return _tool_result(result, is_error="error" in result)
+
+    def _run_tool(self, name, args, owner=None):
+        if name == "start_case":
+            session_id, game = game_engine.start_game(args.get("difficulty") or "medium", args.get("case_id"))
+            self._open(session_id, owner)
+            return {"session_id": session_id, **_briefing(game)}
+
+        session_id = args.pop("session_id", None)
+        game = game_engine.get_game(session_id)
+        if game is None:
+            raise ToolError(f"Unknown session {session_id}. Call start_case first.")
+        missing = [key for key in TOOL_INDEX[name]["inputSchema"]["required"] if key != "session_id" and not args.get(key)]
+        if missing:
+            raise ToolError(f"Missing arguments: {', '.join(missing)}")
+        if name == "end_case":
+            return {"session_id": session_id, "ended": self.end(session_id)}
+
+        self._touch(session_id)
+        with self._session_lock(session_id):
+            if name == "interrogate":
+                if not any(s["id"] == args["suspect_id"] for s in game.scenario["suspects"]):
+                    raise ToolError(f"Unknown suspect {args['suspect_id']}")
+                return {"suspect_id": args["suspect_id"], "response": game.question_suspect(args["suspect_id"], args["question"])}
+            if name == "accuse":
+                if not any(s["id"] == args["suspect_id"] for s in game.scenario["suspects"]):
+                    raise ToolError(f"Unknown suspect {args['suspect_id']}")
+                result = game.make_accusation(args["suspect_id"])
+                if game.game_over:
+                    self.end(session_id) # Verdict is final: nothing left to call
+                return result
+            allowed = TOOL_INDEX[name]["inputSchema"]["properties"]
+            result = game.use_tool(name, **{k: v for k, v in args.items() if k in allowed})
+            result = {k: v for k, v in result.items() if not k.startswith("_")}
+            result["points_left"] = game.points
+            return result
+
+class _RpcError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+def _error(request_id, code, message):
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+def _tool_result(data, is_error=False):
+    return {
+        "content": [{"type": "text", "text": json.dumps(data)}],
+        "structuredContent": data,
+        "isError": is_error,
+    }
+
+def _briefing(game):
+    """What a player may know at the start (no answers)."""
+    scenario = game.scenario
+    return {
+        "title": scenario["title"],
+        "victim": scenario["victim"],
+        "suspects": [
+            {k: s.get(k) for k in ("id", "name", "role", "phone_number")}
+            for s in scenario["suspects"]
+        ],
+        "cameras": list(scenario["evidence"]["footage_data"].keys()),
+        "points": game.points,
+        "round": game.round,
+    }
+
+# --- stdio transport ---
+
+def serve_stdio(server, workers=8):
+    """
+    Newline-delimited JSON-RPC. Requests are handled on a pool so a slow call
+    (alibi LLM, interrogation) doesn't hold up the rest; replies carry their id.
+    """
+    out = sys.stdout
+    sys.stdout = sys.stderr # Tool code prints; only protocol messages may reach stdout
+    write_lock = threading.Lock()
+
+    def reply(message):
+        response = server.handle(message)
+        if response is not None:
+            with write_lock:
+                out.write(json.dumps(response) + "\n")
+                out.flush()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mcp") as pool:
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                with write_lock:
+                    out.write(json.dumps(_error(None, PARSE_ERROR, "Parse error")) + "\n")
+                    out.flush()
+                continue
+            pool.submit(reply, message)
+
+# --- Streamable HTTP transport ---
+
+class _MCPHandler(BaseHTTPRequestHandler):
+    server_version = "MurderAI-MCP/1.0"
+    protocol_version = "HTTP/1.1" # Keep-alive for agents calling at high rates
+    mcp = None # InvestigationServer, set by make_http_server
+
+    def log_message(self, format, *args):
+        pass # Quiet: tool calls are logged by the game
+
+    def _send(self, status, body=None, headers=None):
+        data = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.send_response(status)
+        if body is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if self.path.split("?")[0] != "/mcp":
+            return self._send(404, {"error": "Not found"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            message = json.loads(self.rfile.read(length))
+        except (ValueError, json.JSONDecodeError):
+            return self._send(400, _error(None, PARSE_ERROR, "Parse error"))
+
+        messages = message if isinstance(message, list) else [message]
+        initializing = any(isinstance(m, dict) and m.get("method") == "initialize" for m in messages)
+        session_header = self.headers.get("Mcp-Session-Id")
+        if not initializing and session_header and not self.mcp.has_client(session_header):
+            return self._send(404, _error(None, INVALID_REQUEST, "Unknown Mcp-Session-Id"))
+
+        if initializing:
+            session_header = self.mcp.open_client()
+        response = self.mcp.handle(message, owner=session_header)
+        headers = {}
+        if initializing:
+            headers["Mcp-Session-Id"] = session_header
+        if response is None:
+            return self._send(202, headers=headers) # Only notifications/responses
+        self._send(200, response, headers)
+
+    def do_GET(self):
+        # No server-initiated messages: clients must not hold an SSE stream open
+        self._send(405, headers={"Allow": "POST, DELETE"})
+
+    def do_DELETE(self):
+        # Client is done: its games go with it
+        session_header = self.headers.get("Mcp-Session-Id")
+        if session_header:
+            self.mcp.end_owner(session_header)
+        self._send(204)
+
+def make_http_server(server, host="127.0.0.1", port=8765):
+    handler = type("MCPHandler", (_MCPHandler,), {"mcp": server})
+    httpd = ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+    return httpd
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MCP server for the Murder.Ai investigation tools.")
+    transport = parser.add_mutually_exclusive_group()
+    transport.add_argument("--stdio", action="store_true", help="Serve over stdin/stdout (default)")
+    transport.add_argument("--http", action="store_true", help="Serve streamable HTTP on /mcp")
+    parser.add_argument("--host", default=os.getenv("MCP_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("MCP_PORT", "8765")))
+    args = parser.parse_args(argv)
+
+    server = InvestigationServer()
+    if args.http:
+        httpd = make_http_server(server, args.host, args.port)
+        print(f"MCP server listening on http://{args.host}:{args.port}/mcp", file=sys.stderr)
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    else:
+        serve_stdio(server)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
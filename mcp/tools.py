@@ -152,10 +152,10 @@ def get_dna_test(case_data, evidence_id: str) -> dict:
         
     return {"error": "Inconclusive test result."}
 
-def call_alibi(case_data, alibi_id: str = None, question: str = None, phone_number: str = None) -> dict:
+def call_alibi(case_data, alibi_id: str = None, question: str = None, phone_number: str = None, usage=None) -> dict:
     """
     Call an alibi witness using an LLM agent.
-    Requires `alibi_id` and `question`.
+    Requires `alibi_id` and `question`. `usage` is the calling game's spend (budgets apply).
     """
     print(f"Calling alibi with alibi_id={alibi_id}, phone_number={phone_number}, question={question}")
     # 1. Find suspect with this alibi_id
@@ -184,17 +184,17 @@ def call_alibi(case_data, alibi_id: str = None, question: str = None, phone_numb
         return {"error": "No alibi contact record found for this suspect."}
 
     # 3. Create LLM Agent for Alibi
-    llm = LLMManager()
+    llm = LLMManager(usage=usage)
     
     context = {
         "suspect_name": target_suspect["name"],
         "truth_context": alibi_data.get("truth", "Unknown"),
         "suspect_story": target_suspect.get("alibi_story", "Unknown"),
-        "relationship": alibi_data.get("contact_name", "Acquaintance"),
-        "question": question
+        "relationship": alibi_data.get("contact_name", "Acquaintance")
     }
     
-    # Create a temporary agent
+    # Create a temporary agent. The question is the user turn, not part of the
+    # instruction, so every call about this alibi shares one cached context.
     agent_id = f"alibi_{alibi_id}"
     # Ensure LLMManager supports 'alibi_agent' role (update _load_prompts if needed)
     llm.create_agent(agent_id, "alibi_agent", context)
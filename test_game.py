@@ -1,4 +1,5 @@
 from game import game_engine
+import json
 import time
 
 def test_game_logic():
@@ -40,5 +41,840 @@ def test_game_logic():
     
     print("\nTest Complete.")
 
+def test_traffic_log_cursor():
+    from game.traffic_log import TrafficLog
+    log = TrafficLog(capacity=5, session_capacity=3)
+    for i in range(4):
+        log.add("IN", {"action": "chat_message", "i": i}, session_id="a")
+    log.add("OUT", {"audio": "x" * 5000}, session_id="b")
+    
+    entries, cursor = log.since(0)
+    assert [e["seq"] for e in entries] == [1, 2, 3, 4, 5]
+    assert len(entries[-1]["payload"]["audio"]) < 5000 # Large fields truncated
+    
+    # Per-session ring keeps only the last 3
+    entries, _ = log.since(0, session_id="a")
+    assert [e["payload"]["i"] for e in entries] == [1, 2, 3]
+    
+    # Nothing new since the cursor
+    entries, cursor = log.since(cursor)
+    assert entries == [] and cursor == 5
+    
+    log.add("IN", {"action": "ready"})
+    entries, cursor = log.since(cursor)
+    assert len(entries) == 1 and cursor == 6
+    print("Traffic log cursor test passed.")
+
+def test_metrics_render():
+    from game import metrics
+    registry = metrics.Registry()
+    calls = metrics.Counter("test_calls", "Test calls.", ["tool"], registry=registry)
+    latency = metrics.Histogram("test_latency_seconds", "Test latency.", buckets=(0.1, 1.0), registry=registry)
+    calls.inc(tool="get_footage")
+    calls.inc(tool="get_footage")
+    latency.observe(0.5)
+    
+    text = registry.render()
+    assert 'test_calls_total{tool="get_footage"} 2' in text
+    assert 'test_latency_seconds_bucket{le="0.1"} 0' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 1' in text
+    print("Metrics render test passed.")
+
+def _app_client():
+    # The web app needs FastAPI and Gradio; skip where they aren't installed
+    import pytest
+    pytest.importorskip("fastapi")
+    pytest.importorskip("gradio")
+    import app
+    from fastapi.testclient import TestClient
+    return app, TestClient(app.app)
+
+def test_metrics_endpoint():
+    app, client = _app_client()
+    assert app.GOVERNOR._thread is None # Background threads start with the server, not on import
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE murder_bridge_requests counter" in response.text
+    print("Metrics endpoint test passed.")
+
+def test_profile_call():
+    from game import profiling
+    assert profiling.normalize_mode("off") is None
+    assert profiling.normalize_mode("1") == "sample"
+    
+    def work(n):
+        time.sleep(0.02)
+        return sum(range(n))
+    
+    result, profile_id = profiling.profile_call("cprofile", "work", work, 1000, session_id="s1")
+    assert result == sum(range(1000))
+    profile = profiling.PROFILE_STORE.get(profile_id)
+    assert profile["mode"] == "cprofile" and profile["session_id"] == "s1"
+    assert "work" in profile["text"] and profile["pstats"]
+    
+    result, profile_id = profiling.profile_call("sample", "work", work, 10)
+    profile = profiling.PROFILE_STORE.get(profile_id)
+    assert result == 45 and profile["samples"] > 0 and "work" in profile["collapsed"]
+    # Listings leave out the (large) report bodies
+    assert all("collapsed" not in p and "pstats" not in p for p in profiling.PROFILE_STORE.list())
+    print("Profile call test passed.")
+
+def test_admin_endpoints_fail_closed(monkeypatch):
+    app, client = _app_client()
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert client.post("/admin/profiling?mode=cprofile").status_code == 404
+    assert client.get("/admin/profiles").status_code == 404
+    
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    assert client.get("/admin/profiles").status_code == 403
+    assert client.get("/admin/profiles", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    response = client.get("/admin/profiles", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200 and "profiles" in response.json()
+    
+    # X-Profile on the public bridge is an admin diagnostic too
+    from game import profiling
+    before = len(profiling.PROFILE_STORE.list())
+    response = client.post("/api/bridge", json={"action": "sync_state", "data": {}}, headers={"X-Profile": "cprofile"})
+    assert "x-profile-id" not in response.headers and len(profiling.PROFILE_STORE.list()) == before
+    response = client.post("/api/bridge", json={"action": "sync_state", "data": {}}, headers={"X-Profile": "cprofile", "X-Admin-Token": "wrong"})
+    assert "x-profile-id" not in response.headers and len(profiling.PROFILE_STORE.list()) == before
+    response = client.post("/api/bridge", json={"action": "sync_state", "data": {}}, headers={"X-Profile": "cprofile", "X-Admin-Token": "secret"})
+    assert profiling.PROFILE_STORE.get(response.headers["x-profile-id"])
+    print("Admin endpoint test passed.")
+
+def test_ws_bridge_round_trip():
+    app, client = _app_client()
+    with client.websocket_connect("/ws/bridge") as ws:
+        # A malformed frame gets an error reply; the connection stays usable
+        ws.send_text("{not json")
+        assert ws.receive_json()["reply"]["action"] == "tool_error"
+        ws.send_json(["not", "an", "object"])
+        assert ws.receive_json()["reply"]["action"] == "tool_error"
+        ws.send_json({"id": 1, "action": "sync_state", "data": {}})
+        message = ws.receive_json()
+        assert message["id"] == 1 and "reply" in message
+    print("WebSocket bridge test passed.")
+
+def test_ws_bridge_pushes_started_game(monkeypatch):
+    app, client = _app_client()
+    monkeypatch.setattr(app, "AI_STEP_DELAY", 0)
+    with client.websocket_connect("/ws/bridge") as ws:
+        ws.send_json({"id": 1, "action": "start", "data": {"difficulty": "easy", "mode": "spectator", "case_id": "A47"}})
+        reply = ws.receive_json()["reply"]
+        session_id = reply["data"]["session_id"]
+        target = app.get_bridge_session(session_id)
+        assert target is not app.session and target.subscribers
+        # The socket follows the game it started: autoplay steps arrive as events
+        ws.send_json({"id": 2, "action": "ai_autoplay", "data": {}, "session_id": session_id})
+        messages = [ws.receive_json() for _ in range(3)]
+        assert {"id": 2, "reply": {"action": "ai_autoplay_started", "data": {}}} in messages
+        assert any(m.get("event", {}).get("action") == "ai_step_result" for m in messages)
+    assert not target.subscribers # Left when the socket closed
+    print("WebSocket started game test passed.")
+
+def test_bridge_batch():
+    app, _ = _app_client()
+    target = app.GameSession()
+    init = target.start("easy", voice=False, case_id="A47")
+    state = init["data"]["state"]["set"]
+    footage = {"action": "use_tool", "data": {"tool": "get_footage", "input": state["available_cameras"][0]}}
+    location = {"action": "use_tool", "data": {"tool": "get_location", "input": state["suspects"][0]["phone_number"]}}
+    
+    # Applied in order: each result sees the points left by the one before
+    reply = target.handle_batch([footage, location])
+    results = reply["data"]["results"]
+    assert reply["data"]["completed"]
+    assert [r["action"] for r in results] == ["add_evidence", "add_evidence"]
+    assert results[0]["data"]["updated_points"] == 7 and results[1]["data"]["updated_points"] == 5
+    
+    # Stops at the first error; later actions don't run
+    reply = target.handle_batch([{"action": "use_tool", "data": {"tool": "no_such_tool"}}, location])
+    assert not reply["data"]["completed"]
+    assert [r["action"] for r in reply["data"]["results"]] == ["tool_error"]
+    assert target.game.points == 5
+    
+    # Bounded size and well-formed entries only
+    assert target.handle_batch([])["action"] == "tool_error"
+    assert target.handle_batch([location] * (app.MAX_BATCH_ACTIONS + 1))["action"] == "tool_error"
+    for entry in ("use_tool", {"data": {}}, {"action": "batch", "data": {"actions": [location]}}):
+        reply = target.handle_batch([entry, location])
+        assert [r["action"] for r in reply["data"]["results"]] == ["tool_error"]
+    assert target.game.points == 5
+    
+    # Batches can't open games or subscriptions (only dispatch_bridge can, on a fresh session)
+    game = target.game
+    for action in ("start", "watch"):
+        reply = target.handle_batch([{"action": action, "data": {"difficulty": "hard"}}])
+        assert [r["action"] for r in reply["data"]["results"]] == ["tool_error"]
+    assert target.handle_input(json.dumps({"action": "start", "data": {}}))["action"] == "tool_error"
+    assert target.game is game
+    target.close()
+    print("Bridge batch test passed.")
+
+def test_engine_import_is_lazy():
+    # Provider SDKs must only load on the first real API call (cold start budget)
+    import os, subprocess, sys
+    code = "import sys, game.game_engine; print([m for m in ('google.generativeai', 'elevenlabs') if m in sys.modules])"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)), env={"PATH": ""})
+    assert out.stdout.strip() == "[]", out.stdout + out.stderr
+    print("Lazy import test passed.")
+
+def _build_assets(tmp_path, monkeypatch):
+    import shutil
+    from ui import assets
+    static = tmp_path / "static"
+    shutil.copytree(assets.STATIC_DIR, static, ignore=shutil.ignore_patterns("dist"))
+    monkeypatch.setattr(assets, "STATIC_DIR", str(static))
+    monkeypatch.setattr(assets, "DIST_DIR", str(static / "dist"))
+    monkeypatch.setattr(assets, "MANIFEST_PATH", str(static / "dist" / "manifest.json"))
+    monkeypatch.setattr(assets, "_manifest", None)
+    return assets, static, assets.build()
+
+def test_asset_build(tmp_path, monkeypatch):
+    import gzip
+    assets, static, manifest = _build_assets(tmp_path, monkeypatch)
+    
+    assert set(manifest) == set(assets.FINGERPRINTED) | {assets.GAME_PAGE}
+    css = (static / manifest["css/noir.css"]).read_text()
+    assert "/static/" + manifest["assets/sand.jpeg"] in css
+    page = (static / manifest[assets.GAME_PAGE]).read_text()
+    assert "/static/" + manifest["js/game_logic.js"] in page and "../static/" not in page
+    
+    # Text assets get a byte-identical gzip sibling; images don't
+    js = static / manifest["js/game_logic.js"]
+    assert gzip.decompress((static / (manifest["js/game_logic.js"] + ".gz")).read_bytes()) == js.read_bytes()
+    assert not (static / (manifest["assets/sand.jpeg"] + ".gz")).exists()
+    
+    # Same sources, same names (cacheable across deploys)
+    assert assets.build() == manifest
+    assert assets.asset_url("css/noir.css") == "/static/" + manifest["css/noir.css"]
+    assert assets.game_page_url() == "/static/" + manifest[assets.GAME_PAGE]
+    
+    assert assets.content_type("app.js").endswith("; charset=utf-8")
+    assert assets.content_type("page.html") == "text/html; charset=utf-8"
+    assert ";" not in assets.content_type("sand.jpeg")
+    print("Asset build test passed.")
+
+def test_precompressed_static_files(tmp_path, monkeypatch):
+    import pytest
+    pytest.importorskip("starlette")
+    pytest.importorskip("httpx")
+    from starlette.applications import Starlette
+    from starlette.routing import Mount
+    from starlette.testclient import TestClient
+    assets, static, manifest = _build_assets(tmp_path, monkeypatch)
+    from starlette.middleware import Middleware
+    client = TestClient(Starlette(routes=[Mount("/static", assets.PrecompressedStaticFiles(directory=str(static)))],
+                                  middleware=[Middleware(assets.DynamicGZipMiddleware, minimum_size=1)]))
+    
+    url = "/static/" + manifest["css/noir.css"]
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"] == "text/css; charset=utf-8"
+    assert response.headers["cache-control"] == assets.IMMUTABLE_CACHE
+    assert response.text == (static / manifest["css/noir.css"]).read_text()
+    assert response.headers["vary"] == "Accept-Encoding" # Compressed in one place only
+    assert client.get("/static/css/noir.css", headers={"Accept-Encoding": "gzip"}).headers["vary"] == "Accept-Encoding"
+    
+    response = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert client.get("/static/css/noir.css").headers["cache-control"] == assets.DEFAULT_CACHE
+    print("Precompressed static files test passed.")
+
+def test_scenario_pack_catalog():
+    from game import scenario_pack
+    scenarios = scenario_pack.load_directory()
+    catalog = scenario_pack.ScenarioCatalog(scenario_pack.pack_scenarios(scenarios))
+    
+    assert len(catalog) == len(scenarios)
+    hard = catalog.list(difficulty="hard")
+    assert hard and all(e["difficulty"] == "hard" for e in hard)
+    assert catalog.list(tags=["no-such-tag"]) == []
+    
+    case = catalog.load(hard[0]["id"])
+    assert case["case_id"] == hard[0]["id"]
+    assert catalog.load(hard[0]["id"]) is not case # Fresh copy per load
+    
+    broken = dict(case, suspects=[dict(s, is_murderer=False) for s in case["suspects"]])
+    assert scenario_pack.validate_scenario(broken)
+    print("Scenario pack test passed.")
+
+def test_scenario_pool(tmp_path):
+    from game import scenario_generator
+    template = scenario_generator.generate_crime_scenario("hard")
+    calls = []
+    
+    def fake_generator(difficulty):
+        calls.append(difficulty)
+        return dict(template, case_id=f"GEN-{len(calls)}", difficulty=difficulty.capitalize())
+    
+    pool_path = str(tmp_path / "pool.json")
+    pool = scenario_generator.ScenarioPool(target_size=1, path=pool_path, generator=fake_generator)
+    while pool.produce_one():
+        pass
+    assert pool.sizes() == {"easy": 1, "medium": 1, "hard": 1}
+    pool._save()
+    
+    scenario = pool.pop("hard")
+    assert scenario["difficulty"] == "Hard"
+    assert pool.pop("hard") is None
+    
+    # Persisted pool survives a restart
+    restored = scenario_generator.ScenarioPool(target_size=1, path=pool_path, generator=fake_generator)
+    assert restored.sizes() == {"easy": 1, "medium": 1, "hard": 1}
+    
+    # Started pools fill themselves in the background
+    started = scenario_generator.ScenarioPool(target_size=1, path=str(tmp_path / "started.json"), generator=fake_generator)
+    started.start()
+    deadline = time.time() + 5
+    while started.sizes() != {"easy": 1, "medium": 1, "hard": 1} and time.time() < deadline:
+        time.sleep(0.01)
+    assert started.sizes() == {"easy": 1, "medium": 1, "hard": 1}
+    print("Scenario pool test passed.")
+
+def test_instance_pool_handoff():
+    built = []
+    
+    def factory(difficulty, case_id):
+        built.append(case_id or difficulty)
+        return object()
+    
+    pool = game_engine.InstancePool(base_size=1, max_size=3, warm_keys=["easy"], factory=factory)
+    assert pool.fill_once() and pool.sizes() == {"easy": 1}
+    assert not pool.fill_once() # At target
+    
+    # Warm key: handed off without building
+    pool.take("easy")
+    assert built == ["easy"]
+    
+    # Cold key: built inline, then kept warm (more so under repeated demand)
+    pool.take("hard", "C99")
+    pool.take("hard", "C99")
+    assert built.count("C99") == 2
+    while pool.fill_once():
+        pass
+    assert pool.sizes()["C99"] == pool.target("C99") >= 2
+    
+    # Started pool: warm keys are built in the background and handed out as-is
+    started = game_engine.InstancePool(base_size=1, warm_keys=["medium"], factory=factory)
+    started.start()
+    deadline = time.time() + 5
+    while not started.sizes().get("medium") and time.time() < deadline:
+        time.sleep(0.01)
+    prebuilt = started._ready["medium"][0]
+    assert started.take("medium") is prebuilt
+    print("Instance pool test passed.")
+
+def test_voice_warmup_budget():
+    from game import voice_manager
+    
+    class FakeTTS:
+        def __init__(self):
+            self.texts = []
+        def convert(self, text, voice_id, model_id):
+            self.texts.append(text)
+            return [b"mp3:", text.encode()]
+    
+    class FakeClient:
+        text_to_speech = FakeTTS()
+    
+    vm = voice_manager.VoiceManager()
+    vm.api_key = "test"
+    vm._client = FakeClient()
+    lines = [("(Sighs) *Fine.* Ask away.", "voice_a"), ("Game Over", "voice_a"), ("Game Over", "voice_b"), ("A much longer line that does not fit", "voice_b")]
+    vm.prefetch(lines, char_budget=30).join()
+    
+    assert FakeClient.text_to_speech.texts == ["Fine. Ask away.", "Game Over"]
+    # Warm lines are now served from the cache
+    assert vm.generate_audio("Game Over", "voice_a") == b"mp3:Game Over"
+    assert len(FakeClient.text_to_speech.texts) == 2
+    
+    # Bundled cases script no opening lines: the warm-up must not start at all
+    game = game_engine.GameInstance("easy")
+    game.voice_manager = vm
+    assert not any(s.get("opening_lines") for s in game.scenario["suspects"])
+    assert game.warm_up_voices() is None
+    game.scenario["suspects"][0]["opening_lines"] = ["Detective. Ask what you like."]
+    game.warm_up_voices().join()
+    assert FakeClient.text_to_speech.texts[-1] == "Detective. Ask what you like."
+    print("Voice warm-up test passed.")
+
+def test_client_state_patches():
+    from game.client_state import StateTracker, apply_patch
+    _, game = game_engine.start_game("medium")
+    tracker = StateTracker(game)
+    
+    full = tracker.full()
+    text = str(full)
+    assert "is_murderer" not in text and "true_location" not in text and "dna_evidence" not in text
+    assert full["version"] == 1 and tracker.update() is None
+    
+    # Points spent and one item unlocked -> only those keys travel
+    game.points -= 2
+    item_id = next(iter(game.scenario["evidence"]["dna_evidence"]))
+    game.unlocked_evidence.append(item_id)
+    patch = tracker.update()
+    assert patch["from"] == 1 and patch["version"] == 2
+    assert patch["append"] == {"unlocked_evidence": [item_id]}
+    assert set(patch["set"]) == {"points", "dna_map"}
+    
+    client = apply_patch(apply_patch({}, full), patch)
+    assert client == apply_patch({}, tracker.full())
+    # A client that missed the patch catches up from its version
+    assert apply_patch(apply_patch({}, full), tracker.since(1)) == client
+    assert tracker.since(99)["reset"]
+    print("Client state test passed.")
+
+def test_lineup_is_concurrent():
+    _, game = game_engine.start_game("medium")
+    
+    def slow_answer(agent_id, question):
+        time.sleep(0.2)
+        return f"{agent_id} was home."
+    game.llm_manager.get_response = slow_answer
+    
+    game.eliminated_suspects.append(game.scenario["suspects"][0]["id"])
+    arrived = []
+    start = time.perf_counter()
+    answers = game.question_all("Where were you at 8:47 PM?", lambda sid, text: arrived.append(sid))
+    elapsed = time.perf_counter() - start
+    
+    expected = [s["id"] for s in game.scenario["suspects"][1:]]
+    assert list(answers) == expected and sorted(arrived) == sorted(expected)
+    assert answers[expected[0]] == f"{expected[0]} was home."
+    # Slowest single answer, not the sum
+    assert elapsed < 0.2 * len(expected)
+    print("Line-up test passed.")
+
+def test_ai_detective_rejects_invalid_moves():
+    from game import ai_detective
+    _, game = game_engine.start_game("medium")
+    detective = game.ai_detective
+    camera = next(iter(game.scenario["evidence"]["footage_data"]))
+    
+    bogus = {"action": "use_tool", "tool_name": "get_footage", "args": {"location": "rooftop_helipad"}}
+    assert detective.validate_decision(bogus)
+    assert detective.validate_decision({"action": "use_tool", "tool_name": "get_dna_test", "args": {"evidence_id": "knife"}})
+    assert not detective.validate_decision({"action": "use_tool", "tool_name": "get_footage", "args": {"location": camera}})
+    
+    # Fallback is always playable
+    fallback = detective.fallback_decision()
+    assert not detective.validate_decision(fallback)
+    
+    # Voting: two of three samples agree, the invalid one is dropped
+    replies = iter([json.dumps(bogus), '{"action": "chat", "suspect_id": "suspect_2", "message": "Hi"}',
+                    '{"action": "chat", "suspect_id": "suspect_2", "message": "Where were you?"}'])
+    detective.llm.get_response_raw = lambda prompt, generation_config=None: next(replies)
+    decision = detective._vote("prompt", samples=3, budget=5)
+    assert ai_detective.decision_key(decision) == ("chat", "suspect_2")
+    
+    # Near misses are repaired locally; chatter and stray braces don't break parsing
+    suspect = game.scenario["suspects"][1]
+    reply = 'Sure! {"action": "interrogate", "suspect_id": "%s", "message": "Hi"} {oops}' % suspect["name"]
+    decision = detective.repair_decision(detective._parse_decision(reply))
+    assert decision["action"] == "chat" and decision["suspect_id"] == suspect["id"]
+    decision = detective.repair_decision({"action": "get_footage", "camera_name": camera.upper()})
+    assert not detective.validate_decision(decision) and decision["args"]["location"] == camera
+    assert ai_detective.decision_schema(game)["properties"]["args"]["properties"]["location"]["enum"]
+    print("AI detective validation test passed.")
+
+def test_usage_budgets_degrade(monkeypatch):
+    from types import SimpleNamespace
+    from game.llm_manager import GeminiAgent, BUDGET_REPLY
+    from game.usage import Usage, PROCESS_USAGE
+    
+    from game import llm_manager
+    
+    class FakeChat:
+        def __init__(self, history=()):
+            self.history = list(history)
+        def send_message(self, text, **options):
+            self.history += [text, "reply"]
+            return SimpleNamespace(text="reply", usage_metadata=SimpleNamespace(prompt_token_count=30, candidates_token_count=10))
+    
+    model = SimpleNamespace(start_chat=lambda history: FakeChat(history))
+    session = Usage(token_budget=200)
+    agent = GeminiAgent(usage=session)
+    agent.model, agent.chat_session = model, FakeChat()
+    monkeypatch.setattr(llm_manager, "CONTEXT_CACHE", llm_manager.ContextCache(factory=lambda name, instruction: (model, None, None)))
+    before = PROCESS_USAGE.total_tokens
+    
+    for i in range(4):
+        assert agent.generate_response(f"q{i}") == "reply"
+    assert agent.usage.total_tokens == session.total_tokens == 160
+    assert PROCESS_USAGE.total_tokens - before == 160
+    # Over 75%: history is cut before the next call
+    assert session.degraded() == ["short_history"]
+    agent.generate_response("q4")
+    assert len(agent.chat_session.history) <= 10
+    # Over budget: canned reply, no call
+    assert agent.generate_response("q5") == BUDGET_REPLY
+    assert session.llm_calls == 5 and "llm_off" in session.degraded()
+    
+    # Thinking tokens count as output (and against the budget)
+    from game.usage import record_llm
+    thinker = Usage(token_budget=100)
+    record_llm(SimpleNamespace(usage_metadata=SimpleNamespace(prompt_token_count=20, candidates_token_count=10, thoughts_token_count=40)), "murderer", thinker)
+    assert thinker.total_tokens == 70 and thinker.output_tokens == 50
+    
+    voice = Usage(tts_char_budget=10)
+    assert voice.tts_allowed(10) and not voice.tts_allowed(11)
+    print("Usage budget test passed.")
+
+def test_context_cache_shares_instructions(monkeypatch):
+    from game import llm_manager
+    from game.llm_manager import ContextCache, GeminiAgent
+    built, deleted = [], []
+    now = [1000.0]
+    
+    class FakeCached:
+        def __init__(self, name):
+            self.name = name
+        def delete(self):
+            deleted.append(self.name)
+    
+    class FakeChat:
+        def __init__(self, model, history):
+            self.model, self.history = model, list(history)
+        def send_message(self, text, **options):
+            self.history += [text, "reply"]
+            return type("Reply", (), {"text": "reply", "usage_metadata": None})()
+    
+    class FakeModel:
+        def start_chat(self, history):
+            return FakeChat(self, history)
+    
+    def factory(model_name, instruction):
+        built.append(instruction)
+        return FakeModel(), now[0] + 60, FakeCached(instruction)
+    
+    cache = ContextCache(capacity=2, factory=factory, clock=lambda: now[0])
+    first = cache.model_for("gemini-2.5-flash", "You are Marcus.")
+    assert cache.model_for("gemini-2.5-flash", "You are Marcus.") is first
+    assert cache.model_for("gemini-2.5-flash", "You are Elena.") is not first
+    # Evicted provider caches are deleted, not left to their TTL
+    cache.model_for("gemini-2.5-flash", "You are Jin.")
+    assert built == ["You are Marcus.", "You are Elena.", "You are Jin."]
+    assert deleted == ["You are Marcus."] and len(cache) == 2
+    
+    # An agent outliving its cache moves to the rebuilt one, keeping the conversation
+    monkeypatch.setattr(llm_manager, "CONTEXT_CACHE", cache)
+    monkeypatch.setattr(llm_manager, "API_KEY", "test")
+    agent = GeminiAgent(model_name="gemini-2.5-flash", system_instruction="You are Jin.")
+    agent.generate_response("Where were you?")
+    old_model = agent.model
+    now[0] += 61 # Past expires_at
+    agent.generate_response("And after that?")
+    assert agent.model is not old_model and agent.chat_session.model is agent.model
+    assert agent.chat_session.history == ["Where were you?", "reply", "And after that?", "reply"]
+    assert built[-1] == "You are Jin." and deleted[-1] == "You are Jin."
+    
+    # Alibi calls: the question is the user turn, so the instruction is the same every time
+    from mcp import tools
+    from game.llm_manager import LLMManager
+    scenario = game_engine.generate_crime_scenario("easy", "A47")
+    suspect = next(s for s in scenario["suspects"] if s.get("alibi_id"))
+    seen = []
+    original = LLMManager.get_response
+    LLMManager.get_response = lambda self, agent_id, user_input: seen.append((self.specs[agent_id][1], user_input)) or "Yes."
+    try:
+        tools.call_alibi(scenario, alibi_id=suspect["alibi_id"], question="Were they with you at 9?")
+        tools.call_alibi(scenario, alibi_id=suspect["alibi_id"], question="What did they drink?")
+    finally:
+        LLMManager.get_response = original
+    assert seen[0][0] == seen[1][0] and "{" not in seen[0][0]
+    assert [question for _, question in seen] == ["Were they with you at 9?", "What did they drink?"]
+    print("Context cache test passed.")
+
+def test_mcp_server_tools():
+    import threading
+    import urllib.request
+    from mcp.server import InvestigationServer, make_http_server
+    
+    server = InvestigationServer()
+    call = lambda name, args, i=1: server.handle({"jsonrpc": "2.0", "id": i, "method": "tools/call", "params": {"name": name, "arguments": args}})
+    
+    assert server.handle({"jsonrpc": "2.0", "id": 0, "method": "initialize", "params": {}})["result"]["serverInfo"]
+    assert server.handle({"jsonrpc": "2.0", "method": "notifications/initialized"}) is None
+    assert {t["name"] for t in server.handle({"jsonrpc": "2.0", "id": 1, "method": "tools/list"})["result"]["tools"]} >= {"get_location", "get_footage", "get_dna_test", "call_alibi"}
+    
+    case = call("start_case", {"difficulty": "easy"})["result"]["structuredContent"]
+    assert "is_murderer" not in json.dumps(case)
+    footage = call("get_footage", {"session_id": case["session_id"], "location": case["cameras"][0]})["result"]
+    assert not footage["isError"] and footage["structuredContent"]["points_left"] == 7
+    assert call("get_dna_test", {"session_id": "nope", "evidence_id": "x"})["result"]["isError"]
+    assert server.handle({"jsonrpc": "2.0", "id": 9, "method": "nope"})["error"]["code"] == -32601
+    
+    # Games end on their verdict and on end_case, taking their locks with them
+    for suspect in case["suspects"]:
+        outcome = call("accuse", {"session_id": case["session_id"], "suspect_id": suspect["id"]})["result"]["structuredContent"]
+        if outcome["result"] != "continue":
+            break
+    assert game_engine.get_game(case["session_id"]) is None and case["session_id"] not in server._locks
+    other = call("start_case", {"difficulty": "easy"})["result"]["structuredContent"]["session_id"]
+    assert call("end_case", {"session_id": other})["result"]["structuredContent"]["ended"]
+    assert game_engine.get_game(other) is None and not server.games
+    
+    # At most max_games open: the least recently used is ended
+    small = InvestigationServer(max_games=2)
+    started = [small.call_tool("start_case", {"difficulty": "easy"})["structuredContent"]["session_id"] for _ in range(3)]
+    assert game_engine.get_game(started[0]) is None and list(small.games) == started[1:]
+    for session_id in started[1:]:
+        small.end(session_id)
+    
+    # Same handler over streamable HTTP; DELETE ends the client's games
+    httpd = make_http_server(server, port=0)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{httpd.server_address[1]}/mcp"
+    def post(message, headers={}):
+        request = urllib.request.Request(url, data=json.dumps(message).encode(), headers={"Content-Type": "application/json", **headers})
+        with urllib.request.urlopen(request) as response:
+            return response.headers, json.loads(response.read())
+    try:
+        headers, reply = post({"jsonrpc": "2.0", "id": 5, "method": "initialize", "params": {}})
+        client = {"Mcp-Session-Id": headers["Mcp-Session-Id"]}
+        assert client["Mcp-Session-Id"] and reply["id"] == 5
+        _, reply = post({"jsonrpc": "2.0", "id": 6, "method": "tools/call", "params": {"name": "start_case", "arguments": {}}}, client)
+        session_id = reply["result"]["structuredContent"]["session_id"]
+        assert server.games[session_id] == client["Mcp-Session-Id"]
+        with urllib.request.urlopen(urllib.request.Request(url, method="DELETE", headers=client)) as response:
+            assert response.status == 204
+        assert game_engine.get_game(session_id) is None and not server.games and not server.clients
+        
+        # Client ids go with their last game, and stay within the bound
+        small_httpd = make_http_server(small, port=0)
+        threading.Thread(target=small_httpd.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{small_httpd.server_address[1]}/mcp"
+        owners = []
+        for i in range(4):
+            headers, _ = post({"jsonrpc": "2.0", "id": i, "method": "initialize", "params": {}})
+            owners.append({"Mcp-Session-Id": headers["Mcp-Session-Id"]})
+            post({"jsonrpc": "2.0", "id": i, "method": "tools/call", "params": {"name": "start_case", "arguments": {}}}, owners[-1])
+            assert len(small.clients) <= small.max_games and len(small.games) <= small.max_games
+        assert list(small.clients) == [o["Mcp-Session-Id"] for o in owners[2:]]
+        _, reply = post({"jsonrpc": "2.0", "id": 9, "method": "tools/call", "params": {"name": "end_case", "arguments": {"session_id": list(small.games)[0]}}}, owners[2])
+        assert reply["result"]["structuredContent"]["ended"] and list(small.clients) == [owners[3]["Mcp-Session-Id"]]
+        small.end_owner(owners[3]["Mcp-Session-Id"])
+        assert not small.clients and not small.games
+        small_httpd.shutdown()
+    finally:
+        httpd.shutdown()
+    print("MCP server test passed.")
+
+def test_loadtest_fake_providers():
+    import urllib.request
+    import urllib.error
+    from loadtest import fake_providers
+    from loadtest.run import percentile
+    
+    gemini = fake_providers.serve(fake_providers.GeminiHandler, fake_providers.Profile(latency_ms=0))
+    base = f"http://127.0.0.1:{gemini.server_address[1]}"
+    try:
+        config = {"responseMimeType": "application/json", "responseSchema": {"properties": {"suspect_id": {"enum": ["suspect_3"]}}}}
+        body = json.dumps({"contents": [{"role": "user", "parts": [{"text": "hi"}]}], "generationConfig": config}).encode()
+        with urllib.request.urlopen(urllib.request.Request(f"{base}/v1beta/models/gemini-2.5-flash:generateContent", data=body)) as response:
+            reply = json.loads(response.read())
+        decision = json.loads(reply["candidates"][0]["content"]["parts"][0]["text"])
+        assert decision["action"] in ("chat", "use_tool") and reply["usageMetadata"]["promptTokenCount"] > 0
+        try:
+            urllib.request.urlopen(urllib.request.Request(f"{base}/v1beta/cachedContents", data=b"{}"))
+            assert False, "context caches should be refused"
+        except urllib.error.HTTPError as e:
+            assert e.code == 400
+    finally:
+        gemini.shutdown()
+    
+    assert percentile([0.1, 0.2, 0.3, 0.4], 50) == 0.2 and percentile([0.1, 0.2, 0.3, 0.4], 99) == 0.4
+    assert fake_providers.Profile(latency_ms=0, error_rate=1.0).fails()
+    print("Load test harness test passed.")
+
+def test_load_governor_steps():
+    from game.load_governor import LoadGovernor, LEVELS
+    
+    now = [0.0]
+    governor = LoadGovernor(max_inflight=4, slo_seconds=1.0, hold=5, cooldown=10, clock=lambda: now[0])
+    signals = []
+    governor.listeners.append(signals.append)
+    
+    def request(seconds):
+        with governor.track():
+            now[0] += seconds
+    
+    # Slow requests escalate one step per hold period, voice first
+    for _ in range(3):
+        request(2.0)
+        now[0] += 5
+        request(2.0)
+    assert governor.level == 3 and not governor.voice_enabled()
+    assert governor.model_override() and governor.reply_token_cap() and governor.spectator_delay_factor() == 1.0
+    assert [s["level"] for s in signals] == [1, 2, 3] and signals[-1]["degraded"] == list(LEVELS[1:4])
+    
+    # Calm traffic steps back down once per cooldown
+    now[0] += 60 # Old latencies leave the window
+    for _ in range(40):
+        request(0.1)
+        now[0] += 1
+    assert governor.level == 0 and governor.voice_enabled() and governor.model_override() is None
+    assert signals[-1] == {"level": 0, "name": "normal", "degraded": []}
+    
+    # The periodic evaluation thread can be stopped (app shutdown)
+    governor.start(interval=0.01)
+    thread = governor._thread
+    governor.stop()
+    assert governor._thread is None and not thread.is_alive()
+    print("Load governor test passed.")
+
+def test_model_routing(tmp_path):
+    from game import model_routing
+    
+    path = tmp_path / "routes.json"
+    path.write_text(json.dumps({"murderer": {"model": "gemini-2.5-pro", "speed": 11}, "narrator": {"temperature": 0.2}}))
+    routes = model_routing.load_routes(str(path))
+    assert routes["murderer"]["model"] == "gemini-2.5-pro" and routes["murderer"]["max_output_tokens"] == 2048
+    assert "speed" not in routes["murderer"] and routes["narrator"]["model"] == model_routing.DEFAULT_MODEL
+    
+    assert model_routing.route_for("alibi_agent")["model"] != model_routing.route_for("murderer")["model"]
+    assert model_routing.route_for("unknown")["model"] == model_routing.DEFAULT_MODEL
+    # Caller settings win; a token cap only ever lowers the limit
+    config = model_routing.generation_config("alibi_agent", {"temperature": 0.0}, token_cap=120)
+    assert config == {"max_output_tokens": 120, "temperature": 0.0}
+    assert model_routing.generation_config("alibi_agent", token_cap=500)["max_output_tokens"] == 200
+    print("Model routing test passed.")
+
+def test_select_suspect_prefetch():
+    game = game_engine.GameInstance("easy")
+    suspect_ids = [s["id"] for s in game.scenario["suspects"]]
+    # Agents are only defined up front
+    assert not game.llm_manager.agents and set(suspect_ids) <= set(game.llm_manager.specs)
+    
+    future = game.prefetch_suspect(suspect_ids[0])
+    future.result(timeout=5)
+    assert list(game.llm_manager.agents) == [suspect_ids[0]]
+    assert game.prefetch_suspect(suspect_ids[0]) is None # Already warm
+    assert game.prefetch_suspect("nobody") is None
+    # With voice, the TTS client is warmed up too
+    warmed = []
+    game.voice_manager.warm_up = lambda: warmed.append(True)
+    game.prefetch_suspect(suspect_ids[0], voice=True).result(timeout=5)
+    assert warmed
+    
+    # Questioning someone else builds their agent on the spot
+    game.question_suspect(suspect_ids[1], "Where were you?")
+    assert suspect_ids[1] in game.llm_manager.agents
+    print("Prefetch test passed.")
+
+def test_fact_index_contradictions():
+    from game.fact_index import FactIndex, format_time
+    from mcp import tools
+    
+    with open("scenarios/silicon_valley.json") as f:
+        scenario = json.load(f)
+    facts = FactIndex(scenario)
+    assert not facts.contradictions # Alibi stories alone prove nothing
+    
+    # Phone data against stories: the liar is flagged, a differently worded true story is not
+    for suspect in scenario["suspects"]:
+        args = {"phone_number": suspect["phone_number"]}
+        facts.add_tool_result("get_location", args, tools.get_location(scenario, **args))
+    assert [c["suspect_id"] for c in facts.contradictions] == ["suspect_1"]
+    
+    # Footage names people by "Suspect N" and bare times inside the clip's range
+    new = facts.add_tool_result("get_footage", {"location": "lobby"}, tools.get_footage(scenario, "lobby"))
+    assert {c["time"] for c in new} == {"8:43 PM", "8:52 PM"}
+    
+    # A changed story, and queries by suspect and time
+    new = facts.add_testimony("suspect_4", "Honestly? I was at home by 8:40 pm. Ask anyone.")
+    assert new and new[0]["source"] == "testimony"
+    assert "suspect_4" in facts.describe_contradictions()
+    assert {c["kind"] for c in facts.claims("suspect_1")} == {"alibi", "phone", "footage"}
+    assert {c["suspect_id"] for c in facts.around("8:47 PM")} == {"suspect_1", "suspect_2", "suspect_3", "suspect_4"}
+    assert not facts.around("6:00 AM")
+    # The time index agrees with a full scan (footage spans start before the query)
+    for minutes in range(20 * 60, 22 * 60, 7):
+        expected = {c["id"] for c in facts.claims() if c["time"] is not None and c["time"] - facts.window <= minutes <= c["until"] + facts.window}
+        assert {c["id"] for c in facts.around(minutes)} == expected
+    assert format_time(0) == "12:00 AM" and format_time(20 * 60 + 47) == "8:47 PM"
+    
+    # Denials and other people's whereabouts are not the suspect's own claims
+    easy = FactIndex(game_engine.generate_crime_scenario("easy", "B12"))
+    before = len(easy.claims("suspect_1"))
+    assert easy.add_testimony("suspect_1", "I was never anywhere near the crime scene, I swear.") == []
+    assert easy.add_testimony("suspect_1", "My brother went to the airport at 8:45 PM.") == []
+    assert easy.add_testimony("suspect_1", "I didn't go to the gym. She was at the bank, not me.") == []
+    assert len(easy.claims("suspect_1")) == before
+    assert easy.add_testimony("suspect_1", "I was at the crime scene for a minute, fine.")
+    print("Fact index test passed.")
+
+def test_planner_solves_routine_case():
+    game = game_engine.GameInstance("medium", "A47")
+    def no_llm(*args, **kwargs):
+        raise AssertionError("routine moves should not call the LLM")
+    game.ai_detective.llm.get_response_raw = no_llm
+    
+    moves = []
+    while not game.game_over and len(moves) < 6:
+        moves.append(game.run_ai_step()["action"])
+    # Footage, DNA on the unlocked weapon, the leading suspect's phone, then the accusation
+    assert moves == ["use_tool", "use_tool", "use_tool", "accuse"] and game.verdict_correct
+    tested = [e["_input_args"] for e in game.evidence_revealed if "evidence_id" in e["_input_args"]]
+    assert tested == [{"evidence_id": "trophy_weapon"}]
+    
+    # With nothing affordable and no clear leader, the planner defers to the LLM
+    game = game_engine.GameInstance("medium", "A47")
+    game.points = 1
+    assert game.ai_detective.planner.plan() is None
+    print("Planner test passed.")
+
+def test_broadcast_channel_catch_up():
+    from game.broadcast import Channel
+    
+    state = {"version": 0}
+    channel = Channel(lambda: {"action": "init_game", "data": dict(state)}, history=3, replay_actions=("ai_step_result",))
+    live = []
+    channel.subscribe(live.append)
+    assert [m["action"] for m in live] == ["init_game"] # Snapshot on join
+    
+    channel.publish({"action": "init_game", "data": {}})
+    for step in range(1, 6):
+        state["version"] = step
+        channel.publish({"action": "ai_step_result", "data": {"step": step}, "state": {"version": step}})
+    channel.publish({"action": "quality_level", "data": {"level": 1}}) # Live only
+    assert len(live) == 8 and live[-1]["seq"] == channel.seq == 7
+    
+    # Late joiner: current state, then the last few moves (not replayed live messages)
+    late = []
+    channel.subscribe(late.append)
+    assert late[0]["action"] == "init_game" and late[0]["data"]["version"] == 5 and late[0]["replay"]
+    assert [m["data"]["step"] for m in late[1:]] == [3, 4, 5] and all(m["replay"] for m in late[1:])
+    
+    # A viewer still within the log gets only what it missed; one behind it gets a snapshot again
+    assert [m["data"]["step"] for m in channel.catch_up(4)] == [4, 5] # seq 4 was step 3
+    assert channel.catch_up(2)[0]["action"] == "init_game"
+    assert channel.catch_up(7) == []
+    
+    channel.unsubscribe(late.append)
+    assert channel.viewers == 1
+    print("Broadcast channel test passed.")
+
+def test_broadcast_viewers_ignore_ui_game(monkeypatch):
+    app, _ = _app_client()
+    monkeypatch.setattr(app.BROADCAST, "_ensure_running", lambda: None) # No featured game needed
+    page, viewer = [], []
+    
+    # A page that said "ready" follows the UI game; one that switched to "watch" doesn't
+    app.dispatch_bridge("ready", {}, emit=page.append)
+    app.dispatch_bridge("ready", {}, emit=viewer.append)
+    reply, _ = app.dispatch_bridge("watch", {"since": 0}, emit=viewer.append)
+    assert reply["action"] == "watching" and viewer.append not in app.session.subscribers
+    viewer.clear()
+    
+    app.session.publish({"action": "init_game", "data": {"mode": "interactive"}})
+    assert [m["action"] for m in page] == ["init_game"] and viewer == []
+    app.session.unsubscribe(page.append)
+    app.BROADCAST.leave(viewer.append)
+    print("Broadcast viewer isolation test passed.")
+
 if __name__ == "__main__":
     test_game_logic()
@@ -0,0 +1,195 @@
+"""
+Static asset pipeline.
+
+Build step (run once per deploy, see Dockerfile):
+
+    python -m ui.assets
+
+copies the game's CSS/JS/textures and the game page into ui/static/dist/ under
+content-hashed names, writes gzip (and brotli, if installed) siblings for
+text assets, and records everything in dist/manifest.json.
+
+At runtime `PrecompressedStaticFiles` serves the precompressed variant the
+browser accepts and marks fingerprinted files as cacheable forever.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+UI_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(UI_DIR, "static")
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST_PATH = os.path.join(DIST_DIR, "manifest.json")
+TEMPLATE_PATH = os.path.join(UI_DIR, "templates", "game_interface.html")
+
+STATIC_URL = "/static/"
+GAME_PAGE = "game_interface.html"
+
+# Order matters: files referenced from CSS are fingerprinted before the CSS itself
+FINGERPRINTED = [
+    "assets/paper-texture.jpeg",
+    "assets/sand.jpeg",
+    "css/noir.css",
+    "js/game_logic.js",
+]
+
+COMPRESSIBLE = (".css", ".js", ".html", ".json", ".svg", ".txt")
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+DEFAULT_CACHE = "public, max-age=3600"
+
+# Served with charset=utf-8 besides text/* (older Pythons map .js here)
+CHARSET_TYPES = ("application/javascript", "application/json")
+
+def content_type(path):
+    """Content-Type for a (possibly precompressed) asset, with charset for text types."""
+    media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if media_type.startswith("text/") or media_type in CHARSET_TYPES:
+        media_type += "; charset=utf-8"
+    return media_type
+
+def _hash(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+def _write_compressed(path, data):
+    """Writes .gz/.br siblings next to a text asset (skipped for already-compressed formats)."""
+    if not path.endswith(COMPRESSIBLE):
+        return
+    # mtime=0 keeps the gzip output byte-identical between builds
+    _write(path + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        _write(path + ".br", brotli.compress(data, quality=11))
+
+def _rewrite_urls(text, manifest):
+    """Points /static/<logical> and ../static/<logical> references at the fingerprinted copies."""
+    def replace(match):
+        logical = match.group(2)
+        if logical in manifest:
+            return STATIC_URL + manifest[logical]
+        return STATIC_URL + logical
+    return re.sub(r"(\.\./static/|/static/)([\w\-./]+)", replace, text)
+
+def build():
+    """Builds ui/static/dist and returns the manifest (logical path -> path under /static/)."""
+    if os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    manifest = {}
+
+    for logical in FINGERPRINTED:
+        with open(os.path.join(STATIC_DIR, logical), "rb") as f:
+            data = f.read()
+        if logical.endswith(".css"):
+            data = _rewrite_urls(data.decode("utf-8"), manifest).encode("utf-8")
+        stem, ext = os.path.splitext(logical)
+        hashed = f"dist/{stem}.{_hash(data)}{ext}"
+        out_path = os.path.join(STATIC_DIR, hashed)
+        _write(out_path, data)
+        _write_compressed(out_path, data)
+        manifest[logical] = hashed
+
+    # Game page: asset links rewritten, then fingerprinted like any other file
+    with open(TEMPLATE_PATH, "r") as f:
+        page = _rewrite_urls(f.read(), manifest).encode("utf-8")
+    hashed = f"dist/game_interface.{_hash(page)}.html"
+    out_path = os.path.join(STATIC_DIR, hashed)
+    _write(out_path, page)
+    _write_compressed(out_path, page)
+    manifest[GAME_PAGE] = hashed
+
+    _write(MANIFEST_PATH, json.dumps(manifest, indent=2).encode("utf-8"))
+    return manifest
+
+_manifest = None
+
+def load_manifest():
+    """Reads dist/manifest.json once; empty when the build step hasn't run (dev mode)."""
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(MANIFEST_PATH, "r") as f:
+                _manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            _manifest = {}
+    return _manifest
+
+def asset_url(logical):
+    """URL for a static asset, fingerprinted when a build exists."""
+    return STATIC_URL + load_manifest().get(logical, logical)
+
+def game_page_url():
+    """URL the game iframe loads. Falls back to the live-rendered /game route in dev."""
+    hashed = load_manifest().get(GAME_PAGE)
+    return STATIC_URL + hashed if hashed else "/game"
+
+def render_game_page():
+    """Dev fallback: the template with asset links resolved at request time."""
+    with open(TEMPLATE_PATH, "r") as f:
+        return _rewrite_urls(f.read(), load_manifest())
+
+try:
+    from starlette.datastructures import Headers
+    from starlette.exceptions import HTTPException
+    from starlette.middleware.gzip import GZipMiddleware
+    from starlette.staticfiles import StaticFiles
+except ImportError: # Build step only needs the stdlib
+    StaticFiles = None
+
+if StaticFiles is not None:
+    class PrecompressedStaticFiles(StaticFiles):
+        """StaticFiles that serves .br/.gz siblings and long-lived cache headers for dist/."""
+
+        async def get_response(self, path, scope):
+            immutable = path.replace(os.sep, "/").startswith("dist/")
+            response = None
+            if immutable and path.endswith(COMPRESSIBLE):
+                accept = Headers(scope=scope).get("accept-encoding", "")
+                for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+                    if encoding not in accept:
+                        continue
+                    try:
+                        candidate = await super().get_response(path + suffix, scope)
+                    except HTTPException:
+                        continue
+                    if candidate.status_code in (200, 304):
+                        response = candidate
+                        response.headers["Content-Encoding"] = encoding
+                        response.headers["Content-Type"] = content_type(path)
+                        break
+            if response is None:
+                response = await super().get_response(path, scope)
+            if "accept-encoding" not in response.headers.get("vary", "").lower():
+                response.headers.add_vary_header("Accept-Encoding")
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE if immutable else DEFAULT_CACHE
+            return response
+
+    class DynamicGZipMiddleware(GZipMiddleware):
+        """GZip for dynamic responses only: files under `static_prefix` are compressed at build time."""
+
+        def __init__(self, app, static_prefix=STATIC_URL, **options):
+            super().__init__(app, **options)
+            self.static_prefix = static_prefix
+
+        async def __call__(self, scope, receive, send):
+            if scope["type"] == "http" and scope["path"].startswith(self.static_prefix):
+                await self.app(scope, receive, send)
+                return
+            await super().__call__(scope, receive, send)
+
+if __name__ == "__main__":
+    built = build()
+    for logical, hashed in built.items():
+        print(f"{logical:<28} -> {hashed}")
@@ -12,14 +12,91 @@ let gameState = {
     availableCameras: [],
     dnaMap: {},
     unlockedEvidence: [],
-    imageMetadata: []
+    imageMetadata: [],
+    version: 0, // Version of `state` (player-visible projection kept by the server)
+    state: {},
+    quality: 0 // Server load level (game/load_governor.py), 0 = full quality
 };
 
 // --- Bridge: Communication with Parent (Python/Gradio) ---
 
-// We now use direct API calls for reliability
+// Primary transport: one persistent WebSocket (requests, replies and server-pushed events).
+// Fallback: direct API calls when the socket is unavailable.
+let socket = null;
+let socketRequestId = 0;
+const pendingRequests = new Map();
+let reconnectDelay = 1000;
+
+// Broadcast viewing: one server-side AI game shared by every viewer (/game?watch=1)
+let watchingBroadcast = new URLSearchParams(location.search).has('watch');
+let broadcastSeq = 0; // Last channel message seen; reconnects catch up from here
+let broadcastPoll = null;
+let broadcastResync = false; // Next poll asks for a fresh snapshot (state went out of step)
+
+function connectSocket() {
+    if (!('WebSocket' in window)) return;
+    const protocol = location.protocol === 'https:' ? 'wss' : 'ws';
+    socket = new WebSocket(`${protocol}://${location.host}/ws/bridge`);
+    
+    socket.onopen = () => {
+        console.log("✅ Socket connected.");
+        reconnectDelay = 1000;
+        stopHandshake();
+        if (watchingBroadcast) {
+            clearTimeout(broadcastPoll);
+            broadcastPoll = null;
+            sendAction('watch', { since: broadcastSeq });
+        } else {
+            sendAction('ready', {});
+        }
+    };
+    
+    socket.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+        if (message.id !== undefined && pendingRequests.has(message.id)) {
+            pendingRequests.get(message.id)(message.reply);
+            pendingRequests.delete(message.id);
+        } else if (message.event) {
+            handleServerMessage(message.event);
+        }
+    };
+    
+    socket.onclose = () => {
+        // Fail pending requests over to HTTP and retry the socket with backoff
+        pendingRequests.forEach(resolve => resolve(null));
+        pendingRequests.clear();
+        socket = null;
+        if (watchingBroadcast) watchBroadcast(); // Polls until the socket is back
+        else startHandshake();
+        setTimeout(connectSocket, reconnectDelay);
+        reconnectDelay = Math.min(reconnectDelay * 2, 30000);
+    };
+}
+
+function socketReady() {
+    return socket && socket.readyState === WebSocket.OPEN;
+}
+
+function sendSocketRequest(action, data) {
+    return new Promise(resolve => {
+        const id = ++socketRequestId;
+        pendingRequests.set(id, resolve);
+        socket.send(JSON.stringify({ id, action, data }));
+    });
+}
+
 async function sendAction(action, data) {
     // console.log("📤 Sending API request:", action, data);
+    if (socketReady()) {
+        const result = await sendSocketRequest(action, data);
+        if (result && result.action) {
+            if (result.action !== 'tool_error') handleServerMessage(result);
+            else applyStatePatch(result.state);
+            return result;
+        }
+        if (result !== null) return result;
+        // Socket dropped mid-request: fall through to HTTP
+    }
     try {
         const response = await fetch('/api/bridge', {
             method: 'POST',
@@ -30,6 +107,8 @@ async function sendAction(action, data) {
         });
         
         if (!response.ok) throw new Error(`API Error: ${response.status}`);
+        const quality = response.headers.get('X-Quality-Level');
+        if (quality !== null) applyQuality({ level: Number(quality) });
         
         const result = await response.json();
         // console.log("📥 API Response:", result);
@@ -37,6 +116,7 @@ async function sendAction(action, data) {
         if (result && result.action) {
             // Return result for local handling if needed
             if (result.action === 'tool_error') {
+                applyStatePatch(result.state);
                 return result; 
             }
             handleServerMessage(result);
@@ -48,7 +128,27 @@ async function sendAction(action, data) {
     }
 }
 
-// Keep listener for any future server-pushed events (if we add sockets later)
+function watchBroadcast() {
+    watchingBroadcast = true;
+    if (socketReady()) sendAction('watch', { since: broadcastSeq });
+    else if (!broadcastPoll) pollBroadcast();
+}
+
+// HTTP fallback while the socket is down
+async function pollBroadcast() {
+    try {
+        const since = broadcastResync ? 0 : broadcastSeq;
+        broadcastResync = false;
+        const response = await fetch(`/api/broadcast?since=${since}`);
+        const body = await response.json();
+        body.events.forEach(handleServerMessage);
+    } catch (e) {
+        console.error("Broadcast poll error:", e);
+    }
+    broadcastPoll = socketReady() ? null : setTimeout(pollBroadcast, 3000);
+}
+
+// Legacy path: Gradio forwards init data with postMessage
 window.addEventListener('message', function(event) {
     const { action, data } = event.data;
     if (action) handleServerMessage({ action, data });
@@ -56,25 +156,57 @@ window.addEventListener('message', function(event) {
 
 function handleServerMessage(message) {
     const { action, data } = message;
+    if (message.seq) broadcastSeq = Math.max(broadcastSeq, message.seq);
+    // Replies carry the state changes they caused
+    if (message.state) applyStatePatch(message.state);
     switch(action) {
+        case 'state_patch':
+            applyStatePatch(data);
+            break;
         case 'init_game':
+            if (data.mode === 'broadcast' && gameState.session_id && gameState.session_id !== data.session_id) {
+                // The featured game moved on to its next case: start from a clean board
+                location.search = '?watch=1';
+                return;
+            }
             initializeGame(data);
+            if (data.quality) applyQuality(data.quality);
+            break;
+        case 'quality_level':
+            applyQuality(data);
             break;
         case 'update_chat':
             addChatMessage(data.role, data.content, data.name, data.audio);
             break;
+        case 'play_audio':
+            playAudio(data.audio, data.queue);
+            break;
+        case 'lineup_result':
+            // Streamed answers already arrived one by one as update_chat events
+            if (!data.streamed) {
+                data.answers.forEach(answer => {
+                    addChatMessage(answer.role, answer.content, answer.name);
+                    playAudio(answer.audio, true);
+                });
+            }
+            break;
+        case 'ai_step_result':
+            renderAIStep(data, message.replay);
+            break;
+        case 'ai_autoplay_started':
+        case 'watching':
+            break;
+        case 'watch_broadcast':
+            watchBroadcast();
+            break;
         case 'add_evidence':
             if (data.updated_points !== undefined) {
                 document.getElementById('points-display').innerText = data.updated_points;
             }
             // console.log("Evidence Data:", data);
             if (data.newly_unlocked && data.newly_unlocked.length > 0) {
+                // The items themselves arrive in the state patch
                 console.log("🔓 Unlocking items:", data.newly_unlocked);
-                data.newly_unlocked.forEach(id => {
-                    if (!gameState.unlockedEvidence.includes(id)) {
-                        gameState.unlockedEvidence.push(id);
-                    }
-                });
                 showNotification("🔍 NEW EVIDENCE UNLOCKED");
                 
                 // Wiggle DNA button
@@ -105,6 +237,78 @@ function handleServerMessage(message) {
     }
 }
 
+// --- Game State (versioned, see game/client_state.py) ---
+
+let stateSyncPending = false;
+
+function applyStatePatch(patch) {
+    if (!patch) return;
+    if (!patch.reset) {
+        if (patch.version <= gameState.version) return; // Already have it
+        if (patch.from !== gameState.version) {
+            if (watchingBroadcast) {
+                // The bridge serves the UI game, not this one: catch up from a fresh snapshot
+                if (!socketReady()) broadcastResync = true;
+                else if (!stateSyncPending) {
+                    stateSyncPending = true;
+                    sendAction('watch', { since: 0 }).finally(() => { stateSyncPending = false; });
+                }
+                return;
+            }
+            // Missed an update: ask for everything since our version
+            if (!stateSyncPending) {
+                stateSyncPending = true;
+                sendAction('sync_state', { version: gameState.version }).finally(() => { stateSyncPending = false; });
+            }
+            return;
+        }
+    }
+    
+    const state = patch.reset ? {} : Object.assign({}, gameState.state);
+    Object.assign(state, patch.set || {});
+    for (const [key, items] of Object.entries(patch.append || {})) {
+        state[key] = (state[key] || []).concat(items);
+    }
+    (patch.unset || []).forEach(key => delete state[key]);
+    
+    gameState.state = state;
+    gameState.version = patch.version;
+    syncFromState();
+    // Newly flagged lies (game/fact_index.py)
+    ((patch.append || {}).contradictions || []).forEach(c => {
+        const suspect = (state.suspects || []).find(s => s.id === c.suspect_id);
+        const name = suspect ? suspect.name : c.suspect_id;
+        addChatMessage('system', `⚠️ CONTRADICTION: ${name} said "${c.claim}", but at ${c.time}: ${c.evidence}`);
+    });
+}
+
+// --- Server Load ---
+
+const QUALITY_NOTICES = [
+    "✅ Full service restored",
+    "🔇 Busy night at the precinct: voices paused",
+    "⚡ Busy night at the precinct: faster, simpler suspects",
+    "✂️ Busy night at the precinct: suspects keep it short",
+    "🐢 Busy night at the precinct: AI detective slowed down"
+];
+
+function applyQuality(signal) {
+    const level = signal.level || 0;
+    if (level === gameState.quality) return;
+    gameState.quality = level;
+    showNotification(QUALITY_NOTICES[Math.min(level, QUALITY_NOTICES.length - 1)]);
+}
+
+function syncFromState() {
+    const state = gameState.state;
+    gameState.scenario = { title: state.title, victim: state.victim, suspects: state.suspects || [] };
+    gameState.availableCameras = state.available_cameras || [];
+    gameState.dnaMap = state.dna_map || {};
+    gameState.unlockedEvidence = state.unlocked_evidence || [];
+    if (state.round !== undefined) document.getElementById('round-display').innerText = `${state.round}/3`;
+    if (state.points !== undefined) document.getElementById('points-display').innerText = state.points;
+}
+
 // --- Game Logic ---
 
 function updateStatus(data) {
@@ -114,7 +318,15 @@ function updateStatus(data) {
 }
 
 function initializeGame(data) {
-    gameState = data;
+    // The same game can arrive over the socket and the Gradio bridge; load it once
+    if (gameState.scenario && data.session_id && gameState.session_id === data.session_id) return;
+    gameState = Object.assign({}, gameState, {
+        session_id: data.session_id,
+        mode: data.mode,
+        version: 0,
+        state: {}
+    });
+    applyStatePatch(data.state);
     
     // Fetch image metadata then render
     fetch('/static/assets/suspects/metadata.json')
@@ -133,22 +345,20 @@ function initializeGame(data) {
         document.getElementById('loading-overlay').style.display = 'none';
     }, 1000);
     
-    addChatMessage('system', `CASE LOADED: ${data.scenario.title}`);
-    addChatMessage('system', `VICTIM: ${data.scenario.victim.name}`);
-    
-    // Update UI stats
-    document.getElementById('round-display').innerText = `${data.round}/3`;
-    document.getElementById('points-display').innerText = data.points;
+    addChatMessage('system', `CASE LOADED: ${gameState.scenario.title}`);
+    addChatMessage('system', `VICTIM: ${gameState.scenario.victim.name}`);
     
-    // Store Tool Data
-    gameState.availableCameras = data.available_cameras || [];
-    gameState.dnaMap = data.dna_map || {};
-    gameState.unlockedEvidence = data.unlocked_evidence || [];
-    
-    renderCaseFile(data.scenario);
+    renderCaseFile(gameState.scenario);
     
     // Mode Check
-    if (data.mode === 'spectator') {
+    if (data.mode === 'broadcast') {
+        // Live featured game: nothing to start, moves arrive on their own
+        document.getElementById('ai-log-panel').style.display = 'block';
+        document.getElementById('chat-input-area').style.display = 'none';
+        document.getElementById('tools-panel').style.pointerEvents = 'none';
+        document.getElementById('tools-panel').style.opacity = '0.5';
+        addChatMessage('system', '📡 WATCHING LIVE: the AI detective is on the case.');
+    } else if (data.mode === 'spectator') {
         document.getElementById('spectator-modal').classList.add('active');
         document.getElementById('spectator-start-btn').onclick = startSpectatorMode;
         
@@ -164,11 +374,18 @@ function initializeGame(data) {
 function startSpectatorMode() {
     document.getElementById('spectator-modal').classList.remove('active');
     document.getElementById('ai-log-panel').style.display = 'block';
-    runAIStep();
+    if (socketReady()) {
+        // Server drives the game and pushes each move
+        showThinking();
+        sendAction('ai_autoplay', {});
+    } else {
+        runAIStep();
+    }
 }
 
-async function runAIStep() {
+function showThinking() {
     const logContent = document.getElementById('ai-log-content');
+    if (document.getElementById('temp-thinking')) return;
     
     // Visual "Thinking" state
     const thinkingDiv = document.createElement('div');
@@ -178,19 +395,34 @@ async function runAIStep() {
     thinkingDiv.id = 'temp-thinking';
     logContent.appendChild(thinkingDiv);
     logContent.scrollTop = logContent.scrollHeight;
+}
+
+// HTTP fallback: request one move at a time
+async function runAIStep() {
+    showThinking();
     
-    // 1. Request Move
+    // 1. Request Move (the reply is rendered by handleServerMessage -> renderAIStep)
     const response = await sendAction('ai_step', {});
     
-    // Remove temp thinking
-    const temp = document.getElementById('temp-thinking');
-    if (temp) temp.remove();
-    
     if (!response || response.action !== 'ai_step_result') {
+        const temp = document.getElementById('temp-thinking');
+        if (temp) temp.remove();
         return;
     }
     
+    // Loop
     const step = response.data;
+    if (step.result.type !== 'game_over' && !step.result.outcome) {
+        setTimeout(runAIStep, 6000); // 6s delay for reading
+    }
+}
+
+function renderAIStep(step, replay=false) {
+    const logContent = document.getElementById('ai-log-content');
+    
+    // Remove temp thinking
+    const temp = document.getElementById('temp-thinking');
+    if (temp) temp.remove();
     
     // 2. Log Thought
     const entry = document.createElement('div');
@@ -207,9 +439,9 @@ async function runAIStep() {
     
     // 3. Execute Action Visualization
     if (step.action === 'chat') {
-        // Select suspect if needed
+        // Select suspect if needed (display only: the server already played this move)
         if (gameState.currentSuspect !== step.result.suspect_id) {
-            selectSuspect(step.result.suspect_id);
+            selectSuspect(step.result.suspect_id, false);
         }
         
         // Simulate User Message (AI Detective)
@@ -217,19 +449,18 @@ async function runAIStep() {
         
         setTimeout(() => {
             addChatMessage('suspect', step.result.response, "Suspect");
-        }, 1000);
+            // Catch-up moves are shown, not replayed aloud
+            if (!replay) playAudio(step.result.audio, true);
+        }, replay ? 0 : 1000);
         
     } else if (step.action === 'use_tool') {
         showNotification(`🤖 AI USED TOOL`);
     }
     
-    // Loop
-    if (step.result.type !== 'game_over' && !step.result.outcome) {
-        setTimeout(runAIStep, 6000); // 6s delay for reading
-    } else {
-        if (step.result.type === 'game_over') {
-             triggerGameOver(step.result.outcome);
-        }
+    if (step.result.type === 'game_over') {
+        triggerGameOver(step.result.outcome);
+    } else if (socketReady() && !replay) {
+        setTimeout(showThinking, 1500); // Next move is on its way
     }
 }
 
@@ -428,7 +659,7 @@ function copyToClipboard(text) {
     });
 }
 
-function selectSuspect(suspectId) {
+function selectSuspect(suspectId, hint=true) {
     gameState.currentSuspect = suspectId;
     const suspect = gameState.scenario.suspects.find(s => s.id === suspectId);
     
@@ -442,7 +673,8 @@ function selectSuspect(suspectId) {
     });
     
     addChatMessage('system', `Selected suspect: ${suspect.name}. You may now question them.`);
-    sendAction('select_suspect', { suspect_id: suspectId });
+    // Sent right away: the server warms this suspect up while the player types
+    if (hint) sendAction('select_suspect', { suspect_id: suspectId });
 }
 
 // --- UI Rendering: Chat ---
@@ -489,14 +721,28 @@ function addChatMessage(role, text, name="System", audioB64=null) {
     type();
     
     // Play Audio
-    if (audioB64) {
-        if (currentAudio) {
-            currentAudio.pause();
-            currentAudio = null;
-        }
-        currentAudio = new Audio(audioB64);
-        currentAudio.play().catch(e => console.error("Audio Play Error:", e));
+    if (audioB64) playAudio(audioB64);
+}
+
+// Line-up clips wait their turn; a regular answer interrupts whatever is playing
+const audioQueue = [];
+
+function playAudio(src, queued=false) {
+    if (!src) return;
+    if (queued && currentAudio && !currentAudio.paused && !currentAudio.ended) {
+        audioQueue.push(src);
+        return;
+    }
+    if (!queued) audioQueue.length = 0;
+    if (currentAudio) {
+        currentAudio.pause();
+        currentAudio = null;
     }
+    currentAudio = new Audio(src);
+    currentAudio.onended = () => {
+        if (audioQueue.length > 0) playAudio(audioQueue.shift(), true);
+    };
+    currentAudio.play().catch(e => console.error("Audio Play Error:", e));
 }
 
 function sendUserMessage() {
@@ -519,6 +765,19 @@ function sendUserMessage() {
     input.value = '';
 }
 
+// Line-up: the same question to every suspect still in play
+function sendLineupQuestion() {
+    const input = document.getElementById('chat-input');
+    const text = input.value.trim();
+    
+    if (!text) return;
+    
+    addChatMessage('detective', text, "YOU (TO ALL)");
+    sendAction('question_all', { message: text });
+    
+    input.value = '';
+}
+
 // --- UI Rendering: Evidence Board ---
 
 function addEvidenceToBoard(evidenceData) {
@@ -902,6 +1161,7 @@ document.getElementById('modal-input').addEventListener('keypress', function (e)
 });
 
 document.getElementById('send-btn').addEventListener('click', sendUserMessage);
+document.getElementById('lineup-btn').addEventListener('click', sendLineupQuestion);
 document.getElementById('chat-input').addEventListener('keypress', function (e) {
     if (e.key === 'Enter' && !e.shiftKey) {
         e.preventDefault();
@@ -959,17 +1219,35 @@ document.getElementById('tool-phone').onclick = () => useTool('call_alibi');
 document.getElementById('tool-dna').onclick = () => useTool('get_dna_test');
 document.getElementById('tool-accuse').onclick = () => useTool('accuse');
 
-// Notify Parent that we are ready (Retry loop)
-console.log("📡 Attempting to connect to game server...");
-const handshakeInterval = setInterval(() => {
-    if (gameState.scenario) {
-        clearInterval(handshakeInterval);
-        console.log("✅ Connection established.");
-    } else {
-        console.log("📡 Sending 'ready' signal...");
-        sendAction('ready', {});
-    }
-}, 2000);
+// Notify Parent that we are ready.
+// With the socket up the server pushes the game when it starts; polling is only the fallback.
+let handshakeInterval = null;
 
-// Immediate first try
-sendAction('ready', {});
+function startHandshake() {
+    if (handshakeInterval || gameState.scenario) return;
+    handshakeInterval = setInterval(() => {
+        if (gameState.scenario) {
+            stopHandshake();
+            console.log("✅ Connection established.");
+        } else {
+            console.log("📡 Sending 'ready' signal...");
+            sendAction('ready', {});
+        }
+    }, 2000);
+}
+
+function stopHandshake() {
+    if (handshakeInterval) clearInterval(handshakeInterval);
+    handshakeInterval = null;
+}
+
+console.log("📡 Attempting to connect to game server...");
+if ('WebSocket' in window) {
+    connectSocket();
+} else if (watchingBroadcast) {
+    pollBroadcast();
+} else {
+    startHandshake();
+    // Immediate first try
+    sendAction('ready', {});
+}